@@ -0,0 +1,100 @@
+"""
+Many concurrent buyers on a single market listing.
+
+Seeds one listing and a pool of buyers in a scratch database, fires
+concurrent MarketService.buy_item calls at it and reports throughput.
+Fails if the units sold, the transaction log and the remaining stock
+disagree, i.e. if anything was oversold. Needs a MongoDB replica set
+(transactions) at MONGO_URL.
+
+    cd backend && python -m benchmarks.buy_contention --stock 500 --buyers 200 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+from database.connection import db_connection  # noqa: E402
+from database.indexes import ensure_indexes  # noqa: E402
+from models.market import BuyRequest, MarketItem  # noqa: E402
+from models.user import User  # noqa: E402
+from services.market_service import market_service  # noqa: E402
+
+
+async def seed(db, stock: int, buyers: int) -> tuple:
+    for name in ("users", "market_items", "market_transactions", "user_inventory"):
+        await db[name].drop()
+    await ensure_indexes(db)
+
+    seller = User(username="seller", email="seller@bench.local", password_hash="x", country="Albania")
+    users = [
+        User(username=f"buyer{i}", email=f"buyer{i}@bench.local", password_hash="x", country="Albania", gold=10 ** 6)
+        for i in range(buyers)
+    ]
+    await db.users.insert_many([seller.model_dump()] + [user.model_dump() for user in users])
+
+    item = MarketItem(
+        name="Steel", category="resources", quality=1, price=1.0, quantity=stock,
+        seller_id=seller.id, seller_name=seller.username
+    )
+    await db.market_items.insert_one(item.model_dump())
+    return item, [user.id for user in users]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
+    db = client[os.environ.get("BENCH_DB_NAME", "europa_benchmark")]
+    db_connection.client = client
+    db_connection.database = db
+
+    item, buyer_ids = await seed(db, args.stock, args.buyers)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    outcomes = {"ok": 0, "rejected": 0}
+
+    async def buy(i: int):
+        async with semaphore:
+            try:
+                await market_service.buy_item(
+                    BuyRequest(item_id=item.id, quantity=args.quantity),
+                    buyer_ids[i % len(buyer_ids)]
+                )
+                outcomes["ok"] += 1
+            except HTTPException:
+                outcomes["rejected"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(buy(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    listing = await db.market_items.find_one({"id": item.id})
+    remaining = listing["quantity"] if listing else 0
+    sold = sum([doc["quantity"] async for doc in db.market_transactions.find({"item_id": item.id})])
+    inventory = sum([doc["quantity"] async for doc in db.user_inventory.find({"item_name": "Steel"})])
+
+    print(f"{args.requests} buy attempts in {elapsed:.2f}s: {args.requests / elapsed:.1f} req/s, "
+          f"{outcomes['ok']} filled, {outcomes['rejected']} rejected")
+    print(f"stock {args.stock}, sold {sold}, in inventories {inventory}, remaining {remaining}")
+
+    client.close()
+    if remaining < 0 or sold + remaining != args.stock or inventory != sold:
+        raise SystemExit("OVERSOLD: stock accounting does not balance")
+    print("no overselling")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Fights per second on one hot war: three writes per hit vs write-behind.
+
+"before" replays the original fight_in_war path (war $inc, user $inc and
+a battle_participation insert per hit); "after" goes through
+WarService.fight and the damage aggregator, including its final flush.
+Both runs are checked to land the same total damage on the war. Needs
+MongoDB (a replica set, for the aggregator's transactions) at MONGO_URL.
+
+    cd backend && python -m benchmarks.fight_throughput --fights 20000 --users 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+from database.connection import db_connection  # noqa: E402
+from database.indexes import ensure_indexes  # noqa: E402
+from models.military import BattleParticipation, War  # noqa: E402
+from models.user import User, UserResponse  # noqa: E402
+from services.damage_aggregator import DamageAggregator  # noqa: E402
+from services import war_service as war_service_module  # noqa: E402
+
+
+async def seed(db, users: int) -> tuple:
+    for name in ("users", "wars", "battle_participation", "damage_batches"):
+        await db[name].drop()
+    await ensure_indexes(db)
+    war = War(
+        attacker_country="Germany", defender_country="France", region="Alsace-Lorraine",
+        attacker_flag="🇩🇪", defender_flag="🇫🇷", ends_at=datetime.utcnow() + timedelta(hours=4)
+    )
+    await db.wars.insert_one(war.model_dump())
+    fighters = [User(username=f"f{i}", email=f"f{i}@bench.local", password_hash="x", country="Germany") for i in range(users)]
+    await db.users.insert_many([user.model_dump() for user in fighters])
+    return war, [UserResponse(**user.model_dump()) for user in fighters]
+
+
+async def legacy_fight(db, war_id: str, side: str, user: UserResponse) -> int:
+    war = await db.wars.find_one({"id": war_id, "status": "active"})
+    base_damage = user.stats.strength * 10
+    damage = random.randint(int(base_damage * 0.8), int(base_damage * 1.2))
+    await db.wars.update_one({"id": war["id"]}, {"$inc": {f"{side}_damage": damage, "participants_count": 1}})
+    await db.users.update_one({"id": user.id}, {"$inc": {"stats.total_damage": damage, "stats.battles_won": 1, "gold": 10}})
+    await db.battle_participation.insert_one(
+        BattleParticipation(war_id=war_id, user_id=user.id, side=side, damage_dealt=damage).model_dump()
+    )
+    return damage
+
+
+async def run(fights: int, concurrency: int, fight) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    total = 0
+
+    async def one(i: int):
+        nonlocal total
+        async with semaphore:
+            total += await fight(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(fights)))
+    return total, time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fights", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
+    db = client[os.environ.get("BENCH_DB_NAME", "europa_benchmark")]
+    db_connection.client = client
+    db_connection.database = db
+
+    war, fighters = await seed(db, args.users)
+    total, elapsed = await run(args.fights, args.concurrency,
+                               lambda i: legacy_fight(db, war.id, "attacker", fighters[i % len(fighters)]))
+    stored = (await db.wars.find_one({"id": war.id}))["attacker_damage"]
+    print(f"before: {args.fights / elapsed:10.1f} fights/s  (damage dealt {total}, stored {stored})")
+
+    war, fighters = await seed(db, args.users)
+    aggregator = DamageAggregator(journal_dir=tempfile.mkdtemp(prefix="damage_journal_"))
+    war_service_module.damage_aggregator = aggregator
+    service = war_service_module.WarService()
+    await aggregator.start()
+
+    async def fight(i: int) -> int:
+        return (await service.fight(war.id, "attacker", fighters[i % len(fighters)]))["damage_dealt"]
+
+    started = time.perf_counter()
+    total, _ = await run(args.fights, args.concurrency, fight)
+    await aggregator.stop()
+    elapsed_with_flush = time.perf_counter() - started
+    stored = (await db.wars.find_one({"id": war.id}))["attacker_damage"]
+    print(f" after: {args.fights / elapsed_with_flush:10.1f} fights/s  (damage dealt {total}, stored {stored}, "
+          f"{aggregator.flushes} flushes)")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
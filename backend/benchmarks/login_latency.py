@@ -0,0 +1,94 @@
+"""
+p99 latency of an unrelated endpoint while bcrypt logins run concurrently.
+
+Compares verifying passwords inline on the event loop against the bounded
+password executor. Runs in-process against the ASGI app, no MongoDB needed.
+
+    cd backend && python -m benchmarks.login_latency --logins 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+
+from server import app
+from services.auth_service import auth_service, AuthService
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_logins(hashed: str, logins: int, concurrency: int, inline: bool):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if inline:
+                AuthService._verify_password_sync("benchmark-password", hashed)
+                await asyncio.sleep(0)
+            else:
+                await auth_service.verify_password("benchmark-password", hashed)
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, latencies: list, interval: float = 0.005):
+    # Latency is measured from when the request was due, so time spent waiting
+    # for a blocked event loop counts against the probe like it would for a client
+    due = time.perf_counter()
+    while not stop.is_set():
+        await client.get("/api/health")
+        finished = time.perf_counter()
+        latencies.append((finished - due) * 1000)
+        due = finished + interval
+        await asyncio.sleep(interval)
+
+
+async def scenario(hashed: str, logins: int, concurrency: int, inline: bool) -> dict:
+    latencies = []
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        prober = asyncio.create_task(probe(client, stop, latencies))
+        started = time.perf_counter()
+        await run_logins(hashed, logins, concurrency, inline)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    return {
+        "mode": "inline" if inline else "executor",
+        "logins_per_sec": logins / elapsed,
+        "probes": len(latencies),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies)
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    hashed = AuthService._hash_password_sync("benchmark-password")
+    for inline in (True, False):
+        result = await scenario(hashed, args.logins, args.concurrency, inline)
+        print(
+            f"{result['mode']:>8}: {result['logins_per_sec']:8.1f} logins/s  "
+            f"health p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+            f"max {result['max_ms']:7.2f} ms  ({result['probes']} probes)"
+        )
+    auth_service.password_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
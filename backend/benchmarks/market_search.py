@@ -0,0 +1,80 @@
+"""
+Market search latency: unanchored case-insensitive $regex vs indexed prefix.
+
+Seeds market_items in a scratch database at each size and times the old
+`{"name": {"$regex": q, "$options": "i"}}` filter against the
+`search_terms` prefix filter used by MarketService.get_market_items.
+
+    cd backend && python -m benchmarks.market_search --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import statistics
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+from database.indexes import ensure_indexes  # noqa: E402
+from models.market import MarketItem  # noqa: E402
+from services.market_service import build_search_terms  # noqa: E402
+
+NAMES = ["Steel", "Food", "Weapons", "Oil", "Medical Kit", "Tank", "Iron Ore", "Grain", "Fuel Barrel", "Rifle"]
+CATEGORIES = ["resources", "consumables", "equipment"]
+QUERIES = ["st", "med", "kit", "tank", "iron o", "fuel"]
+
+
+async def seed(db, size: int, batch: int = 10000) -> None:
+    await db.market_items.drop()
+    await ensure_indexes(db)
+    for start in range(0, size, batch):
+        docs = []
+        for i in range(start, min(size, start + batch)):
+            name = f"{random.choice(NAMES)} {i % 997}"
+            docs.append(MarketItem(
+                name=name, category=random.choice(CATEGORIES), quality=random.randint(1, 5),
+                price=round(random.uniform(1, 500), 2), quantity=random.randint(0, 50),
+                seller_id="seller", seller_name="seller", search_terms=build_search_terms(name)
+            ).model_dump())
+        await db.market_items.insert_many(docs, ordered=False)
+
+
+async def time_query(db, query_filter: dict, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await db.market_items.find(query_filter).sort("created_at", -1).limit(50).to_list(50)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
+    db = client[os.environ.get("BENCH_DB_NAME", "europa_benchmark")]
+
+    for size in args.sizes:
+        await seed(db, size)
+        regex_ms, prefix_ms = [], []
+        for q in QUERIES:
+            regex_ms.append(await time_query(db, {"quantity": {"$gt": 0}, "name": {"$regex": q, "$options": "i"}}, args.repeat))
+            prefix_ms.append(await time_query(db, {"quantity": {"$gt": 0}, "search_terms": {"$regex": f"^{re.escape(q)}"}}, args.repeat))
+        print(f"{size:>9} listings: regex median {statistics.median(regex_ms):8.2f} ms   "
+              f"indexed prefix median {statistics.median(prefix_ms):8.2f} ms")
+
+    await db.market_items.drop()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+"""
+Per-route serialization cost of 100-row company and market item lists.
+
+Each list is served three ways from the same in-memory rows:
+
+- baseline: response models built in the service, then revalidated against
+  response_model and rendered through the stdlib JSON response
+- orjson: the same model path rendered with ORJSONResponse
+- fast: rows projected to the response fields, rendered with orjson and
+  returned as a Response, so nothing is validated per request
+
+For market items there is also "adapter", the previous TypeAdapter.dump_json
+path. An empty route is timed as well and subtracted, so the numbers are the
+per-request cost on top of routing. Runs in-process, no MongoDB needed.
+
+    cd backend && python -m benchmarks.response_serialization --rows 100 --requests 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Tuple
+
+import httpx
+import orjson
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from models.company import Company, CompanyResponse
+from models.market import MarketItem, MarketItemResponse
+from services.company_service import COMPANY_PROJECTION
+from services.market_service import LISTING_PROJECTION, build_search_terms
+
+
+def project(doc: dict, projection: dict) -> dict:
+    return {field: doc[field] for field in projection if field in doc}
+
+
+def build_app(rows: int) -> FastAPI:
+    company_docs = [
+        Company(name=f"Company {i}", company_type="Steel Production", owner_id="owner", location="Berlin").model_dump()
+        for i in range(rows)
+    ]
+    item_docs = [
+        MarketItem(
+            name=f"Steel {i}", category="resources", quality=3, price=12.5, quantity=4,
+            seller_id="seller", seller_name="seller", search_terms=build_search_terms(f"Steel {i}")
+        ).model_dump()
+        for i in range(rows)
+    ]
+    company_rows = [project(doc, COMPANY_PROJECTION) for doc in company_docs]
+    item_rows = [project(doc, LISTING_PROJECTION) for doc in item_docs]
+    item_adapter = TypeAdapter(List[MarketItemResponse])
+
+    app = FastAPI()
+
+    @app.get("/empty")
+    async def empty():
+        return Response(content=b"[]", media_type="application/json")
+
+    @app.get("/companies/baseline", response_model=List[CompanyResponse], response_class=JSONResponse)
+    async def companies_baseline():
+        return [CompanyResponse(**doc) for doc in company_docs]
+
+    @app.get("/companies/orjson", response_model=List[CompanyResponse], response_class=ORJSONResponse)
+    async def companies_orjson():
+        return [CompanyResponse(**doc) for doc in company_docs]
+
+    @app.get("/companies/fast", response_model=List[CompanyResponse])
+    async def companies_fast():
+        return ORJSONResponse(company_rows)
+
+    @app.get("/market/baseline", response_model=List[MarketItemResponse], response_class=JSONResponse)
+    async def market_baseline():
+        return [MarketItemResponse(**doc) for doc in item_docs]
+
+    @app.get("/market/orjson", response_model=List[MarketItemResponse], response_class=ORJSONResponse)
+    async def market_orjson():
+        return [MarketItemResponse(**doc) for doc in item_docs]
+
+    @app.get("/market/adapter", response_model=List[MarketItemResponse])
+    async def market_adapter():
+        items = [MarketItemResponse(**doc) for doc in item_docs]
+        return Response(content=item_adapter.dump_json(items), media_type="application/json")
+
+    @app.get("/market/fast", response_model=List[MarketItemResponse])
+    async def market_fast():
+        return Response(content=orjson.dumps(item_rows), media_type="application/json")
+
+    return app
+
+
+async def time_route(client: httpx.AsyncClient, path: str, requests: int) -> Tuple[float, list]:
+    """Median request time in microseconds, and the decoded body"""
+    body = (await client.get(path)).json()
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await client.get(path)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples), body
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = build_app(args.rows)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        empty_us, _ = await time_route(client, "/empty", args.requests)
+        print(f"empty route: {empty_us:8.1f} us median\n")
+        for resource, modes in (("companies", ("baseline", "orjson", "fast")),
+                                ("market", ("baseline", "orjson", "adapter", "fast"))):
+            reference = None
+            for mode in modes:
+                median_us, body = await time_route(client, f"/{resource}/{mode}", args.requests)
+                if reference is None:
+                    reference = body
+                elif body != reference:
+                    raise SystemExit(f"/{resource}/{mode} returned a different body than baseline")
+                cost = median_us - empty_us
+                print(f"{resource:>9} {mode:<8} {median_us:8.1f} us median   {cost:8.1f} us serialization "
+                      f"({len(body)} rows)")
+            print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Damage flushes per second on one hot war: war document vs sharded counters.
+
+Each worker stands in for one API process flushing its damage aggregator:
+it commits transactions that $inc the war's counters, built the same way
+DamageAggregator._write_batch builds them. Concurrent transactions on the
+same document hit write conflicts and are retried by with_transaction;
+the retry count is reported next to throughput. Both runs are checked to
+land the same total damage. Needs a MongoDB replica set at MONGO_URL.
+
+    cd backend && python -m benchmarks.war_counters --workers 64 --flushes 200 --shards 16
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+from database.connection import db_connection  # noqa: E402
+from database.indexes import ensure_indexes  # noqa: E402
+from models.military import War  # noqa: E402
+from services.war_counters import WarCounters  # noqa: E402
+
+
+async def seed(db, shards: int) -> War:
+    for name in ("wars", "war_counter_shards"):
+        await db[name].drop()
+    await ensure_indexes(db)
+    war = War(
+        attacker_country="Germany", defender_country="France", region="Alsace-Lorraine",
+        attacker_flag="🇩🇪", defender_flag="🇫🇷", ends_at=datetime.utcnow() + timedelta(hours=4),
+        counter_shards=shards
+    )
+    await db.wars.insert_one(war.model_dump())
+    return war
+
+
+async def run(db, war: War, workers: int, flushes: int, damage: int) -> tuple:
+    counters = WarCounters()
+    attempts = 0
+
+    async def worker():
+        for _ in range(flushes):
+            war_ops, shard_ops = await counters.increment_ops({war.id: {"attacker_damage": damage, "participants_count": 1}})
+
+            async def write(session):
+                nonlocal attempts
+                attempts += 1
+                if war_ops:
+                    await db.wars.bulk_write(war_ops, ordered=False, session=session)
+                if shard_ops:
+                    await db.war_counter_shards.bulk_write(shard_ops, ordered=False, session=session)
+
+            async with await db.client.start_session() as session:
+                await session.with_transaction(write)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+
+    stored = (await db.wars.find_one({"id": war.id}, {"_id": 0, "id": 1, "attacker_damage": 1}))
+    await counters.apply_totals([stored], fresh=True)
+    return elapsed, attempts - workers * flushes, stored["attacker_damage"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--flushes", type=int, default=200)
+    parser.add_argument("--shards", type=int, default=16)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL"))
+    db = client[os.environ.get("BENCH_DB_NAME", "europa_benchmark")]
+    db_connection.client = client
+    db_connection.database = db
+
+    total = args.workers * args.flushes
+    expected = total * 1000
+    for label, shards in (("war document", 0), (f"{args.shards} shards", args.shards)):
+        war = await seed(db, shards)
+        elapsed, retries, stored = await run(db, war, args.workers, args.flushes, 1000)
+        print(f"{label:>14}: {total / elapsed:10.1f} flushes/s  {retries:6d} conflict retries  "
+              f"(damage {stored}, expected {expected})")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
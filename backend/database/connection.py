@@ -1,6 +1,7 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure
+from database.indexes import ensure_indexes
 import logging
 
 logger = logging.getLogger(__name__)
@@ -47,39 +48,16 @@ async def get_database():
     return db_connection.database
 
 async def create_indexes():
-    """Create database indexes for better performance"""
+    """Create database indexes from the declarative spec in database/indexes.py"""
     if db_connection.database is None:
         return
     
     try:
-        # User indexes
-        await db_connection.database.users.create_index("email", unique=True)
-        await db_connection.database.users.create_index("username", unique=True)
-        
-        # Company indexes
-        await db_connection.database.companies.create_index("owner_id")
-        await db_connection.database.companies.create_index("location")
-        
-        # Market indexes
-        await db_connection.database.market_items.create_index("category")
-        await db_connection.database.market_items.create_index("seller_id")
-        await db_connection.database.market_items.create_index("price")
-        
-        # Military indexes
-        await db_connection.database.military_units.create_index("leader_id")
-        await db_connection.database.military_members.create_index("user_id")
-        await db_connection.database.military_members.create_index("military_unit_id")
-        
-        # War indexes
-        await db_connection.database.wars.create_index("status")
-        await db_connection.database.wars.create_index("started_at")
-        
-        # Politics indexes
-        await db_connection.database.political_parties.create_index("leader_id")
-        await db_connection.database.elections.create_index("status")
-        await db_connection.database.proposals.create_index("status")
-        
-        logger.info("Database indexes created successfully")
+        failed = await ensure_indexes(db_connection.database)
+        if failed:
+            logger.error(f"Indexes missing on: {', '.join(failed)}")
+        else:
+            logger.info("Database indexes created successfully")
         
     except Exception as e:
-        logger.error(f"Error creating indexes: {e}")
\ No newline at end of file
+        logger.error(f"Error creating indexes: {e}")
@@ -0,0 +1,283 @@
+from typing import Dict, List
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARTICIPATION_TTL_DAYS = int(os.environ.get("PARTICIPATION_TTL_DAYS", "30"))
+
+# Declarative index spec per collection. Every collection looked up by its
+# string `id` gets a unique index on it; compound indexes follow the
+# equality -> sort -> range order of the queries in services/ and routes/.
+INDEX_SPEC: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("username", ASCENDING)], unique=True),
+    ],
+    "companies": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("owner_id", ASCENDING), ("id", ASCENDING)]),
+        IndexModel([("owner_id", ASCENDING), ("name", ASCENDING)]),
+        IndexModel([("location", ASCENDING)]),
+    ],
+    "market_items": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING), ("quantity", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING), ("quantity", ASCENDING)]),
+        IndexModel([("category", ASCENDING), ("search_terms", ASCENDING), ("quantity", ASCENDING)]),
+        IndexModel([("search_terms", ASCENDING), ("quantity", ASCENDING)]),
+        IndexModel([("seller_id", ASCENDING)]),
+        IndexModel([("price", ASCENDING)]),
+    ],
+    "market_transactions": [
+        IndexModel([("buyer_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("seller_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "market_orders": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("sequence", ASCENDING)]),
+        IndexModel([("sequence", DESCENDING)]),
+    ],
+    "user_inventory": [
+        IndexModel([("user_id", ASCENDING), ("item_name", ASCENDING)], unique=True),
+    ],
+    "military_units": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("leader_id", ASCENDING)]),
+        IndexModel([("total_damage", DESCENDING), ("id", ASCENDING)]),
+    ],
+    "military_members": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # One unit per user
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("military_unit_id", ASCENDING)]),
+    ],
+    # First-hit markers that count battles per war; kept as long as raw participation
+    "military_member_battles": [
+        IndexModel([("user_id", ASCENDING), ("military_unit_id", ASCENDING), ("war_id", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=PARTICIPATION_TTL_DAYS * 24 * 3600),
+    ],
+    "military_unit_battles": [
+        IndexModel([("military_unit_id", ASCENDING), ("war_id", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=PARTICIPATION_TTL_DAYS * 24 * 3600),
+    ],
+    "wars": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("started_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("ends_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("next_round_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("participation_rolled_up_at", ASCENDING), ("finished_at", ASCENDING)]),
+    ],
+    "battle_rounds": [
+        IndexModel([("war_id", ASCENDING), ("round_number", ASCENDING)], unique=True),
+    ],
+    "damage_batches": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Applied-batch markers only matter until their journal segment is deleted
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "battle_participation": [
+        IndexModel([("war_id", ASCENDING), ("user_id", ASCENDING)]),
+        # Backstop for wars that are never rolled up; rollup normally deletes rows much sooner
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=PARTICIPATION_TTL_DAYS * 24 * 3600),
+    ],
+    "battle_participation_summary": [
+        IndexModel([("war_id", ASCENDING), ("user_id", ASCENDING), ("side", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+    ],
+    "war_counter_shards": [
+        IndexModel([("war_id", ASCENDING), ("shard", ASCENDING)], unique=True),
+    ],
+    "war_leaderboards": [
+        IndexModel([("war_id", ASCENDING), ("side", ASCENDING)], unique=True),
+    ],
+    "training_jobs": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("completes_at", ASCENDING)]),
+        # One job in progress per user
+        IndexModel([("user_id", ASCENDING)], unique=True, partialFilterExpression={"status": "active"},
+                   name="user_id_active_unique"),
+    ],
+    "political_parties": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("leader_id", ASCENDING)]),
+    ],
+    "party_members": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # One party per user
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("party_id", ASCENDING)]),
+    ],
+    "elections": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("race_id", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("ends_at", ASCENDING)]),
+        IndexModel([("party_id", ASCENDING), ("started_at", ASCENDING)]),
+    ],
+    "proposals": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("voting_ends_at", ASCENDING)]),
+        IndexModel([("party_id", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "votes": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # One vote per voter per race and per proposal; each only covers votes of its kind
+        IndexModel([("race_id", ASCENDING), ("voter_id", ASCENDING)], unique=True,
+                   partialFilterExpression={"race_id": {"$type": "string"}}, name="race_voter_unique"),
+        IndexModel([("proposal_id", ASCENDING), ("voter_id", ASCENDING)], unique=True,
+                   partialFilterExpression={"proposal_id": {"$type": "string"}}, name="proposal_voter_unique"),
+    ],
+}
+
+# Query shapes issued by the services, checked with explain() by
+# `python manage.py verify-indexes`. Sample values only need the right type.
+SERVICE_QUERIES: List[dict] = [
+    {"name": "users by id", "collection": "users", "filter": {"id": "u"}},
+    {"name": "users by email", "collection": "users", "filter": {"email": "e"}},
+    {"name": "users by email or username", "collection": "users",
+     "filter": {"$or": [{"email": "e"}, {"username": "u"}]}},
+    {"name": "company by id", "collection": "companies", "filter": {"id": "c"}},
+    {"name": "companies by owner", "collection": "companies", "filter": {"owner_id": "u"}},
+    {"name": "company by owner and id", "collection": "companies", "filter": {"id": "c", "owner_id": "u"}},
+    {"name": "companies in id order", "collection": "companies",
+     "filter": {"id": {"$gt": "c"}}, "sort": [("id", ASCENDING)]},
+    {"name": "company by owner and name", "collection": "companies", "filter": {"owner_id": "u", "name": "n"}},
+    {"name": "market item by id", "collection": "market_items", "filter": {"id": "i"}},
+    {"name": "market listings", "collection": "market_items",
+     "filter": {"quantity": {"$gt": 0}}, "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"name": "market listings by category", "collection": "market_items",
+     "filter": {"quantity": {"$gt": 0}, "category": "resources"}, "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"name": "market listings after cursor", "collection": "market_items",
+     "filter": {"quantity": {"$gt": 0}, "category": "resources", "created_at": {"$lte": datetime(2024, 1, 1)},
+                "$or": [{"created_at": {"$lt": datetime(2024, 1, 1)}}, {"created_at": datetime(2024, 1, 1), "id": {"$lt": "i"}}]},
+     "sort": [("created_at", DESCENDING), ("id", DESCENDING)]},
+    {"name": "market search", "collection": "market_items",
+     "filter": {"quantity": {"$gt": 0}, "search_terms": {"$regex": "^ste"}}, "sort": [("created_at", DESCENDING)]},
+    {"name": "market search by category", "collection": "market_items",
+     "filter": {"quantity": {"$gt": 0}, "category": "resources", "search_terms": {"$regex": "^ste"}},
+     "sort": [("created_at", DESCENDING)]},
+    {"name": "open orders in sequence", "collection": "market_orders",
+     "filter": {"status": "open"}, "sort": [("sequence", ASCENDING)]},
+    {"name": "market order by id", "collection": "market_orders", "filter": {"id": "o"}},
+    {"name": "inventory by user", "collection": "user_inventory", "filter": {"user_id": "u"}},
+    {"name": "inventory by user and item", "collection": "user_inventory",
+     "filter": {"user_id": "u", "item_name": "Steel"}},
+    {"name": "active wars", "collection": "wars",
+     "filter": {"status": "active"}, "sort": [("started_at", DESCENDING), ("id", DESCENDING)]},
+    {"name": "active war by id", "collection": "wars", "filter": {"id": "w", "status": "active"}},
+    {"name": "war by id", "collection": "wars", "filter": {"id": "w"}},
+    {"name": "wars past ends_at", "collection": "wars",
+     "filter": {"status": "active", "ends_at": {"$lte": datetime(2024, 1, 1)}}},
+    {"name": "wars with a due round", "collection": "wars",
+     "filter": {"status": "active", "next_round_at": {"$lte": datetime(2024, 1, 1)}}},
+    {"name": "wars without round state", "collection": "wars",
+     "filter": {"status": "active", "next_round_at": None}},
+    {"name": "rounds for wars", "collection": "battle_rounds",
+     "filter": {"war_id": {"$in": ["w"]}}, "sort": [("war_id", ASCENDING), ("round_number", ASCENDING)]},
+    {"name": "counter shards for wars", "collection": "war_counter_shards", "filter": {"war_id": {"$in": ["w"]}}},
+    {"name": "participation for wars", "collection": "battle_participation", "filter": {"war_id": {"$in": ["w"]}}},
+    {"name": "finished wars to roll up", "collection": "wars",
+     "filter": {"status": "finished", "participation_rolled_up_at": None, "finished_at": {"$lte": datetime(2024, 1, 1)}}},
+    {"name": "participation of one war", "collection": "battle_participation", "filter": {"war_id": "w"}},
+    {"name": "war summaries by user", "collection": "battle_participation_summary", "filter": {"user_id": "u"}},
+    {"name": "due training jobs", "collection": "training_jobs",
+     "filter": {"status": "active", "completes_at": {"$lte": datetime(2024, 1, 1)}}},
+    {"name": "due training jobs of a user", "collection": "training_jobs",
+     "filter": {"user_id": "u", "status": "active", "completes_at": {"$lte": datetime(2024, 1, 1)}}},
+    {"name": "active training job of a user", "collection": "training_jobs", "filter": {"user_id": "u", "status": "active"}},
+    {"name": "leaderboard by war and side", "collection": "war_leaderboards", "filter": {"war_id": "w", "side": "all"}},
+    {"name": "unit membership by user", "collection": "military_members", "filter": {"user_id": {"$in": ["u"]}}},
+    {"name": "members of a unit", "collection": "military_members", "filter": {"military_unit_id": "m"}},
+    {"name": "units by total damage", "collection": "military_units", "filter": {},
+     "sort": [("total_damage", DESCENDING), ("id", ASCENDING)]},
+    {"name": "party membership by user", "collection": "party_members", "filter": {"user_id": {"$in": ["u"]}}},
+    {"name": "members of a party", "collection": "party_members", "filter": {"party_id": "p"}},
+    {"name": "recent election entries of a party", "collection": "elections",
+     "filter": {"party_id": "p", "started_at": {"$gte": datetime(2024, 1, 1)}}},
+    {"name": "recent settled proposals of a party", "collection": "proposals",
+     "filter": {"party_id": "p", "created_at": {"$gte": datetime(2024, 1, 1)}, "status": {"$in": ["passed", "rejected"]}}},
+    {"name": "entries of a race", "collection": "elections", "filter": {"race_id": "r"}},
+    {"name": "due elections", "collection": "elections",
+     "filter": {"status": "active", "ends_at": {"$lte": datetime(2024, 1, 1)}}},
+    {"name": "due proposals", "collection": "proposals",
+     "filter": {"status": "active", "voting_ends_at": {"$lte": datetime(2024, 1, 1)}}},
+    {"name": "votes of races", "collection": "votes", "filter": {"race_id": {"$in": ["r"]}}},
+    {"name": "votes of proposals", "collection": "votes", "filter": {"proposal_id": {"$in": ["p"]}}},
+]
+
+
+async def _unique_military_member_user(database) -> None:
+    """Drop the plain military_members user_id_1 index so it can be recreated as unique"""
+    collection = database.military_members
+    index = (await collection.index_information()).get("user_id_1")
+    if index is None or index.get("unique"):
+        return
+    duplicates = await collection.aggregate([
+        {"$group": {"_id": "$user_id", "units": {"$sum": 1}}},
+        {"$match": {"units": {"$gt": 1}}},
+        {"$limit": 10}
+    ]).to_list(10)
+    if duplicates:
+        raise RuntimeError(
+            "military_members has users in several units, resolve before user_id can be unique: "
+            + ", ".join(str(row["_id"]) for row in duplicates)
+        )
+    await collection.drop_index("user_id_1")
+    logger.info("Dropped military_members.user_id_1 to recreate it as unique")
+
+
+# Collection -> step that must run before its INDEX_SPEC entry is created.
+# Each step checks the current indexes, so running it again is a no-op.
+INDEX_MIGRATIONS = {
+    "military_members": _unique_military_member_user,
+}
+
+
+async def ensure_indexes(database) -> List[str]:
+    """Create every index in INDEX_SPEC; returns the collections that failed"""
+    failed = []
+    # One collection's conflict must not leave the invariants of the others unenforced
+    for collection, models in INDEX_SPEC.items():
+        try:
+            migration = INDEX_MIGRATIONS.get(collection)
+            if migration is not None:
+                await migration(database)
+            await database[collection].create_indexes(models)
+        except Exception as e:
+            logger.error(f"Error creating indexes on {collection}: {e}")
+            failed.append(collection)
+    return failed
+
+
+def _plan_stages(plan: dict):
+    """Yield every stage name in an explain() plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def verify_indexes(database) -> List[dict]:
+    """Explain every service query and report its winning plan stages"""
+    results = []
+    for query in SERVICE_QUERIES:
+        cursor = database[query["collection"]].find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        explain = await cursor.explain()
+        stages = list(_plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+        results.append({
+            "name": query["name"],
+            "collection": query["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages
+        })
+    return results
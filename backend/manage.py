@@ -0,0 +1,214 @@
+"""
+Europa backend management commands.
+
+    cd backend && python manage.py --help
+"""
+import asyncio
+import json
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from database.connection import connect_to_mongo, close_mongo_connection, get_database  # noqa: E402
+from database.indexes import verify_indexes  # noqa: E402
+from pymongo import UpdateOne  # noqa: E402
+from services.market_service import build_search_terms  # noqa: E402
+from services.production_service import production_service  # noqa: E402
+from services.war_scheduler import war_scheduler  # noqa: E402
+from services.war_service import war_service  # noqa: E402
+from services.war_counters import war_counters, WAR_COUNTER_SHARDS  # noqa: E402
+from services.participation_rollup import participation_rollup  # noqa: E402
+from services.training_service import training_service  # noqa: E402
+from services.voting_service import voting_service  # noqa: E402
+from services.party_service import party_service  # noqa: E402
+from services.economy_simulator import EconomySnapshot, SimulationParams, simulate  # noqa: E402
+
+cli = typer.Typer(help="Europa backend management commands")
+
+
+@cli.callback()
+def main():
+    """Europa backend management commands"""
+
+
+async def _with_database(func):
+    await connect_to_mongo()
+    try:
+        return await func(await get_database())
+    finally:
+        await close_mongo_connection()
+
+
+@cli.command("verify-indexes")
+def verify_indexes_command():
+    """Explain every service query and fail if any plan uses a COLLSCAN"""
+    results = asyncio.run(_with_database(verify_indexes))
+
+    failures = 0
+    for result in results:
+        marker = "FAIL" if result["collscan"] else " ok "
+        typer.echo(f"[{marker}] {result['collection']:<22} {result['name']:<32} {' > '.join(result['stages'])}")
+        failures += result["collscan"]
+
+    if failures:
+        typer.echo(f"{failures} queries fall back to a collection scan", err=True)
+        raise typer.Exit(code=1)
+    typer.echo(f"All {len(results)} service queries are index-backed")
+
+
+@cli.command("backfill-search-terms")
+def backfill_search_terms_command(batch_size: int = typer.Option(1000, help="Listings per bulk_write")):
+    """Populate search_terms on market listings created before indexed search"""
+    async def backfill(db):
+        updated = 0
+        batch = []
+        cursor = db.market_items.find({"search_terms": {"$exists": False}}, {"id": 1, "name": 1})
+        async for item in cursor:
+            batch.append(UpdateOne({"id": item["id"]}, {"$set": {"search_terms": build_search_terms(item["name"])}}))
+            if len(batch) >= batch_size:
+                updated += (await db.market_items.bulk_write(batch, ordered=False)).modified_count
+                batch = []
+        if batch:
+            updated += (await db.market_items.bulk_write(batch, ordered=False)).modified_count
+        return updated
+
+    updated = asyncio.run(_with_database(backfill))
+    typer.echo(f"Backfilled search_terms on {updated} listings")
+
+
+@cli.command("production-tick")
+def production_tick_command():
+    """Run one company production tick now"""
+    tick = asyncio.run(_with_database(lambda db: production_service.run_tick()))
+    typer.echo(
+        f"{tick['companies_scanned']} companies scanned, {tick['companies_produced']} produced, "
+        f"{tick['coins_credited']} coins credited in {tick['seconds']:.2f}s "
+        f"({tick['companies_per_second']:.0f} companies/s)"
+    )
+
+
+@cli.command("war-scheduler")
+def war_scheduler_command():
+    """Run one war scheduler pass: close due rounds and finish expired wars"""
+    result = asyncio.run(_with_database(lambda db: war_scheduler.run_once()))
+    typer.echo(
+        f"{result['initialized']} wars initialized, {result['rounds_closed']} rounds closed, "
+        f"{result['wars_finished']} wars finished"
+    )
+
+
+@cli.command("seed-wars")
+def seed_wars_command():
+    """Insert the demo wars if there are no active wars"""
+    inserted = asyncio.run(_with_database(lambda db: war_service.seed_demo_wars()))
+    typer.echo(f"Seeded {inserted} demo wars" if inserted else "Active wars already exist; nothing seeded")
+
+
+@cli.command("war-counters")
+def war_counters_command(
+    war_id: str = typer.Argument(..., help="War id"),
+    shards: int = typer.Option(WAR_COUNTER_SHARDS, help="Counter shards for the war; 0 folds them back into the war document")
+):
+    """Switch a war's damage counters between its own document and N shards"""
+    if shards < 0:
+        raise typer.BadParameter("shards must be 0 or more")
+    result = asyncio.run(_with_database(lambda db: war_counters.set_shards(war_id, shards)))
+    if not result["found"]:
+        typer.echo(f"War {war_id} not found", err=True)
+        raise typer.Exit(code=1)
+    if shards:
+        typer.echo(f"War {war_id} now counts damage across {shards} shards")
+    else:
+        typer.echo(f"War {war_id} counts damage on its own document ({result['folded']} shards folded)")
+
+
+@cli.command("rollup-participation")
+def rollup_participation_command():
+    """Summarize, archive and delete battle_participation of finished wars"""
+    result = asyncio.run(_with_database(lambda db: participation_rollup.run_once()))
+    typer.echo(f"Rolled up {result['rows']} participation rows from {result['wars']} finished wars")
+
+
+@cli.command("training-sweep")
+def training_sweep_command():
+    """Complete every training job that is past its completes_at"""
+    completed = asyncio.run(_with_database(lambda db: training_service.sweep()))
+    typer.echo(f"Completed {completed} training jobs")
+
+
+@cli.command("close-votes")
+def close_votes_command():
+    """Settle every election and proposal past its deadline"""
+    result = asyncio.run(_with_database(lambda db: voting_service.close_due()))
+    typer.echo(f"Settled {result['races']} elections and {result['proposals']} proposals")
+
+
+@cli.command("recompute-parties")
+def recompute_parties_command():
+    """Recompute popularity and members_count of every party"""
+    updated = asyncio.run(_with_database(lambda db: party_service.recompute()))
+    typer.echo(f"Recomputed {updated} parties")
+
+
+@cli.command("economy-snapshot")
+def economy_snapshot_command(path: str = typer.Argument(..., help="Output .npz file")):
+    """Save users, companies and listings as a columnar snapshot for offline simulation"""
+    snapshot = asyncio.run(_with_database(EconomySnapshot.load))
+    snapshot.save(path)
+    typer.echo(
+        f"Saved {snapshot.users['coins'].size} users, {snapshot.companies['owner'].size} companies "
+        f"and {snapshot.listings['seller'].size} listings to {path}"
+    )
+
+
+@cli.command("simulate")
+def simulate_command(
+    days: int = typer.Option(30, help="Days to simulate"),
+    snapshot_path: Optional[str] = typer.Option(None, "--snapshot", help="Snapshot .npz; reads the live database if omitted"),
+    revenue_multiplier: float = typer.Option(1.0, help="Scale every company's daily revenue"),
+    productivity_delta: float = typer.Option(0.0, help="Add to every company's productivity"),
+    work_shifts_per_day: float = typer.Option(1.0, help="Average work shifts per company per day"),
+    market_turnover: float = typer.Option(0.05, help="Share of each listing sold per day"),
+    price_multiplier: float = typer.Option(1.0, help="Scale every listing price"),
+    type_rule: List[str] = typer.Option([], help="Override a company type rule, e.g. Steel=180:10"),
+    by_day: bool = typer.Option(False, help="Include per-day series in the output")
+):
+    """Advance the economy N days in memory and print balance metrics as JSON"""
+    type_rules = None
+    if type_rule:
+        type_rules = {}
+        for rule in type_rule:
+            keyword, _, values = rule.partition("=")
+            revenue, _, max_employees = values.partition(":")
+            if not keyword or not revenue.isdigit() or not max_employees.isdigit():
+                raise typer.BadParameter(f"{rule!r} is not KEYWORD=REVENUE:MAX_EMPLOYEES", param_hint="--type-rule")
+            type_rules[keyword] = (int(revenue), int(max_employees))
+
+    params = SimulationParams(
+        days=days,
+        revenue_multiplier=revenue_multiplier,
+        productivity_delta=productivity_delta,
+        work_shifts_per_day=work_shifts_per_day,
+        market_turnover=market_turnover,
+        price_multiplier=price_multiplier,
+        type_rules=type_rules
+    )
+    if snapshot_path:
+        snapshot = EconomySnapshot.from_file(snapshot_path)
+    else:
+        snapshot = asyncio.run(_with_database(EconomySnapshot.load))
+
+    result = simulate(snapshot, params)
+    if not by_day:
+        result.pop("coin_supply_by_day")
+        result.pop("gold_traded_by_day")
+    typer.echo(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    cli()
@@ -20,6 +20,7 @@ class MarketItem(BaseModel):
     seller_id: str
     seller_name: str
     icon: str = Field(default="📦")
+    search_terms: List[str] = Field(default_factory=list)  # lowercase full name and words, for prefix search
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class MarketItemResponse(BaseModel):
@@ -43,6 +44,9 @@ class MarketTransaction(BaseModel):
     quantity: int
     price_per_unit: float
     total_price: float
+    quality: Optional[int] = None
+    buy_order_id: Optional[str] = None
+    sell_order_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class BuyRequest(BaseModel):
@@ -64,4 +68,35 @@ class CurrencyExchange(BaseModel):
     amount: float
     rate: float
     total_received: float
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class OrderCreate(BaseModel):
+    item_name: str = Field(..., min_length=1, max_length=100)
+    quality: int = Field(..., ge=1, le=5, description="Quality level 1-5")
+    side: str = Field(..., pattern="^(buy|sell)$", description="buy or sell")
+    price: float = Field(..., gt=0)
+    quantity: int = Field(..., gt=0)
+
+class MarketOrder(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    item_name: str
+    quality: int
+    side: str  # buy, sell
+    price: float
+    quantity: int
+    remaining: int
+    status: str = Field(default="open")  # open, filled, cancelled
+    sequence: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class MarketOrderResponse(BaseModel):
+    id: str
+    item_name: str
+    quality: int
+    side: str
+    price: float
+    quantity: int
+    remaining: int
+    status: str
+    created_at: datetime
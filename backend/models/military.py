@@ -16,6 +16,7 @@ class MilitaryUnit(BaseModel):
     max_members: int = Field(default=50)
     level: int = Field(default=1)
     battles_fought: int = Field(default=0)
+    total_damage: int = Field(default=0)  # sum of members' total_damage, see services/military_service.py
     victories: int = Field(default=0)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -38,17 +39,31 @@ class War(BaseModel):
     defender_flag: str
     attacker_damage: int = Field(default=0)
     defender_damage: int = Field(default=0)
-    participants_count: int = Field(default=0)
+    participants_count: int = Field(default=0)  # distinct fighters, see services/participants.py
+    participants_sketch: Optional[dict] = None
+    participants_version: int = Field(default=0)
     status: str = Field(default="active")  # active, finished
-    winner: Optional[str] = None
+    winner: Optional[str] = None  # attacker or defender
     started_at: datetime = Field(default_factory=datetime.utcnow)
     ends_at: datetime
+    finished_at: Optional[datetime] = None
+    # Round state, initialized and advanced by the war scheduler
+    round_number: int = Field(default=1)
+    next_round_at: Optional[datetime] = None
+    round_attacker_damage_start: int = Field(default=0)
+    round_defender_damage_start: int = Field(default=0)
+    attacker_rounds: int = Field(default=0)
+    defender_rounds: int = Field(default=0)
+    # Damage counter shards (services/war_counters.py); 0 keeps counters on this document
+    counter_shards: int = Field(default=0)
+    # Set once battle_participation has been rolled up and archived
+    participation_rolled_up_at: Optional[datetime] = None
 
 class BattleRound(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     war_id: str
     round_number: int
-    winner_side: str  # attacker or defender
+    winner_side: str  # attacker, defender or draw
     damage_dealt: int
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -59,4 +74,25 @@ class BattleParticipation(BaseModel):
     side: str  # attacker or defender
     damage_dealt: int
     rounds_participated: int = Field(default=1)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class LeaderboardEntry(BaseModel):
+    user_id: str
+    username: Optional[str] = None
+    damage_dealt: int
+    hits: int
+
+class WarLeaderboard(BaseModel):
+    war_id: str
+    side: str  # attacker, defender or all
+    entries: List[LeaderboardEntry] = Field(default_factory=list)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class BattleParticipationSummary(BaseModel):
+    war_id: str
+    user_id: str
+    side: str  # attacker or defender
+    damage_dealt: int
+    hits: int
+    won: bool
+    finished_at: datetime
@@ -24,8 +24,16 @@ class PartyMember(BaseModel):
     role: str = Field(default="Member")  # Member, Officer, Leader
     joined_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ElectionCreate(BaseModel):
+    election_type: str = Field(..., description="Presidential, Congressional, Regional")
+    country: str
+    candidate_ids: List[str] = Field(..., min_length=2, max_length=50)
+    duration_hours: float = Field(default=24, gt=0, le=24 * 14)
+
 class Election(BaseModel):
+    # One candidate's entry; entries of the same race share race_id
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    race_id: str
     election_type: str = Field(description="Presidential, Congressional, Regional")
     country: str
     candidate_id: str
@@ -37,6 +45,11 @@ class Election(BaseModel):
     started_at: datetime = Field(default_factory=datetime.utcnow)
     ends_at: datetime
 
+class ProposalCreate(BaseModel):
+    title: str = Field(..., min_length=5, max_length=200)
+    description: str = Field(..., max_length=1000)
+    duration_hours: float = Field(default=24, gt=0, le=24 * 14)
+
 class Proposal(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     title: str = Field(..., min_length=5, max_length=200)
@@ -54,6 +67,10 @@ class Vote(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     proposal_id: Optional[str] = None
     election_id: Optional[str] = None
+    race_id: Optional[str] = None
     voter_id: str
     vote_type: str = Field(description="for, against, candidate_id")
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class VoteRequest(BaseModel):
+    vote_type: str = Field(description="for or against on proposals, the candidate entry id in elections")
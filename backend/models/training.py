@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+import uuid
+
+class TrainingJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    skill: str  # strength, leadership or charisma
+    training_type: str  # basic, advanced or elite
+    cost: int
+    strength_gain: int
+    xp: int
+    status: str = Field(default="active")  # active, completed
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    completes_at: datetime
+    completed_at: Optional[datetime] = None
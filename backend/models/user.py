@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 import uuid
 
@@ -33,6 +33,8 @@ class User(BaseModel):
     level: int = Field(default=1)
     avatar: Optional[str] = Field(default="https://images.unsplash.com/photo-1472099645785-5658abf4ff4e?w=40&h=40&fit=crop&crop=face")
     stats: UserStats = Field(default_factory=UserStats)
+    skills: Dict[str, int] = Field(default_factory=dict)  # training XP per skill
+    training_completes_at: Optional[datetime] = None  # when the active training job is due
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
 
@@ -46,6 +48,7 @@ class UserResponse(BaseModel):
     level: int
     avatar: Optional[str]
     stats: UserStats
+    training_completes_at: Optional[datetime] = None
     created_at: datetime
     last_login: Optional[datetime] = None
 
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from typing import List
 from models.company import CompanyCreate, CompanyResponse, CompanyUpdate
 from services.company_service import company_service
@@ -20,7 +21,8 @@ async def get_user_companies(
     current_user: UserResponse = Depends(get_current_user_dependency)
 ):
     """Get all companies owned by user"""
-    return await company_service.get_user_companies(current_user.id)
+    # Rows are projected to CompanyResponse's fields, so skip response_model re-validation
+    return ORJSONResponse(await company_service.get_user_companies(current_user.id))
 
 @router.get("/{company_id}", response_model=CompanyResponse)
 async def get_company(
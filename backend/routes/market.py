@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
-from models.market import MarketItemCreate, MarketItemResponse, BuyRequest, ExchangeRate
+from models.market import MarketItemCreate, MarketItemResponse, BuyRequest, ExchangeRate, OrderCreate, MarketOrderResponse
 from services.market_service import market_service
+from services.order_book import order_book_service
+from services.pagination import NEXT_CURSOR_HEADER
 from routes.auth import get_current_user_dependency
 from models.user import UserResponse
 
@@ -20,10 +22,14 @@ async def get_market_items(
     category: Optional[str] = Query(None, description="Filter by category"),
     search: Optional[str] = Query(None, description="Search in item names"),
     limit: int = Query(50, ge=1, le=100, description="Number of items to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
     current_user: UserResponse = Depends(get_current_user_dependency)
 ):
     """Get market items with optional filtering"""
-    return await market_service.get_market_items(category, search, limit)
+    body, next_cursor = await market_service.get_market_items_page(category, search, limit, cursor)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    # Body is already serialized from rows projected to MarketItemResponse, so skip response_model re-validation
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post("/buy")
 async def buy_item(
@@ -33,12 +39,44 @@ async def buy_item(
     """Buy item from market"""
     return await market_service.buy_item(buy_request, current_user.id)
 
+@router.post("/orders")
+async def place_order(
+    order_data: OrderCreate,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Place a buy or sell order on the order book"""
+    return await order_book_service.place_order(order_data, current_user.id)
+
+@router.delete("/orders/{order_id}", response_model=MarketOrderResponse)
+async def cancel_order(
+    order_id: str,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Cancel an open order"""
+    return await order_book_service.cancel_order(order_id, current_user.id)
+
+@router.get("/book")
+async def get_order_book(
+    item_name: str = Query(..., description="Item name"),
+    quality: int = Query(..., ge=1, le=5, description="Quality level 1-5"),
+    levels: int = Query(10, ge=1, le=100, description="Price levels per side"),
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Best bid/ask and depth for one item and quality"""
+    return order_book_service.get_book(item_name, quality, levels)
+
 @router.get("/inventory")
 async def get_user_inventory(
+    limit: int = Query(100, ge=1, le=500, description="Number of items to return"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    response: Response = None,
     current_user: UserResponse = Depends(get_current_user_dependency)
 ):
     """Get user's inventory"""
-    return await market_service.get_user_inventory(current_user.id)
+    inventory, next_cursor = await market_service.get_user_inventory(current_user.id, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return inventory
 
 @router.get("/exchange-rates", response_model=List[ExchangeRate])
 async def get_exchange_rates():
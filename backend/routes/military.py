@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from routes.auth import get_current_user_dependency
+from models.user import UserResponse
+from models.military import MilitaryUnitCreate
+from services.military_service import military_service
+
+router = APIRouter(prefix="/military", tags=["Military"])
+
+@router.get("/units", response_model=List[dict])
+async def get_units(
+    limit: int = Query(50, ge=1, le=100, description="Number of units to return"),
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get military units with the most total damage"""
+    return await military_service.list_units(limit)
+
+@router.post("/units")
+async def create_unit(
+    unit_data: MilitaryUnitCreate,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Found a military unit"""
+    return await military_service.create_unit(unit_data, current_user)
+
+@router.get("/units/mine")
+async def get_my_unit(
+    limit: int = Query(50, ge=1, le=100, description="Number of members to return"),
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get the current user's unit and their position in it"""
+    return await military_service.get_my_unit(current_user, limit)
+
+@router.get("/units/{unit_id}")
+async def get_unit(
+    unit_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100, description="Number of members to return"),
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get a unit overview with its members ranked by damage"""
+    return await military_service.get_overview(unit_id, offset, limit)
+
+@router.post("/units/{unit_id}/join")
+async def join_unit(
+    unit_id: str,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Join a military unit"""
+    return await military_service.join_unit(unit_id, current_user)
+
+@router.post("/units/leave")
+async def leave_unit(
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Leave the current military unit"""
+    return await military_service.leave_unit(current_user)
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from routes.auth import get_current_user_dependency
+from models.user import UserResponse
+from models.politics import ElectionCreate, PoliticalPartyCreate, ProposalCreate, VoteRequest
+from services.party_service import party_service
+from services.voting_service import voting_service
+
+router = APIRouter(prefix="/politics", tags=["Politics"])
+
+@router.get("/parties", response_model=List[dict])
+async def get_parties(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100, description="Number of parties to return"),
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get parties ranked by popularity"""
+    return party_service.list_parties(offset, limit)
+
+@router.post("/parties")
+async def create_party(
+    party_data: PoliticalPartyCreate,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Found a political party"""
+    return await party_service.create_party(party_data, current_user)
+
+@router.post("/parties/leave")
+async def leave_party(
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Leave the current party"""
+    return await party_service.leave_party(current_user)
+
+@router.get("/parties/{party_id}")
+async def get_party(
+    party_id: str,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get a party with its popularity and rank"""
+    return await party_service.get_party(party_id)
+
+@router.post("/parties/{party_id}/join")
+async def join_party(
+    party_id: str,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Join a political party"""
+    return await party_service.join_party(party_id, current_user)
+
+@router.post("/elections")
+async def create_election(
+    election_data: ElectionCreate,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Open an election between the given candidates"""
+    return await voting_service.create_election(election_data)
+
+@router.get("/elections/{race_id}")
+async def get_election(
+    race_id: str,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get live standings of an election"""
+    return await voting_service.get_standings(race_id)
+
+@router.post("/elections/{race_id}/vote")
+async def vote_in_election(
+    race_id: str,
+    vote: VoteRequest,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Vote for a candidate entry; one vote per user per election"""
+    return await voting_service.vote_in_election(race_id, vote.vote_type, current_user)
+
+@router.post("/proposals")
+async def create_proposal(
+    proposal_data: ProposalCreate,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Put a proposal to a vote"""
+    return await voting_service.create_proposal(proposal_data, current_user)
+
+@router.get("/proposals/{proposal_id}")
+async def get_proposal(
+    proposal_id: str,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get a proposal with live vote counts"""
+    return await voting_service.get_proposal(proposal_id)
+
+@router.post("/proposals/{proposal_id}/vote")
+async def vote_on_proposal(
+    proposal_id: str,
+    vote: VoteRequest,
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Vote for or against a proposal; one vote per user per proposal"""
+    return await voting_service.vote_on_proposal(proposal_id, vote.vote_type, current_user)
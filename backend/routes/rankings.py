@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from routes.auth import get_current_user_dependency
+from models.user import UserResponse
+from services.rankings import rankings_service
+
+router = APIRouter(prefix="/rankings", tags=["Rankings"])
+
+@router.get("/me")
+async def get_my_ranks(
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get the current user's rank by level, damage and wealth"""
+    return await rankings_service.get_user_ranks(current_user.id)
+
+@router.get("/{metric}", response_model=List[dict])
+async def get_ranking(
+    metric: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100, description="Number of players to return"),
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get the top players by level, damage or wealth"""
+    return rankings_service.get_top(metric, offset, limit)
+
+@router.get("/{metric}/around", response_model=List[dict])
+async def get_ranking_around(
+    metric: str,
+    user_id: Optional[str] = Query(None, description="Defaults to the current user"),
+    radius: int = Query(5, ge=0, le=50, description="Players to show on either side"),
+    current_user: UserResponse = Depends(get_current_user_dependency)
+):
+    """Get the players ranked just above and below a player"""
+    return await rankings_service.get_neighbours(metric, user_id or current_user.id, radius)
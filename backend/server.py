@@ -1,4 +1,5 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
@@ -6,23 +7,43 @@ import logging
 from pathlib import Path
 from contextlib import asynccontextmanager
 
+ROOT_DIR = Path(__file__).parent
+# Load .env before importing services, which read their settings at import time
+load_dotenv(ROOT_DIR / '.env')
+
 # Import database connection
-from database.connection import connect_to_mongo, close_mongo_connection
+from database.connection import connect_to_mongo, close_mongo_connection  # noqa: E402
 
 # Import routes
-from routes.auth import router as auth_router
-from routes.companies import router as companies_router
-from routes.market import router as market_router
-from routes.wars import router as wars_router
-from routes.training import router as training_router
+from routes.auth import router as auth_router  # noqa: E402
+from routes.companies import router as companies_router  # noqa: E402
+from routes.market import router as market_router  # noqa: E402
+from routes.wars import router as wars_router  # noqa: E402
+from routes.training import router as training_router  # noqa: E402
+from routes.politics import router as politics_router  # noqa: E402
+from routes.military import router as military_router  # noqa: E402
+from routes.rankings import router as rankings_router  # noqa: E402
 
 # Import services
-from services.auth_service import auth_service
-from services.company_service import company_service
-from services.market_service import market_service
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+from services.auth_service import auth_service  # noqa: E402
+from services.company_service import company_service  # noqa: E402
+from services.market_service import market_service  # noqa: E402
+from services.order_book import order_book_service  # noqa: E402
+from services.production_service import production_service  # noqa: E402
+from services.damage_aggregator import damage_aggregator  # noqa: E402
+from services.battle_feed import battle_feed  # noqa: E402
+from services.war_scheduler import war_scheduler  # noqa: E402
+from services.war_service import war_service, SEED_DEMO_WARS  # noqa: E402
+from services.active_wars import active_wars_view  # noqa: E402
+from services.war_leaderboard import war_leaderboards  # noqa: E402
+from services.war_counters import war_counters  # noqa: E402
+from services.participants import participant_tracker  # noqa: E402
+from services.participation_rollup import participation_rollup  # noqa: E402
+from services.training_service import training_service  # noqa: E402
+from services.voting_service import voting_service  # noqa: E402
+from services.military_service import military_service  # noqa: E402
+from services.party_service import party_service  # noqa: E402
+from services.rankings import rankings_service  # noqa: E402
 
 # Configure logging
 logging.basicConfig(
@@ -35,9 +56,38 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    if SEED_DEMO_WARS:
+        await war_service.seed_demo_wars()
+    await order_book_service.start()
+    await production_service.start()
+    await damage_aggregator.start()
+    await war_leaderboards.start()
+    await participant_tracker.start()
+    await battle_feed.start()
+    await war_scheduler.start()
+    await participation_rollup.start()
+    await training_service.start()
+    await voting_service.start()
+    await military_service.start()
+    await party_service.start()
+    await rankings_service.start()
     logger.info("Europa backend started successfully!")
     yield
     # Shutdown
+    await rankings_service.stop()
+    await party_service.stop()
+    await military_service.stop()
+    await voting_service.stop()
+    await training_service.stop()
+    await participation_rollup.stop()
+    await war_scheduler.stop()
+    await battle_feed.stop()
+    await damage_aggregator.stop()
+    await war_leaderboards.stop()
+    await participant_tracker.stop()
+    await production_service.stop()
+    await order_book_service.stop()
+    auth_service.password_executor.shutdown()
     await close_mongo_connection()
     logger.info("Europa backend shutdown complete")
 
@@ -46,7 +96,8 @@ app = FastAPI(
     title="Europa API",
     description="Backend API for Europa - Political & Military Strategy Game",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -56,6 +107,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Create a router with the /api prefix
@@ -74,12 +126,39 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@api_router.get("/metrics")
+async def metrics():
+    """In-process cache and worker counters"""
+    return {
+        "principal_cache": auth_service.principal_cache.stats(),
+        "password_executor": auth_service.password_executor.stats(),
+        "order_book": order_book_service.stats(),
+        "listing_cache": market_service.listing_cache_stats(),
+        "production": production_service.stats(),
+        "damage_aggregator": damage_aggregator.stats(),
+        "battle_feed": battle_feed.stats(),
+        "war_scheduler": war_scheduler.stats(),
+        "active_wars_cache": active_wars_view.stats(),
+        "war_leaderboards": war_leaderboards.stats(),
+        "war_counters": war_counters.stats(),
+        "participants": participant_tracker.stats(),
+        "participation_rollup": participation_rollup.stats(),
+        "training": training_service.stats(),
+        "voting": voting_service.stats(),
+        "military": military_service.stats(),
+        "parties": party_service.stats(),
+        "rankings": rankings_service.stats()
+    }
+
 # Include all routers
 api_router.include_router(auth_router)
 api_router.include_router(companies_router)
 api_router.include_router(market_router)
 api_router.include_router(wars_router)
 api_router.include_router(training_router)
+api_router.include_router(politics_router)
+api_router.include_router(military_router)
+api_router.include_router(rankings_router)
 
 # Include the router in the main app
 app.include_router(api_router)
\ No newline at end of file
@@ -0,0 +1,173 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from database.connection import get_database
+from services.cache import LRUCache
+from services.damage_aggregator import damage_aggregator
+from services.pagination import keyset_filter, next_page
+from services.war_service import war_balance
+from services.war_counters import war_counters
+from services.participants import participant_tracker
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_WARS_CACHE_SIZE = int(os.environ.get("ACTIVE_WARS_CACHE_SIZE", "100"))
+ACTIVE_WARS_CACHE_TTL = float(os.environ.get("ACTIVE_WARS_CACHE_TTL", "5"))
+
+WAR_VIEW_PROJECTION = {
+    "_id": 0, "id": 1, "attacker_country": 1, "defender_country": 1, "region": 1, "attacker_flag": 1,
+    "defender_flag": 1, "attacker_damage": 1, "defender_damage": 1, "participants_count": 1,
+    "started_at": 1, "ends_at": 1
+}
+
+
+def _time_left(ends_at: datetime) -> str:
+    time_left = max(ends_at - datetime.utcnow(), timedelta(0))
+    hours = int(time_left.total_seconds() // 3600)
+    minutes = int((time_left.total_seconds() % 3600) // 60)
+    return f"{hours}h {minutes}m"
+
+
+class ActiveWarsView:
+    """Short-TTL cache of the GET /wars payload.
+
+    Pages are cached as lists of war ids and the computed rows are cached
+    per war, so a war shown on several pages is stored once. Recorded hits
+    patch cached rows in place instead of expiring them; only timeLeft is
+    computed per request, along with participants from the distinct-fighter
+    tracker. Closed rounds and finished wars invalidate the
+    whole view. Concurrent misses for the same page share one load.
+    """
+
+    def __init__(self, maxsize: int = ACTIVE_WARS_CACHE_SIZE, ttl: float = ACTIVE_WARS_CACHE_TTL):
+        # (limit, cursor) -> (war ids, next cursor)
+        self.pages = LRUCache(maxsize=maxsize, ttl=ttl)
+        # war id -> (row, ends_at)
+        self.rows = LRUCache(maxsize=maxsize * 100, ttl=ttl)
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        # Bumped on invalidation so loads that started earlier don't cache stale pages
+        self._generation = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.hits_applied = 0
+        damage_aggregator.add_listener(self._on_hit)
+
+    def invalidate(self) -> None:
+        """Drop every cached page and row"""
+        self._generation += 1
+        self.pages.clear()
+        self.rows.clear()
+
+    def _on_hit(self, war_id: str, user_id: str, side: str, damage: int, hits: int) -> None:
+        cached = self.rows.get(war_id)
+        if cached is None:
+            return
+        row = cached[0]
+        row[f"{side}Damage"] += damage
+        balance = war_balance(row["attackerDamage"], row["defenderDamage"])
+        row["totalDamage"] = balance["totalDamage"]
+        row["status"] = balance["status"]
+        self.hits_applied += hits
+
+    @staticmethod
+    def _render(entries: List[tuple]) -> List[dict]:
+        wars = []
+        for row, ends_at in entries:
+            war = dict(row)
+            war["timeLeft"] = _time_left(ends_at)
+            participants = participant_tracker.count(war["id"])
+            if participants is not None:
+                war["participants"] = participants
+            wars.append(war)
+        return wars
+
+    async def get_page(self, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of active wars, newest first, and the cursor for the next"""
+        key = (limit, cursor)
+        cached = self.pages.get(key)
+        if cached is not None:
+            war_ids, next_cursor = cached
+            entries = [self.rows.get(war_id) for war_id in war_ids]
+            if None not in entries:
+                return self._render(entries), next_cursor
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(limit, cursor))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller disconnecting doesn't cancel the load for everyone else
+        entries, next_cursor = await asyncio.shield(task)
+        return self._render(entries), next_cursor
+
+    async def _load(self, limit: int, cursor: Optional[str]) -> Tuple[List[tuple], Optional[str]]:
+        db = await get_database()
+        generation = self._generation
+        self.loads += 1
+
+        query = {"status": "active"}
+        if cursor:
+            query.update(keyset_filter("started_at", cursor))
+        war_docs = await db.wars.find(query, WAR_VIEW_PROJECTION).sort([("started_at", -1), ("id", -1)]).to_list(limit + 1)
+        war_docs, next_cursor = next_page(war_docs, limit, "started_at")
+        await war_counters.apply_totals(war_docs)
+
+        # Closed rounds for the whole page in one query
+        rounds_by_war = {war_doc["id"]: [] for war_doc in war_docs}
+        rounds_cursor = db.battle_rounds.find(
+            {"war_id": {"$in": list(rounds_by_war)}},
+            {"_id": 0, "war_id": 1, "round_number": 1, "winner_side": 1, "damage_dealt": 1}
+        ).sort([("war_id", 1), ("round_number", 1)])
+        async for round_doc in rounds_cursor:
+            rounds_by_war[round_doc["war_id"]].append({
+                "round": round_doc["round_number"],
+                "winner": round_doc["winner_side"],
+                "damage": round_doc["damage_dealt"]
+            })
+
+        entries = []
+        for war_doc in war_docs:
+            # Hits still buffered in the aggregator were already announced to _on_hit
+            pending = damage_aggregator.pending_war_increments(war_doc["id"])
+            attacker_damage = war_doc["attacker_damage"] + pending.get("attacker_damage", 0)
+            defender_damage = war_doc["defender_damage"] + pending.get("defender_damage", 0)
+            balance = war_balance(attacker_damage, defender_damage)
+            row = {
+                "id": war_doc["id"],
+                "attacker": war_doc["attacker_country"],
+                "defender": war_doc["defender_country"],
+                "region": war_doc["region"],
+                "attackerFlag": war_doc["attacker_flag"],
+                "defenderFlag": war_doc["defender_flag"],
+                "attackerDamage": attacker_damage,
+                "defenderDamage": defender_damage,
+                "totalDamage": balance["totalDamage"],
+                "participants": war_doc["participants_count"],
+                "timeLeft": None,
+                "status": balance["status"],
+                "battleRounds": rounds_by_war[war_doc["id"]]
+            }
+            entries.append((row, war_doc["ends_at"]))
+
+        if self._generation == generation:
+            for entry in entries:
+                self.rows.set(entry[0]["id"], entry)
+            self.pages.set((limit, cursor), ([entry[0]["id"] for entry in entries], next_cursor))
+        return entries, next_cursor
+
+    def stats(self) -> dict:
+        stats = self.pages.stats()
+        stats.update({
+            "rows": len(self.rows),
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "hits_applied": self.hits_applied
+        })
+        return stats
+
+# Create global active wars view instance
+active_wars_view = ActiveWarsView()
@@ -1,30 +1,99 @@
 import jwt
 import bcrypt
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Awaitable, Callable, Iterable, List, Optional
 from fastapi import HTTPException, status
 from models.user import User, UserCreate, UserLogin, UserResponse
 from database.connection import get_database
+from services.cache import LRUCache
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
 
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.environ.get("PRINCIPAL_CACHE_TTL", "30"))
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", "4"))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", "64"))
+
+class PasswordExecutor:
+    """Bounded thread pool for bcrypt work, kept off the event loop"""
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, queue_limit: int = PASSWORD_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Jobs running plus jobs waiting for a worker
+        self._pending = 0
+        self.rejected = 0
+
+    async def run(self, func, *args):
+        """Run func in the pool, rejecting work once the queue is full"""
+        if self._pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, please retry"
+            )
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self._pending,
+            "rejected": self.rejected
+        }
 
 class AuthService:
     def __init__(self):
-        pass
+        # Verified principals keyed by user id, so authenticated routes skip the users lookup
+        self.principal_cache = LRUCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+        self.password_executor = PasswordExecutor()
+        self._load_hooks: List[Callable[[UserResponse], Awaitable[UserResponse]]] = []
+        self._invalidate_hooks: List[Callable[[Iterable[str]], None]] = []
+
+    def invalidate_user(self, *user_ids: str) -> None:
+        """Drop cached principals after gold, coins or stats change"""
+        for user_id in user_ids:
+            self.principal_cache.invalidate(user_id)
+        for hook in self._invalidate_hooks:
+            hook(user_ids)
 
-    def hash_password(self, password: str) -> str:
-        """Hash password using bcrypt"""
+    @staticmethod
+    def _hash_password_sync(password: str) -> str:
         salt = bcrypt.gensalt()
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify password against hash"""
+    @staticmethod
+    def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
         return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+    async def hash_password(self, password: str) -> str:
+        """Hash password using bcrypt in the password executor"""
+        return await self.password_executor.run(self._hash_password_sync, password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password against hash in the password executor"""
+        return await self.password_executor.run(self._verify_password_sync, plain_password, hashed_password)
+
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
         to_encode = data.copy()
@@ -78,7 +147,7 @@ class AuthService:
                 )
 
         # Hash password and create user
-        hashed_password = self.hash_password(user_data.password)
+        hashed_password = await self.hash_password(user_data.password)
         
         new_user = User(
             username=user_data.username,
@@ -91,6 +160,8 @@ class AuthService:
         result = await db.users.insert_one(new_user.model_dump())
         
         if result.inserted_id:
+            self.invalidate_user(new_user.id)
+
             # Create access token
             access_token = self.create_access_token(
                 data={"sub": new_user.id, "username": new_user.username}
@@ -117,7 +188,7 @@ class AuthService:
         # Find user by email
         user_doc = await db.users.find_one({"email": login_data.email})
         
-        if not user_doc or not self.verify_password(login_data.password, user_doc["password_hash"]):
+        if not user_doc or not await self.verify_password(login_data.password, user_doc["password_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
@@ -128,6 +199,7 @@ class AuthService:
             {"_id": user_doc["_id"]},
             {"$set": {"last_login": datetime.utcnow()}}
         )
+        self.invalidate_user(user_doc["id"])
 
         # Create access token
         access_token = self.create_access_token(
@@ -163,14 +235,33 @@ class AuthService:
                 detail="Invalid token"
             )
 
+        user = self.principal_cache.get(user_id)
+        if user is not None:
+            return user
+
         user = await self.get_user_by_id(user_id)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
-        
+        for hook in self._load_hooks:
+            user = await hook(user)
+
+        # Don't serve a cached principal past its training deadline, so the next read completes the job
+        ttl = None
+        if user.training_completes_at is not None:
+            ttl = min(self.principal_cache.ttl, max((user.training_completes_at - datetime.utcnow()).total_seconds(), 0))
+        self.principal_cache.set(user_id, user, ttl=ttl)
         return user
 
+    def add_load_hook(self, hook: Callable[[UserResponse], Awaitable[UserResponse]]) -> None:
+        """Run `await hook(user)` on every principal loaded from the database; it returns the user to cache"""
+        self._load_hooks.append(hook)
+
+    def add_invalidate_hook(self, hook: Callable[[Iterable[str]], None]) -> None:
+        """Call hook(user_ids) whenever invalidate_user reports changed users"""
+        self._invalidate_hooks.append(hook)
+
 # Create global auth service instance
 auth_service = AuthService()
\ No newline at end of file
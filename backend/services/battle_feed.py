@@ -0,0 +1,222 @@
+from typing import AsyncIterator, Dict, List, Optional, Set
+from fastapi import HTTPException, status
+from database.connection import get_database
+from services.damage_aggregator import damage_aggregator
+from services.war_service import war_balance
+from services.war_counters import war_counters
+from services.participants import participant_tracker
+import asyncio
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+BATTLE_FEED_FPS = float(os.environ.get("BATTLE_FEED_FPS", "4"))
+BATTLE_FEED_CLIENT_QUEUE = int(os.environ.get("BATTLE_FEED_CLIENT_QUEUE", "8"))
+BATTLE_FEED_RESYNC_INTERVAL = float(os.environ.get("BATTLE_FEED_RESYNC_INTERVAL", "5"))
+BATTLE_FEED_KEEPALIVE = 15.0
+
+TOTALS_FIELDS = ("attacker_damage", "defender_damage", "participants_count")
+TOTALS_PROJECTION = {"_id": 0, "id": 1, **{field: 1 for field in TOTALS_FIELDS}}
+
+
+class _WarChannel:
+    """Live totals and subscriber queues for one war"""
+
+    def __init__(self, war_id: str, totals: dict):
+        self.war_id = war_id
+        self.totals = totals
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.dirty = True
+        self.frame: Optional[bytes] = None
+
+
+class BattleFeed:
+    """Push channel per war with frame-rate coalescing.
+
+    Hits only bump in-memory totals. A single frame loop serializes each
+    changed war once per frame and hands the same bytes to every
+    subscriber. Client queues are bounded; a slow client loses its oldest
+    frames, never the newest.
+
+    Totals are read from the war document while no damage flush can run,
+    plus this process's unflushed hits, so each hit is counted once. Every
+    BATTLE_FEED_RESYNC_INTERVAL seconds open channels are reloaded the same
+    way to pick up hits flushed by other processes.
+    """
+
+    def __init__(self, fps: float = BATTLE_FEED_FPS, client_queue: int = BATTLE_FEED_CLIENT_QUEUE,
+                 resync_interval: float = BATTLE_FEED_RESYNC_INTERVAL):
+        self.frame_interval = 1 / fps
+        self.client_queue = client_queue
+        self.resync_interval = resync_interval
+        self.channels: Dict[str, _WarChannel] = {}
+        self._tasks: List[asyncio.Task] = []
+        self.frames_serialized = 0
+        self.frames_dropped = 0
+        self.resyncs = 0
+        damage_aggregator.add_listener(self._on_hit)
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._frame_loop()),
+            asyncio.create_task(self._resync_loop())
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def _on_hit(self, war_id: str, user_id: str, side: str, damage: int, hits: int) -> None:
+        channel = self.channels.get(war_id)
+        if channel is None:
+            return
+        channel.totals[f"{side}_damage"] += damage
+        channel.dirty = True
+
+    def _serialize(self, channel: _WarChannel) -> bytes:
+        totals = channel.totals
+        balance = war_balance(totals["attacker_damage"], totals["defender_damage"])
+        participants = participant_tracker.count(channel.war_id)
+        payload = {
+            "id": channel.war_id,
+            "attackerDamage": totals["attacker_damage"],
+            "defenderDamage": totals["defender_damage"],
+            "participants": totals["participants_count"] if participants is None else participants,
+            **balance
+        }
+        return f"data: {json.dumps(payload, separators=(',', ':'))}\n\n".encode("utf-8")
+
+    def _publish(self, channel: _WarChannel) -> None:
+        channel.frame = self._serialize(channel)
+        channel.dirty = False
+        self.frames_serialized += 1
+        for queue in channel.subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.frames_dropped += 1
+            queue.put_nowait(channel.frame)
+
+    async def _frame_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.frame_interval)
+            for channel in list(self.channels.values()):
+                if channel.dirty and channel.subscribers:
+                    try:
+                        self._publish(channel)
+                    except Exception as e:
+                        logger.error(f"Error publishing battle frame for war {channel.war_id}: {e}")
+
+    async def _resync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                await self.resync()
+            except Exception as e:
+                logger.error(f"Error resyncing battle feed: {e}")
+
+    async def _read_totals(self, war_ids: List[str]) -> Dict[str, dict]:
+        """Stored totals plus unflushed hits per war; call holding flushes"""
+        db = await get_database()
+        wars = await db.wars.find({"id": {"$in": war_ids}}, TOTALS_PROJECTION).to_list(None)
+        await war_counters.apply_totals(wars, fresh=True)
+        result = {}
+        for war in wars:
+            totals = {field: war.get(field, 0) for field in TOTALS_FIELDS}
+            for field, value in damage_aggregator.pending_war_increments(war["id"]).items():
+                totals[field] += value
+            result[war["id"]] = totals
+        return result
+
+    async def _open_channel(self, war_id: str) -> _WarChannel:
+        async with damage_aggregator.holding_flushes():
+            totals = (await self._read_totals([war_id])).get(war_id)
+            if totals is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="War not found"
+                )
+            # Another subscriber may have opened the channel while we were reading
+            channel = self.channels.get(war_id)
+            if channel is None:
+                channel = self.channels[war_id] = _WarChannel(war_id, totals)
+        return channel
+
+    async def resync(self) -> int:
+        """Reload totals of every open channel; returns channels changed"""
+        if not self.channels:
+            return 0
+        changed = 0
+        async with damage_aggregator.holding_flushes():
+            for war_id, totals in (await self._read_totals(list(self.channels))).items():
+                channel = self.channels.get(war_id)
+                if channel is not None and channel.totals != totals:
+                    channel.totals = totals
+                    channel.dirty = True
+                    changed += 1
+        self.resyncs += 1
+        return changed
+
+    async def subscribe(self, war_id: str) -> asyncio.Queue:
+        """Register a client queue for war_id, primed with the current frame"""
+        channel = self.channels.get(war_id) or await self._open_channel(war_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.client_queue)
+        channel.subscribers.add(queue)
+        if channel.frame is None or channel.dirty:
+            self._publish(channel)
+        else:
+            queue.put_nowait(channel.frame)
+        return queue
+
+    def unsubscribe(self, war_id: str, queue: asyncio.Queue) -> None:
+        channel = self.channels.get(war_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(queue)
+        if not channel.subscribers:
+            del self.channels[war_id]
+
+    async def check_war(self, war_id: str) -> None:
+        """Raise 404 unless war_id exists, without opening a channel"""
+        if war_id in self.channels:
+            return
+        db = await get_database()
+        if not await db.wars.find_one({"id": war_id}, {"_id": 1}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="War not found"
+            )
+
+    async def stream(self, war_id: str) -> AsyncIterator[bytes]:
+        """Server-sent event stream of frames for one client.
+
+        The client subscribes when the response starts iterating, so a
+        response that is never sent leaves no queue or channel behind.
+        """
+        queue = await self.subscribe(war_id)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=BATTLE_FEED_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(war_id, queue)
+
+    def stats(self) -> dict:
+        return {
+            "wars": len(self.channels),
+            "subscribers": sum(len(channel.subscribers) for channel in self.channels.values()),
+            "frames_serialized": self.frames_serialized,
+            "frames_dropped": self.frames_dropped,
+            "resyncs": self.resyncs
+        }
+
+# Create global battle feed instance
+battle_feed = BattleFeed()
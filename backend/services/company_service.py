@@ -2,10 +2,34 @@ from typing import List, Optional
 from fastapi import HTTPException, status
 from models.company import Company, CompanyCreate, CompanyResponse, CompanyUpdate
 from database.connection import get_database
+from services.auth_service import auth_service
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Company reads fetch exactly CompanyResponse's fields, so rows serialize as-is without a model pass
+COMPANY_PROJECTION = {"_id": 0, **{field: 1 for field in CompanyResponse.model_fields}}
+
+# (substring of company_type, daily_revenue, max_employees); first match wins
+COMPANY_TYPE_RULES = [
+    ("Steel", 150, 10),
+    ("Food", 120, 8),
+]
+DEFAULT_COMPANY_RULE = (100, 5)
+
+def company_type_rule(company_type: str) -> tuple:
+    """(daily_revenue, max_employees) for a new company of this type"""
+    for keyword, daily_revenue, max_employees in COMPANY_TYPE_RULES:
+        if keyword in company_type:
+            return daily_revenue, max_employees
+    return DEFAULT_COMPANY_RULE
+
+def work_earnings(daily_revenue: int, productivity: float) -> int:
+    """Coins paid for one work_in_company shift"""
+    base_earnings = daily_revenue // 10
+    productivity_bonus = int(base_earnings * (productivity / 100))
+    return base_earnings + productivity_bonus
+
 class CompanyService:
     def __init__(self):
         pass
@@ -35,15 +59,7 @@ class CompanyService:
         )
 
         # Calculate initial values based on company type
-        if "Steel" in company_data.company_type:
-            new_company.daily_revenue = 150
-            new_company.max_employees = 10
-        elif "Food" in company_data.company_type:
-            new_company.daily_revenue = 120
-            new_company.max_employees = 8
-        else:
-            new_company.daily_revenue = 100
-            new_company.max_employees = 5
+        new_company.daily_revenue, new_company.max_employees = company_type_rule(company_data.company_type)
 
         # Insert to database
         result = await db.companies.insert_one(new_company.model_dump())
@@ -56,17 +72,10 @@ class CompanyService:
                 detail="Failed to create company"
             )
 
-    async def get_user_companies(self, owner_id: str) -> List[CompanyResponse]:
-        """Get all companies owned by user"""
+    async def get_user_companies(self, owner_id: str) -> List[dict]:
+        """Get all companies owned by user, as CompanyResponse-shaped dicts"""
         db = await get_database()
-        
-        companies = []
-        cursor = db.companies.find({"owner_id": owner_id})
-        
-        async for company_doc in cursor:
-            companies.append(CompanyResponse(**company_doc))
-        
-        return companies
+        return await db.companies.find({"owner_id": owner_id}, COMPANY_PROJECTION).to_list(None)
 
     async def get_company_by_id(self, company_id: str, owner_id: str) -> Optional[CompanyResponse]:
         """Get company by ID (only if owned by user)"""
@@ -138,15 +147,14 @@ class CompanyService:
             )
 
         # Calculate earnings based on company level and productivity
-        base_earnings = company["daily_revenue"] // 10
-        productivity_bonus = int(base_earnings * (company["productivity"] / 100))
-        total_earnings = base_earnings + productivity_bonus
+        total_earnings = work_earnings(company["daily_revenue"], company["productivity"])
 
         # Update user's coins
         await db.users.update_one(
             {"id": owner_id},
             {"$inc": {"coins": total_earnings}}
         )
+        auth_service.invalidate_user(owner_id)
 
         return {
             "earnings": total_earnings,
@@ -0,0 +1,251 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from models.military import BattleParticipation
+from database.connection import get_database
+from services.auth_service import auth_service
+from services.war_counters import war_counters
+import asyncio
+import json
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAMAGE_FLUSH_INTERVAL = float(os.environ.get("DAMAGE_FLUSH_INTERVAL_MS", "250")) / 1000
+DAMAGE_MAX_PENDING_HITS = int(os.environ.get("DAMAGE_MAX_PENDING_HITS", "5000"))
+DAMAGE_JOURNAL_DIR = os.environ.get("DAMAGE_JOURNAL_DIR", str(Path(__file__).parent.parent / "data" / "damage_journal"))
+DAMAGE_JOURNAL_FSYNC = os.environ.get("DAMAGE_JOURNAL_FSYNC", "false").lower() == "true"
+
+GOLD_PER_HIT = 10
+
+
+class _Batch:
+    """Coalesced increments for one journal segment"""
+
+    def __init__(self, batch_id: str):
+        self.id = batch_id
+        self.hits = 0
+        self.wars: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.users: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.participation: Dict[Tuple[str, str, str], List[int]] = {}
+
+    def add(self, war_id: str, user_id: str, side: str, damage: int, hits: int = 1) -> None:
+        self.hits += hits
+        war = self.wars[war_id]
+        war[f"{side}_damage"] += damage
+
+        user = self.users[user_id]
+        user["stats.total_damage"] += damage
+        user["stats.battles_won"] += hits
+        user["gold"] += GOLD_PER_HIT * hits
+
+        totals = self.participation.setdefault((war_id, user_id, side), [0, 0])
+        totals[0] += damage
+        totals[1] += hits
+
+
+class DamageAggregator:
+    """Write-behind accumulator for war damage.
+
+    Every hit is appended to a local journal segment before it is counted,
+    then coalesced per war/side and per user and flushed every
+    DAMAGE_FLUSH_INTERVAL_MS in one transaction. Each flush records its
+    segment id in `damage_batches`, so replaying a segment after a crash is
+    idempotent. At most DAMAGE_MAX_PENDING_HITS hits are held unflushed;
+    beyond that callers wait for a flush.
+    """
+
+    def __init__(self, flush_interval: float = DAMAGE_FLUSH_INTERVAL, max_pending_hits: int = DAMAGE_MAX_PENDING_HITS,
+                 journal_dir: str = DAMAGE_JOURNAL_DIR):
+        self.flush_interval = flush_interval
+        self.max_pending_hits = max_pending_hits
+        self.journal_dir = Path(journal_dir)
+        self._batch: Optional[_Batch] = None
+        self._journal = None
+        self._failed: List[_Batch] = []
+        self._flushing: List[_Batch] = []
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str, str, str, int, int], None]] = []
+        self.hits_recorded = 0
+        self.hits_flushed = 0
+        self.flushes = 0
+        self.backpressure_waits = 0
+
+    def _segment_path(self, batch_id: str) -> Path:
+        return self.journal_dir / f"{batch_id}.ndjson"
+
+    def _open_segment(self) -> None:
+        self._batch = _Batch(uuid.uuid4().hex)
+        self._journal = open(self._segment_path(self._batch.id), "a", encoding="utf-8")
+
+    def _close_segment(self) -> _Batch:
+        batch = self._batch
+        self._journal.close()
+        self._open_segment()
+        return batch
+
+    def add_listener(self, listener: Callable[[str, str, str, int, int], None]) -> None:
+        """Call listener(war_id, user_id, side, damage, hits) for every recorded hit"""
+        self._listeners.append(listener)
+
+    def pending_war_increments(self, war_id: str) -> Dict[str, int]:
+        """Increments for war_id that are counted but not yet flushed"""
+        totals: Dict[str, int] = defaultdict(int)
+        for batch in self._flushing + self._failed + ([self._batch] if self._batch is not None else []):
+            for field, value in batch.wars.get(war_id, {}).items():
+                totals[field] += value
+        return totals
+
+    def holding_flushes(self) -> asyncio.Lock:
+        """Lock under which no flush runs; a read of stored totals taken
+        inside it plus pending_war_increments() counts every hit once"""
+        return self._flush_lock
+
+    @property
+    def pending_hits(self) -> int:
+        return self._batch.hits + sum(batch.hits for batch in self._flushing + self._failed)
+
+    async def start(self) -> None:
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        await self.recover()
+        self._open_segment()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._batch is not None:
+            await self.flush()
+            self._journal.close()
+            self._segment_path(self._batch.id).unlink(missing_ok=True)
+            self._batch = None
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing war damage: {e}")
+
+    async def record_hit(self, war_id: str, user_id: str, side: str, damage: int, hits: int = 1) -> None:
+        """Journal and count hits; waits for a flush if too much is unflushed"""
+        if self.pending_hits + hits > self.max_pending_hits:
+            self.backpressure_waits += 1
+            await self.flush()
+
+        line = json.dumps({"w": war_id, "u": user_id, "s": side, "d": damage, "h": hits}, separators=(",", ":"))
+        self._journal.write(line + "\n")
+        self._journal.flush()
+        if DAMAGE_JOURNAL_FSYNC:
+            os.fsync(self._journal.fileno())
+
+        self._batch.add(war_id, user_id, side, damage, hits)
+        self.hits_recorded += hits
+        for listener in self._listeners:
+            try:
+                listener(war_id, user_id, side, damage, hits)
+            except Exception as e:
+                logger.error(f"Error in damage listener {listener!r}: {e}")
+
+    async def flush(self) -> int:
+        """Write every pending batch; returns hits flushed"""
+        async with self._flush_lock:
+            batches = self._failed
+            self._failed = []
+            if self._batch is not None and self._batch.hits:
+                batches.append(self._close_segment())
+
+            flushed = 0
+            self._flushing = batches
+            for i, batch in enumerate(batches):
+                try:
+                    await self._write_batch(batch)
+                except Exception:
+                    # Retry under the same id so a partial failure can't double count
+                    self._flushing = []
+                    self._failed = batches[i:] + self._failed
+                    raise
+                self._flushing = batches[i + 1:]
+                self._segment_path(batch.id).unlink(missing_ok=True)
+                flushed += batch.hits
+
+            self.hits_flushed += flushed
+            if batches:
+                self.flushes += 1
+            return flushed
+
+    async def _write_batch(self, batch: _Batch) -> None:
+        db = await get_database()
+        now = datetime.utcnow()
+        war_ops, shard_ops = await war_counters.increment_ops(batch.wars)
+
+        async def write(session):
+            # Fails with DuplicateKeyError if this segment was already applied
+            await db.damage_batches.insert_one({"id": batch.id, "hits": batch.hits, "created_at": now}, session=session)
+            if war_ops:
+                await db.wars.bulk_write(war_ops, ordered=False, session=session)
+            if shard_ops:
+                await db.war_counter_shards.bulk_write(shard_ops, ordered=False, session=session)
+            await db.users.bulk_write([
+                UpdateOne({"id": user_id}, {"$inc": dict(increments)})
+                for user_id, increments in batch.users.items()
+            ], ordered=False, session=session)
+            await db.battle_participation.insert_many([
+                BattleParticipation(
+                    war_id=war_id, user_id=user_id, side=side,
+                    damage_dealt=damage, rounds_participated=hits
+                ).model_dump()
+                for (war_id, user_id, side), (damage, hits) in batch.participation.items()
+            ], ordered=False, session=session)
+
+        try:
+            async with await db.client.start_session() as session:
+                await session.with_transaction(write)
+        except DuplicateKeyError:
+            logger.info(f"Damage batch {batch.id} was already applied")
+        auth_service.invalidate_user(*batch.users.keys())
+        if shard_ops:
+            war_counters.invalidate(*batch.wars.keys())
+
+    async def recover(self) -> None:
+        """Replay journal segments left behind by a crash"""
+        for path in sorted(self.journal_dir.glob("*.ndjson")):
+            batch = _Batch(path.stem)
+            with open(path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        hit = json.loads(line)
+                    except ValueError:
+                        # Torn final line from the crash; that hit was never acknowledged
+                        continue
+                    batch.add(hit["w"], hit["u"], hit["s"], hit["d"], hit.get("h", 1))
+            if batch.hits:
+                logger.info(f"Replaying {batch.hits} journaled hits from {path.name}")
+                await self._write_batch(batch)
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        return {
+            "pending_hits": self.pending_hits if self._batch is not None else 0,
+            "max_pending_hits": self.max_pending_hits,
+            "hits_recorded": self.hits_recorded,
+            "hits_flushed": self.hits_flushed,
+            "flushes": self.flushes,
+            "failed_batches": len(self._failed),
+            "backpressure_waits": self.backpressure_waits
+        }
+
+# Create global damage aggregator instance
+damage_aggregator = DamageAggregator()
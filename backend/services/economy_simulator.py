@@ -0,0 +1,218 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from pydantic import BaseModel, Field
+from services.company_service import COMPANY_TYPE_RULES, DEFAULT_COMPANY_RULE
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def production_earnings(daily_revenue: np.ndarray, productivity: np.ndarray, elapsed_days: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Whole coins produced over elapsed_days, and the days those coins pay for.
+
+    A company produces daily_revenue * (1 + productivity / 100) coins a day.
+    The second array is what last_production advances by, so fractions carry
+    to the next tick.
+    """
+    rate = daily_revenue * (1 + productivity / 100)
+    earnings = np.floor(elapsed_days * rate).astype(np.int64)
+    paid_days = np.divide(earnings, rate, out=np.zeros_like(rate, dtype=np.float64), where=rate > 0)
+    return earnings, paid_days
+
+
+def work_earnings(daily_revenue: np.ndarray, productivity: np.ndarray) -> np.ndarray:
+    """Vectorized company_service.work_earnings"""
+    base = daily_revenue // 10
+    return base + np.floor(base * (productivity / 100)).astype(np.int64)
+
+
+def sum_by_owner(owner_index: np.ndarray, amounts: np.ndarray, n_users: int) -> np.ndarray:
+    """Total amount per user for per-company amounts"""
+    return np.bincount(owner_index, weights=amounts, minlength=n_users)
+
+
+class SimulationParams(BaseModel):
+    """Balance knobs for a simulation run"""
+    days: int = Field(default=30, ge=1)
+    revenue_multiplier: float = Field(default=1.0, ge=0)
+    productivity_delta: float = Field(default=0.0, description="Added to every company's productivity")
+    work_shifts_per_day: float = Field(default=1.0, ge=0, description="Average work_in_company calls per company per day")
+    market_turnover: float = Field(default=0.05, ge=0, le=1, description="Share of each listing's stock sold per day")
+    price_multiplier: float = Field(default=1.0, gt=0)
+    type_rules: Optional[Dict[str, Tuple[int, int]]] = Field(
+        default=None,
+        description="Override (daily_revenue, max_employees) by company type keyword, re-derived for every company"
+    )
+
+
+class EconomySnapshot:
+    """Companies, users and listings as columnar NumPy arrays"""
+
+    def __init__(self, users: Dict[str, np.ndarray], companies: Dict[str, np.ndarray], listings: Dict[str, np.ndarray],
+                 company_types: List[str], taken_at: Optional[datetime] = None):
+        self.users = users
+        self.companies = companies
+        self.listings = listings
+        self.company_types = company_types
+        self.taken_at = taken_at or datetime.utcnow()
+
+    @classmethod
+    async def load(cls, db) -> "EconomySnapshot":
+        """Read the live collections into arrays, projecting only simulated fields"""
+        user_ids, gold, coins = [], [], []
+        async for user in db.users.find({}, {"_id": 0, "id": 1, "gold": 1, "coins": 1}):
+            user_ids.append(user["id"])
+            gold.append(user.get("gold", 0))
+            coins.append(user.get("coins", 0))
+        user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+
+        company_types: List[str] = []
+        type_codes: Dict[str, int] = {}
+        owner, type_code, revenue, productivity = [], [], [], []
+        projection = {"_id": 0, "owner_id": 1, "company_type": 1, "daily_revenue": 1, "productivity": 1}
+        async for company in db.companies.find({}, projection):
+            if company["owner_id"] not in user_index:
+                continue
+            code = type_codes.setdefault(company["company_type"], len(type_codes))
+            if code == len(company_types):
+                company_types.append(company["company_type"])
+            owner.append(user_index[company["owner_id"]])
+            type_code.append(code)
+            revenue.append(company["daily_revenue"])
+            productivity.append(company["productivity"])
+
+        seller, price, quantity = [], [], []
+        projection = {"_id": 0, "seller_id": 1, "price": 1, "quantity": 1}
+        async for item in db.market_items.find({"quantity": {"$gt": 0}}, projection):
+            if item["seller_id"] not in user_index:
+                continue
+            seller.append(user_index[item["seller_id"]])
+            price.append(item["price"])
+            quantity.append(item["quantity"])
+
+        return cls(
+            users={"gold": np.array(gold, dtype=np.float64), "coins": np.array(coins, dtype=np.float64)},
+            companies={
+                "owner": np.array(owner, dtype=np.int64),
+                "type": np.array(type_code, dtype=np.int64),
+                "daily_revenue": np.array(revenue, dtype=np.int64),
+                "productivity": np.array(productivity, dtype=np.float64),
+            },
+            listings={
+                "seller": np.array(seller, dtype=np.int64),
+                "price": np.array(price, dtype=np.float64),
+                "quantity": np.array(quantity, dtype=np.int64),
+            },
+            company_types=company_types
+        )
+
+    def save(self, path: str) -> None:
+        """Write the snapshot to a compressed .npz file"""
+        arrays = {f"users_{k}": v for k, v in self.users.items()}
+        arrays.update({f"companies_{k}": v for k, v in self.companies.items()})
+        arrays.update({f"listings_{k}": v for k, v in self.listings.items()})
+        np.savez_compressed(
+            path,
+            company_types=np.array(self.company_types, dtype=str),
+            taken_at=np.array(self.taken_at.isoformat()),
+            **arrays
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "EconomySnapshot":
+        data = np.load(path)
+
+        def group(prefix: str) -> Dict[str, np.ndarray]:
+            return {key[len(prefix):]: data[key] for key in data.files if key.startswith(prefix)}
+
+        return cls(
+            users=group("users_"),
+            companies=group("companies_"),
+            listings=group("listings_"),
+            company_types=data["company_types"].tolist(),
+            taken_at=datetime.fromisoformat(str(data["taken_at"]))
+        )
+
+
+def _daily_revenue(snapshot: EconomySnapshot, params: SimulationParams) -> np.ndarray:
+    revenue = snapshot.companies["daily_revenue"]
+    if params.type_rules is not None:
+        # Re-derive revenue per type with the overridden rule table, as create_company would
+        rules = [(keyword, rule[0], rule[1]) for keyword, rule in params.type_rules.items()]
+        rules += [rule for rule in COMPANY_TYPE_RULES if rule[0] not in params.type_rules]
+        per_type = []
+        for company_type in snapshot.company_types:
+            match = next((rule[1] for rule in rules if rule[0] in company_type), DEFAULT_COMPANY_RULE[0])
+            per_type.append(match)
+        revenue = np.array(per_type, dtype=np.int64)[snapshot.companies["type"]] if per_type else revenue
+    return np.floor(revenue * params.revenue_multiplier).astype(np.int64)
+
+
+def _distribution(values: np.ndarray) -> dict:
+    if values.size == 0:
+        return {"total": 0.0, "mean": 0.0, "median": 0.0, "p99": 0.0, "gini": 0.0}
+    ordered = np.sort(values)
+    n = ordered.size
+    total = ordered.sum()
+    gini = 0.0 if total <= 0 else float((2 * np.arange(1, n + 1) - n - 1) @ ordered / (n * total))
+    return {
+        "total": float(total),
+        "mean": float(ordered.mean()),
+        "median": float(np.median(ordered)),
+        "p99": float(np.percentile(ordered, 99)),
+        "gini": gini
+    }
+
+
+def simulate(snapshot: EconomySnapshot, params: SimulationParams) -> dict:
+    """Advance the economy params.days days without touching the database.
+
+    Each day every company produces (production tick rule) and is worked
+    work_shifts_per_day times (work_in_company rule), paying its owner coins.
+    A market_turnover share of each listing sells at its price; sellers
+    receive the gold and buyers pay in proportion to the gold they hold.
+    """
+    n_users = snapshot.users["coins"].size
+    coins = snapshot.users["coins"].copy()
+    gold = snapshot.users["gold"].copy()
+    quantity = snapshot.listings["quantity"].copy()
+    price = snapshot.listings["price"] * params.price_multiplier
+    seller = snapshot.listings["seller"]
+    owner = snapshot.companies["owner"]
+
+    revenue = _daily_revenue(snapshot, params)
+    productivity = snapshot.companies["productivity"] + params.productivity_delta
+    produced, _ = production_earnings(revenue, productivity, np.ones(revenue.size))
+    worked = work_earnings(revenue, productivity) * params.work_shifts_per_day
+    # Company payouts don't depend on balances, so one owner aggregation covers every day
+    daily_coins = sum_by_owner(owner, produced + worked, n_users)
+
+    coin_supply, gold_traded = [], []
+    for _ in range(params.days):
+        coins += daily_coins
+
+        sold = np.floor(quantity * params.market_turnover).astype(np.int64)
+        spent = sold * price
+        total_spent = float(spent.sum())
+        total_gold = float(gold.sum())
+        if total_spent > 0 and total_gold > 0:
+            spend_share = min(1.0, total_spent / total_gold)
+            gold -= gold * spend_share
+            gold += np.bincount(seller, weights=spent, minlength=n_users) * (min(total_gold, total_spent) / total_spent)
+            quantity -= sold
+        coin_supply.append(float(coins.sum()))
+        gold_traded.append(total_spent)
+
+    return {
+        "days": params.days,
+        "users": n_users,
+        "companies": int(owner.size),
+        "listings": int(seller.size),
+        "coins": _distribution(coins),
+        "gold": _distribution(gold),
+        "daily_coin_issuance": float(daily_coins.sum()),
+        "coin_supply_by_day": coin_supply,
+        "gold_traded_by_day": gold_traded,
+        "listings_remaining": int(np.count_nonzero(quantity))
+    }
@@ -1,12 +1,36 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
+from collections import defaultdict
 from fastapi import HTTPException, status
 from models.market import MarketItem, MarketItemCreate, MarketItemResponse, BuyRequest, MarketTransaction, ExchangeRate
 from database.connection import get_database
+from pymongo import ReturnDocument
+from services.auth_service import auth_service
+from services.pagination import decode_cursor, keyset_filter, next_page
+from services.cache import LRUCache
 from datetime import datetime
+import orjson
+import re
+import os
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+LISTING_CACHE_SIZE = int(os.environ.get("LISTING_CACHE_SIZE", "1000"))
+LISTING_CACHE_TTL = float(os.environ.get("LISTING_CACHE_TTL", "10"))
+
+# Listing reads fetch exactly MarketItemResponse's fields, so rows serialize as-is without a model pass
+LISTING_PROJECTION = {"_id": 0, **{field: 1 for field in MarketItemResponse.model_fields}}
+
+def build_search_terms(name: str) -> List[str]:
+    """Lowercase full name plus each word, so prefix queries can use the index"""
+    normalized = " ".join(name.lower().split())
+    terms = [normalized]
+    for word in normalized.split(" "):
+        if word not in terms:
+            terms.append(word)
+    return terms
+
 class MarketService:
     def __init__(self):
         # Item icons mapping
@@ -18,6 +42,49 @@ class MarketService:
             "Medical Kit": "🏥",
             "Tank": "🚗"
         }
+        # First pages of /market/items as serialized JSON, keyed by (category, search, limit)
+        self.listing_cache = LRUCache(maxsize=LISTING_CACHE_SIZE, ttl=LISTING_CACHE_TTL)
+        # Bumped on every write to a category so in-flight reads don't cache stale pages
+        self._listing_generation: Dict[str, int] = defaultdict(int)
+        self._listing_max_age_served = 0.0
+
+    @staticmethod
+    def _listing_key(category: Optional[str], search: Optional[str], limit: int) -> tuple:
+        category = category if category and category != "all" else "all"
+        search = " ".join(search.lower().split()) if search else ""
+        return (category, search, limit)
+
+    def invalidate_listings(self, category: str) -> None:
+        """Drop cached listing pages that can contain items of category"""
+        self._listing_generation[category] += 1
+        self._listing_generation["all"] += 1
+        self.listing_cache.invalidate_where(lambda key: key[0] in (category, "all"))
+
+    async def get_market_items_page(self, category: Optional[str] = None, search: Optional[str] = None, limit: int = 50,
+                                    cursor: Optional[str] = None) -> Tuple[bytes, Optional[str]]:
+        """Serialized page of market items, served from the listing cache for first pages"""
+        if cursor:
+            items, next_cursor = await self.get_market_items(category, search, limit, cursor)
+            return orjson.dumps(items), next_cursor
+
+        key = self._listing_key(category, search, limit)
+        cached = self.listing_cache.get(key)
+        if cached is not None:
+            body, next_cursor, cached_at = cached
+            self._listing_max_age_served = max(self._listing_max_age_served, time.monotonic() - cached_at)
+            return body, next_cursor
+
+        generation = self._listing_generation[key[0]]
+        items, next_cursor = await self.get_market_items(category, search, limit)
+        body = orjson.dumps(items)
+        if self._listing_generation[key[0]] == generation:
+            self.listing_cache.set(key, (body, next_cursor, time.monotonic()))
+        return body, next_cursor
+
+    def listing_cache_stats(self) -> dict:
+        stats = self.listing_cache.stats()
+        stats["max_age_served"] = self._listing_max_age_served
+        return stats
 
     async def create_market_item(self, item_data: MarketItemCreate, seller_id: str, seller_name: str) -> MarketItemResponse:
         """Create new market item for sale"""
@@ -34,13 +101,15 @@ class MarketService:
             quantity=item_data.quantity,
             seller_id=seller_id,
             seller_name=seller_name,
-            icon=icon
+            icon=icon,
+            search_terms=build_search_terms(item_data.name)
         )
 
         # Insert to database
         result = await db.market_items.insert_one(new_item.model_dump())
         
         if result.inserted_id:
+            self.invalidate_listings(new_item.category)
             return MarketItemResponse(**new_item.model_dump())
         else:
             raise HTTPException(
@@ -48,8 +117,9 @@ class MarketService:
                 detail="Failed to create market item"
             )
 
-    async def get_market_items(self, category: Optional[str] = None, search: Optional[str] = None, limit: int = 50) -> List[MarketItemResponse]:
-        """Get market items with optional filtering"""
+    async def get_market_items(self, category: Optional[str] = None, search: Optional[str] = None, limit: int = 50,
+                               cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Get one page of market items as MarketItemResponse-shaped dicts, newest first, and the next cursor"""
         db = await get_database()
         
         # Build query
@@ -59,121 +129,136 @@ class MarketService:
             query["category"] = category
             
         if search:
-            query["name"] = {"$regex": search, "$options": "i"}  # Case insensitive search
+            # Anchored, case-sensitive prefix on normalized terms is an index range scan
+            prefix = " ".join(search.lower().split())
+            if prefix:
+                query["search_terms"] = {"$regex": f"^{re.escape(prefix)}"}
 
-        items = []
-        cursor = db.market_items.find(query).sort("created_at", -1).limit(limit)
-        
-        async for item_doc in cursor:
-            items.append(MarketItemResponse(**item_doc))
-        
-        return items
+        if cursor:
+            query.update(keyset_filter("created_at", cursor))
+
+        docs = await db.market_items.find(query, LISTING_PROJECTION).sort([("created_at", -1), ("id", -1)]).to_list(limit + 1)
+        return next_page(docs, limit, "created_at")
 
     async def buy_item(self, buy_request: BuyRequest, buyer_id: str) -> dict:
         """Buy item from market"""
         db = await get_database()
-        
-        # Get item
-        item = await db.market_items.find_one({"id": buy_request.item_id})
-        
-        if not item:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Item not found"
-            )
 
-        if item["quantity"] < buy_request.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Not enough quantity available"
+        async def purchase(session):
+            # Guarded decrement: the stock check and the write happen in one step
+            item = await db.market_items.find_one_and_update(
+                {
+                    "id": buy_request.item_id,
+                    "quantity": {"$gte": buy_request.quantity},
+                    "seller_id": {"$ne": buyer_id}
+                },
+                {"$inc": {"quantity": -buy_request.quantity}},
+                return_document=ReturnDocument.AFTER,
+                session=session
             )
+            if not item:
+                await self._raise_buy_rejection(db, buy_request, buyer_id, session)
 
-        if item["seller_id"] == buyer_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="You cannot buy your own items"
+            total_cost = item["price"] * buy_request.quantity
+
+            # Conditional debit: only succeeds if the buyer can still afford it
+            debit = await db.users.update_one(
+                {"id": buyer_id, "gold": {"$gte": total_cost}},
+                {"$inc": {"gold": -total_cost}},
+                session=session
             )
+            if debit.matched_count == 0:
+                buyer = await db.users.find_one({"id": buyer_id}, {"_id": 1}, session=session)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND if not buyer else status.HTTP_400_BAD_REQUEST,
+                    detail="Buyer not found" if not buyer else "Insufficient gold"
+                )
 
-        # Calculate total cost
-        total_cost = item["price"] * buy_request.quantity
+            # Update seller's gold
+            await db.users.update_one(
+                {"id": item["seller_id"]},
+                {"$inc": {"gold": total_cost}},
+                session=session
+            )
 
-        # Get buyer
-        buyer = await db.users.find_one({"id": buyer_id})
-        if not buyer:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Buyer not found"
+            # Add item to buyer's inventory
+            await db.user_inventory.update_one(
+                {"user_id": buyer_id, "item_name": item["name"]},
+                {"$inc": {"quantity": buy_request.quantity}},
+                upsert=True,
+                session=session
             )
 
-        if buyer["gold"] < total_cost:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Insufficient gold"
+            # Create transaction record
+            transaction = MarketTransaction(
+                item_id=buy_request.item_id,
+                buyer_id=buyer_id,
+                seller_id=item["seller_id"],
+                item_name=item["name"],
+                quantity=buy_request.quantity,
+                price_per_unit=item["price"],
+                total_price=total_cost
             )
+            await db.market_transactions.insert_one(transaction.model_dump(), session=session)
 
-        # Process transaction
-        async with await db.client.start_session() as session:
-            async with session.start_transaction():
-                # Update item quantity
-                new_quantity = item["quantity"] - buy_request.quantity
-                if new_quantity == 0:
-                    # Remove item if sold out
-                    await db.market_items.delete_one({"id": buy_request.item_id}, session=session)
-                else:
-                    await db.market_items.update_one(
-                        {"id": buy_request.item_id},
-                        {"$set": {"quantity": new_quantity}},
-                        session=session
-                    )
-
-                # Update buyer's gold
-                await db.users.update_one(
-                    {"id": buyer_id},
-                    {"$inc": {"gold": -total_cost}},
-                    session=session
-                )
+            # Remove item if sold out
+            if item["quantity"] == 0:
+                await db.market_items.delete_one({"id": buy_request.item_id, "quantity": 0}, session=session)
 
-                # Update seller's gold
-                await db.users.update_one(
-                    {"id": item["seller_id"]},
-                    {"$inc": {"gold": total_cost}},
-                    session=session
-                )
+            return item, transaction
 
-                # Add item to buyer's inventory
-                await db.user_inventory.update_one(
-                    {"user_id": buyer_id, "item_name": item["name"]},
-                    {"$inc": {"quantity": buy_request.quantity}},
-                    upsert=True,
-                    session=session
-                )
+        # with_transaction retries the whole callback on transient write conflicts
+        async with await db.client.start_session() as session:
+            item, transaction = await session.with_transaction(purchase)
 
-                # Create transaction record
-                transaction = MarketTransaction(
-                    item_id=buy_request.item_id,
-                    buyer_id=buyer_id,
-                    seller_id=item["seller_id"],
-                    item_name=item["name"],
-                    quantity=buy_request.quantity,
-                    price_per_unit=item["price"],
-                    total_price=total_cost
-                )
-                
-                await db.market_transactions.insert_one(transaction.model_dump(), session=session)
+        auth_service.invalidate_user(buyer_id, item["seller_id"])
+        self.invalidate_listings(item["category"])
 
         return {
-            "message": f"Successfully bought {buy_request.quantity}x {item['name']} for {total_cost} gold",
+            "message": f"Successfully bought {buy_request.quantity}x {item['name']} for {transaction.total_price} gold",
             "transaction": transaction.model_dump()
         }
 
-    async def get_user_inventory(self, user_id: str) -> List[dict]:
-        """Get user's inventory"""
+    async def _raise_buy_rejection(self, db, buy_request: BuyRequest, buyer_id: str, session) -> None:
+        """Explain why the guarded stock decrement matched nothing"""
+        item = await db.market_items.find_one(
+            {"id": buy_request.item_id},
+            {"seller_id": 1},
+            session=session
+        )
+
+        if not item:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Item not found"
+            )
+
+        if item["seller_id"] == buyer_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="You cannot buy your own items"
+            )
+
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Not enough quantity available"
+        )
+
+    async def get_user_inventory(self, user_id: str, limit: int = 100,
+                                 cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Get one page of user's inventory in item name order"""
         db = await get_database()
         
+        query = {"user_id": user_id}
+        if cursor:
+            # item_name is unique per user, so it is its own tiebreak
+            query["item_name"] = {"$gt": decode_cursor(cursor)[1]}
+
+        docs = await db.user_inventory.find(query).sort("item_name", 1).to_list(limit + 1)
+        docs, next_cursor = next_page(docs, limit, "item_name", "item_name")
+
         inventory = []
-        cursor = db.user_inventory.find({"user_id": user_id})
-        
-        async for item in cursor:
+        for item in docs:
             inventory.append({
                 "id": item.get("_id", ""),
                 "name": item["item_name"],
@@ -182,7 +267,7 @@ class MarketService:
                 "icon": self.item_icons.get(item["item_name"], "📦")
             })
         
-        return inventory
+        return inventory, next_cursor
 
     async def get_exchange_rates(self) -> List[ExchangeRate]:
         """Get current exchange rates"""
@@ -249,6 +334,7 @@ class MarketService:
                 {"id": user_id},
                 {"$inc": {"gold": -amount}}
             )
+            auth_service.invalidate_user(user_id)
             
             return {
                 "message": f"Exchanged {amount} Gold for ${received_amount:.2f} USD",
@@ -0,0 +1,336 @@
+from typing import Dict, List, Optional, Tuple
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from models.military import MilitaryMember, MilitaryUnit, MilitaryUnitCreate
+from models.user import UserResponse
+from database.connection import get_database
+from services.cache import LRUCache
+from services.damage_aggregator import damage_aggregator
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+MILITARY_FLUSH_INTERVAL = float(os.environ.get("MILITARY_FLUSH_INTERVAL_MS", "1000")) / 1000
+MILITARY_RANKING_CACHE_SIZE = int(os.environ.get("MILITARY_RANKING_CACHE_SIZE", "1000"))
+MILITARY_RANKING_TTL = float(os.environ.get("MILITARY_RANKING_TTL", "60"))
+
+
+class UnitRanking:
+    """A unit and its members, kept sorted by total damage.
+
+    Crediting a member moves it with a bisect instead of re-sorting, so
+    overview pages are a slice of an already ordered list.
+    """
+
+    def __init__(self, unit: dict, members: List[dict], epoch: int = 0):
+        self.unit = unit
+        self.epoch = epoch
+        self.members = {member["user_id"]: member for member in members}
+        self._order: List[Tuple[int, str]] = sorted((-member["total_damage"], member["user_id"]) for member in members)
+
+    def credit(self, user_id: str, damage: int, battles: int) -> None:
+        member = self.members.get(user_id)
+        if member is None:
+            return
+        del self._order[bisect_left(self._order, (-member["total_damage"], user_id))]
+        member["total_damage"] += damage
+        member["battles_participated"] += battles
+        insort(self._order, (-member["total_damage"], user_id))
+
+    def position(self, user_id: str) -> Optional[int]:
+        member = self.members.get(user_id)
+        if member is None:
+            return None
+        return bisect_left(self._order, (-member["total_damage"], user_id)) + 1
+
+    def page(self, offset: int, limit: int) -> List[dict]:
+        return [
+            {**self.members[user_id], "position": position}
+            for position, (_, user_id) in enumerate(self._order[offset:offset + limit], start=offset + 1)
+        ]
+
+
+class MilitaryService:
+    """Military units, credited from war damage in batches.
+
+    Recorded hits are summed per user by a damage aggregator listener and
+    flushed every MILITARY_FLUSH_INTERVAL_MS: one bulk_write of $inc on the
+    fighters' `military_members` rows and one on their units, in a single
+    transaction so a unit's damage always equals the sum of its members.
+    A battle is a war, not a hit: upserted (member, war) and (unit, war)
+    markers count a war only the first time it is fought in.
+    Users outside a unit are dropped at flush time. Unit overviews read a
+    cached UnitRanking that flushes update in place; other processes'
+    increments show up when it expires after MILITARY_RANKING_TTL seconds.
+    """
+
+    def __init__(self, flush_interval: float = MILITARY_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.rankings = LRUCache(maxsize=MILITARY_RANKING_CACHE_SIZE, ttl=MILITARY_RANKING_TTL)
+        # user id -> [damage, war ids fought in]
+        self._pending: Dict[str, list] = defaultdict(lambda: [0, set()])
+        self._flush_lock = asyncio.Lock()
+        # Bumped as each flush starts; rankings loaded since may already include its writes
+        self._epoch = 0
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.members_credited = 0
+        damage_aggregator.add_listener(self._on_hit)
+
+    def _on_hit(self, war_id: str, user_id: str, side: str, damage: int, hits: int) -> None:
+        totals = self._pending[user_id]
+        totals[0] += damage
+        totals[1].add(war_id)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error crediting military units: {e}")
+
+    async def flush(self) -> int:
+        """Credit buffered damage and battles to members and their units; returns members credited"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, defaultdict(lambda: [0, set()])
+            if not pending:
+                return 0
+            self._epoch += 1
+            epoch = self._epoch
+
+            db = await get_database()
+            try:
+                unit_of = {
+                    member["user_id"]: member["military_unit_id"]
+                    async for member in db.military_members.find(
+                        {"user_id": {"$in": list(pending)}},
+                        {"_id": 0, "user_id": 1, "military_unit_id": 1}
+                    )
+                }
+                if not unit_of:
+                    return 0
+
+                async def write(session):
+                    now = datetime.utcnow()
+                    # A marker per (member, war) and (unit, war); only the first hit in a war inserts one
+                    member_marks = [
+                        (user_id, war_id) for user_id in unit_of for war_id in pending[user_id][1]
+                    ]
+                    marked = await db.military_member_battles.bulk_write([
+                        UpdateOne(
+                            {"user_id": user_id, "military_unit_id": unit_of[user_id], "war_id": war_id},
+                            {"$setOnInsert": {"created_at": now}},
+                            upsert=True
+                        )
+                        for user_id, war_id in member_marks
+                    ], ordered=False, session=session)
+                    member_battles: Dict[str, int] = defaultdict(int)
+                    for index in marked.upserted_ids:
+                        member_battles[member_marks[index][0]] += 1
+
+                    unit_marks = sorted({(unit_of[user_id], war_id) for user_id, war_id in member_marks})
+                    marked = await db.military_unit_battles.bulk_write([
+                        UpdateOne(
+                            {"military_unit_id": unit_id, "war_id": war_id},
+                            {"$setOnInsert": {"created_at": now}},
+                            upsert=True
+                        )
+                        for unit_id, war_id in unit_marks
+                    ], ordered=False, session=session)
+                    units: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+                    for index in marked.upserted_ids:
+                        units[unit_marks[index][0]][1] += 1
+
+                    member_ops = []
+                    for user_id, unit_id in unit_of.items():
+                        units[unit_id][0] += pending[user_id][0]
+                        member_ops.append(UpdateOne(
+                            {"user_id": user_id},
+                            {"$inc": {"total_damage": pending[user_id][0], "battles_participated": member_battles[user_id]}}
+                        ))
+                    await db.military_members.bulk_write(member_ops, ordered=False, session=session)
+                    await db.military_units.bulk_write([
+                        UpdateOne({"id": unit_id}, {"$inc": {"total_damage": damage, "battles_fought": battles}})
+                        for unit_id, (damage, battles) in units.items()
+                    ], ordered=False, session=session)
+                    return member_battles, units
+
+                async with await db.client.start_session() as session:
+                    member_battles, units = await session.with_transaction(write)
+            except Exception:
+                # Hand the damage and wars back for the next flush
+                for user_id, (damage, war_ids) in pending.items():
+                    self._pending[user_id][0] += damage
+                    self._pending[user_id][1] |= war_ids
+                raise
+
+        for user_id, unit_id in unit_of.items():
+            ranking = self.rankings.get(unit_id)
+            if ranking is not None and ranking.epoch < epoch:
+                ranking.credit(user_id, pending[user_id][0], member_battles[user_id])
+        for unit_id, (damage, battles) in units.items():
+            ranking = self.rankings.get(unit_id)
+            if ranking is not None and ranking.epoch < epoch:
+                ranking.unit["total_damage"] += damage
+                ranking.unit["battles_fought"] += battles
+        self.flushes += 1
+        self.members_credited += len(unit_of)
+        return len(unit_of)
+
+    # Membership
+
+    async def create_unit(self, unit_data: MilitaryUnitCreate, user: UserResponse) -> dict:
+        """Found a unit led by the user"""
+        db = await get_database()
+        unit = MilitaryUnit(name=unit_data.name, motto=unit_data.motto, leader_id=user.id)
+        member = MilitaryMember(user_id=user.id, username=user.username, military_unit_id=unit.id, rank="Commander")
+
+        async def write(session):
+            await db.military_units.insert_one(unit.model_dump(), session=session)
+            await db.military_members.insert_one(member.model_dump(), session=session)
+
+        await self._join(db, write)
+        return await self.get_overview(unit.id)
+
+    async def join_unit(self, unit_id: str, user: UserResponse) -> dict:
+        db = await get_database()
+        member = MilitaryMember(user_id=user.id, username=user.username, military_unit_id=unit_id)
+
+        async def write(session):
+            seat = await db.military_units.update_one(
+                {"id": unit_id, "$expr": {"$lt": ["$members_count", "$max_members"]}},
+                {"$inc": {"members_count": 1}},
+                session=session
+            )
+            if seat.matched_count == 0:
+                if not await db.military_units.find_one({"id": unit_id}, {"_id": 1}, session=session):
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Military unit not found"
+                    )
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Military unit is full"
+                )
+            await db.military_members.insert_one(member.model_dump(), session=session)
+
+        await self._join(db, write)
+        self.rankings.invalidate(unit_id)
+        return {"message": "Joined military unit", "military_unit_id": unit_id}
+
+    async def _join(self, db, write) -> None:
+        try:
+            async with await db.client.start_session() as session:
+                await session.with_transaction(write)
+        except DuplicateKeyError:
+            # military_members.user_id is unique: one unit per user
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="You are already in a military unit"
+            )
+
+    async def leave_unit(self, user: UserResponse) -> dict:
+        db = await get_database()
+        member = await self._membership(db, user.id)
+        unit = await db.military_units.find_one({"id": member["military_unit_id"]}, {"_id": 0, "leader_id": 1})
+        if unit and unit["leader_id"] == user.id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The commander cannot leave the unit"
+            )
+
+        async def write(session):
+            removed = await db.military_members.delete_one({"user_id": user.id}, session=session)
+            if removed.deleted_count:
+                await db.military_units.update_one(
+                    {"id": member["military_unit_id"]}, {"$inc": {"members_count": -1}}, session=session
+                )
+
+        async with await db.client.start_session() as session:
+            await session.with_transaction(write)
+        self.rankings.invalidate(member["military_unit_id"])
+        return {"message": "Left military unit", "military_unit_id": member["military_unit_id"]}
+
+    async def _membership(self, db, user_id: str) -> dict:
+        member = await db.military_members.find_one({"user_id": user_id}, {"_id": 0})
+        if not member:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="You are not in a military unit"
+            )
+        return member
+
+    # Views
+
+    async def _ranking(self, unit_id: str) -> UnitRanking:
+        ranking = self.rankings.get(unit_id)
+        if ranking is not None:
+            return ranking
+
+        db = await get_database()
+        epoch = self._epoch
+        unit = await db.military_units.find_one({"id": unit_id}, {"_id": 0})
+        if not unit:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Military unit not found"
+            )
+        members = await db.military_members.find({"military_unit_id": unit_id}, {"_id": 0}).to_list(None)
+        unit.setdefault("total_damage", 0)
+        ranking = UnitRanking(unit, members, epoch)
+        self.rankings.set(unit_id, ranking)
+        return ranking
+
+    async def get_overview(self, unit_id: str, offset: int = 0, limit: int = 50) -> dict:
+        """A unit with a page of its members, most damage first"""
+        ranking = await self._ranking(unit_id)
+        return {
+            **ranking.unit,
+            "members": ranking.page(offset, limit)
+        }
+
+    async def get_my_unit(self, user: UserResponse, limit: int = 50) -> dict:
+        """The user's unit overview and their position in it"""
+        db = await get_database()
+        member = await self._membership(db, user.id)
+        overview = await self.get_overview(member["military_unit_id"], limit=limit)
+        overview["my_position"] = (await self._ranking(member["military_unit_id"])).position(user.id)
+        return overview
+
+    async def list_units(self, limit: int = 50) -> List[dict]:
+        """Units with the most total damage"""
+        db = await get_database()
+        return await db.military_units.find({}, {"_id": 0}).sort(
+            [("total_damage", -1), ("id", 1)]
+        ).limit(limit).to_list(limit)
+
+    def stats(self) -> dict:
+        return {
+            "pending_members": len(self._pending),
+            "flushes": self.flushes,
+            "members_credited": self.members_credited,
+            "rankings": self.rankings.stats()
+        }
+
+# Create global military service instance
+military_service = MilitaryService()
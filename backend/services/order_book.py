@@ -0,0 +1,386 @@
+from typing import Dict, List, Optional, Tuple
+from collections import defaultdict, deque
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from models.market import MarketOrder, MarketOrderResponse, MarketTransaction, OrderCreate
+from database.connection import get_database
+from services.auth_service import auth_service
+import bisect
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+MARKET_FLUSH_INTERVAL = float(os.environ.get("MARKET_FLUSH_INTERVAL_MS", "200")) / 1000
+
+BookKey = Tuple[str, int]
+
+
+class _BookSide:
+    """One side of a book: price levels kept sorted so the best price is last"""
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self._keys: List[float] = []
+        self._levels: Dict[float, deque] = {}
+        self._volume: Dict[float, int] = {}
+
+    def _key(self, price: float) -> float:
+        # Bids sort ascending by price, asks by -price, so the best level is _keys[-1]
+        return price if self.is_bid else -price
+
+    def add(self, order: MarketOrder, front: bool = False) -> None:
+        key = self._key(order.price)
+        level = self._levels.get(key)
+        if level is None:
+            level = self._levels[key] = deque()
+            self._volume[key] = 0
+            bisect.insort(self._keys, key)
+        if front:
+            level.appendleft(order)
+        else:
+            level.append(order)
+        self._volume[key] += order.remaining
+
+    def remove(self, order: MarketOrder) -> None:
+        key = self._key(order.price)
+        level = self._levels[key]
+        # Compare by identity; model equality would compare every field
+        del level[next(i for i, queued in enumerate(level) if queued is order)]
+        self._volume[key] -= order.remaining
+        if not level:
+            self._drop_level(key)
+
+    def best(self) -> Optional[MarketOrder]:
+        """Oldest order at the best price"""
+        if not self._keys:
+            return None
+        return self._levels[self._keys[-1]][0]
+
+    def fill_best(self, quantity: int) -> None:
+        """Reduce the best order by quantity, dropping it once filled"""
+        key = self._keys[-1]
+        level = self._levels[key]
+        order = level[0]
+        order.remaining -= quantity
+        self._volume[key] -= quantity
+        if order.remaining == 0:
+            level.popleft()
+            if not level:
+                self._drop_level(key)
+
+    def _drop_level(self, key: float) -> None:
+        del self._levels[key]
+        del self._volume[key]
+        self._keys.pop(bisect.bisect_left(self._keys, key))
+
+    def best_price(self) -> Optional[float]:
+        if not self._keys:
+            return None
+        return abs(self._keys[-1])
+
+    def depth(self, levels: int) -> List[dict]:
+        return [
+            {"price": abs(key), "quantity": self._volume[key], "orders": len(self._levels[key])}
+            for key in reversed(self._keys[-levels:])
+        ]
+
+
+class OrderBook:
+    """Price-time priority book for one (item name, quality)"""
+
+    def __init__(self, item_name: str, quality: int):
+        self.item_name = item_name
+        self.quality = quality
+        self.bids = _BookSide(is_bid=True)
+        self.asks = _BookSide(is_bid=False)
+
+    def side(self, side: str) -> _BookSide:
+        return self.bids if side == "buy" else self.asks
+
+    def match(self, order: MarketOrder) -> List[Tuple[MarketOrder, int, float]]:
+        """Match an incoming order against the book, resting any remainder.
+
+        Returns (resting order, quantity, price) per fill, executed at the
+        resting order's price. A user's own resting orders are never matched.
+        """
+        fills = []
+        opposite = self.asks if order.side == "buy" else self.bids
+        skipped = []
+
+        while order.remaining > 0:
+            resting = opposite.best()
+            if resting is None:
+                break
+            crosses = order.price >= resting.price if order.side == "buy" else order.price <= resting.price
+            if not crosses:
+                break
+            if resting.user_id == order.user_id:
+                # Step over self-trades and restore them once matching is done
+                opposite.remove(resting)
+                skipped.append(resting)
+                continue
+
+            quantity = min(order.remaining, resting.remaining)
+            price = resting.price
+            opposite.fill_best(quantity)
+            order.remaining -= quantity
+            fills.append((resting, quantity, price))
+
+        for resting in reversed(skipped):
+            # Skipped orders were at the front of their level; put them back there
+            opposite.add(resting, front=True)
+
+        if order.remaining > 0:
+            self.side(order.side).add(order)
+        return fills
+
+
+class OrderBookService:
+    """In-memory matching engine for market orders.
+
+    Orders are escrowed and persisted to `market_orders` synchronously; fills,
+    order state and settlement are buffered and written in one transaction per
+    flush. After a crash the books rebuild from the last flushed order state,
+    which is consistent with the last flushed settlement. The engine assumes a
+    single process owns the books.
+    """
+
+    def __init__(self, flush_interval: float = MARKET_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.books: Dict[BookKey, OrderBook] = {}
+        self.orders: Dict[str, MarketOrder] = {}
+        self._sequence = 0
+        self._pending_fills: List[MarketTransaction] = []
+        self._dirty_orders: Dict[str, MarketOrder] = {}
+        self._gold: Dict[str, float] = defaultdict(float)
+        self._inventory: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.fills_flushed = 0
+
+    def book(self, item_name: str, quality: int) -> OrderBook:
+        key = (item_name, quality)
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = OrderBook(item_name, quality)
+        return book
+
+    async def rebuild(self) -> None:
+        """Load open orders from Mongo into fresh books"""
+        db = await get_database()
+        self.books.clear()
+        self.orders.clear()
+
+        cursor = db.market_orders.find({"status": "open"}).sort("sequence", 1)
+        async for order_doc in cursor:
+            order = MarketOrder(**order_doc)
+            self.book(order.item_name, order.quality).side(order.side).add(order)
+            self.orders[order.id] = order
+
+        last = await db.market_orders.find_one({}, {"sequence": 1}, sort=[("sequence", -1)])
+        self._sequence = last["sequence"] if last else 0
+        logger.info(f"Order books rebuilt with {len(self.orders)} open orders")
+
+    async def start(self) -> None:
+        await self.rebuild()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing market fills: {e}")
+
+    async def place_order(self, order_data: OrderCreate, user_id: str) -> dict:
+        """Escrow funds or goods, persist the order and match it"""
+        db = await get_database()
+
+        self._sequence += 1
+        order = MarketOrder(
+            user_id=user_id,
+            item_name=order_data.item_name,
+            quality=order_data.quality,
+            side=order_data.side,
+            price=order_data.price,
+            quantity=order_data.quantity,
+            remaining=order_data.quantity,
+            sequence=self._sequence
+        )
+
+        async def escrow(session):
+            if order.side == "buy":
+                cost = order.price * order.quantity
+                result = await db.users.update_one(
+                    {"id": user_id, "gold": {"$gte": cost}},
+                    {"$inc": {"gold": -cost}},
+                    session=session
+                )
+                detail = "Insufficient gold"
+            else:
+                result = await db.user_inventory.update_one(
+                    {"user_id": user_id, "item_name": order.item_name, "quantity": {"$gte": order.quantity}},
+                    {"$inc": {"quantity": -order.quantity}},
+                    session=session
+                )
+                detail = "Not enough items in inventory"
+            if result.matched_count == 0:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+            await db.market_orders.insert_one(order.model_dump(), session=session)
+
+        async with await db.client.start_session() as session:
+            await session.with_transaction(escrow)
+        if order.side == "buy":
+            auth_service.invalidate_user(user_id)
+
+        # Matching never awaits, so each order sees a consistent book
+        fills = self.book(order.item_name, order.quality).match(order)
+        for resting, quantity, price in fills:
+            self._record_fill(order, resting, quantity, price)
+        if order.remaining > 0:
+            self.orders[order.id] = order
+        else:
+            order.status = "filled"
+        self._dirty_orders[order.id] = order
+
+        return {
+            "order": MarketOrderResponse(**order.model_dump()),
+            "fills": [{"quantity": quantity, "price": price} for _, quantity, price in fills]
+        }
+
+    def _record_fill(self, incoming: MarketOrder, resting: MarketOrder, quantity: int, price: float) -> None:
+        buy, sell = (incoming, resting) if incoming.side == "buy" else (resting, incoming)
+
+        self._pending_fills.append(MarketTransaction(
+            item_id=sell.id,
+            buyer_id=buy.user_id,
+            seller_id=sell.user_id,
+            item_name=sell.item_name,
+            quality=sell.quality,
+            quantity=quantity,
+            price_per_unit=price,
+            total_price=price * quantity,
+            buy_order_id=buy.id,
+            sell_order_id=sell.id
+        ))
+
+        # Seller is paid the fill price; buyer gets back the gap to their limit
+        self._gold[sell.user_id] += price * quantity
+        refund = (buy.price - price) * quantity
+        if refund:
+            self._gold[buy.user_id] += refund
+        self._inventory[(buy.user_id, buy.item_name)] += quantity
+
+        if resting.remaining == 0:
+            resting.status = "filled"
+            self.orders.pop(resting.id, None)
+        self._dirty_orders[resting.id] = resting
+
+    async def cancel_order(self, order_id: str, user_id: str) -> MarketOrderResponse:
+        """Pull an open order from its book and release its escrow"""
+        order = self.orders.get(order_id)
+        if not order or order.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found or not open"
+            )
+
+        self.book(order.item_name, order.quality).side(order.side).remove(order)
+        del self.orders[order_id]
+        order.status = "cancelled"
+        if order.side == "buy":
+            self._gold[user_id] += order.price * order.remaining
+        else:
+            self._inventory[(user_id, order.item_name)] += order.remaining
+        self._dirty_orders[order.id] = order
+
+        return MarketOrderResponse(**order.model_dump())
+
+    async def flush(self) -> int:
+        """Write buffered fills, order state and settlement in one transaction"""
+        async with self._flush_lock:
+            if not self._dirty_orders and not self._pending_fills:
+                return 0
+
+            fills, self._pending_fills = self._pending_fills, []
+            orders, self._dirty_orders = self._dirty_orders, {}
+            gold, self._gold = self._gold, defaultdict(float)
+            inventory, self._inventory = self._inventory, defaultdict(int)
+
+            db = await get_database()
+
+            async def write(session):
+                if fills:
+                    await db.market_transactions.insert_many(
+                        [fill.model_dump() for fill in fills], ordered=False, session=session
+                    )
+                await db.market_orders.bulk_write([
+                    UpdateOne({"id": order.id}, {"$set": {"remaining": order.remaining, "status": order.status}})
+                    for order in orders.values()
+                ], ordered=False, session=session)
+                if gold:
+                    await db.users.bulk_write([
+                        UpdateOne({"id": user_id}, {"$inc": {"gold": amount}})
+                        for user_id, amount in gold.items()
+                    ], ordered=False, session=session)
+                if inventory:
+                    await db.user_inventory.bulk_write([
+                        UpdateOne({"user_id": user_id, "item_name": item_name}, {"$inc": {"quantity": quantity}}, upsert=True)
+                        for (user_id, item_name), quantity in inventory.items()
+                    ], ordered=False, session=session)
+
+            try:
+                async with await db.client.start_session() as session:
+                    await session.with_transaction(write)
+            except Exception:
+                # Put everything back so the next flush retries it
+                self._pending_fills[:0] = fills
+                for order_id, order in orders.items():
+                    self._dirty_orders.setdefault(order_id, order)
+                for user_id, amount in gold.items():
+                    self._gold[user_id] += amount
+                for key, quantity in inventory.items():
+                    self._inventory[key] += quantity
+                raise
+
+            auth_service.invalidate_user(*gold.keys())
+            self.fills_flushed += len(fills)
+            return len(fills)
+
+    def get_book(self, item_name: str, quality: int, levels: int = 10) -> dict:
+        """Best bid/ask and aggregated depth, served from memory"""
+        book = self.books.get((item_name, quality))
+        if book is None:
+            return {"item_name": item_name, "quality": quality, "best_bid": None, "best_ask": None, "bids": [], "asks": []}
+        return {
+            "item_name": item_name,
+            "quality": quality,
+            "best_bid": book.bids.best_price(),
+            "best_ask": book.asks.best_price(),
+            "bids": book.bids.depth(levels),
+            "asks": book.asks.depth(levels)
+        }
+
+    def stats(self) -> dict:
+        return {
+            "books": len(self.books),
+            "open_orders": len(self.orders),
+            "pending_fills": len(self._pending_fills),
+            "fills_flushed": self.fills_flushed
+        }
+
+# Create global order book service instance
+order_book_service = OrderBookService()
@@ -0,0 +1,51 @@
+from typing import Any, List, Optional, Tuple
+from datetime import datetime
+from fastapi import HTTPException, status
+import base64
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: Any, tiebreak: str) -> str:
+    """Opaque token for the position after (sort_value, tiebreak)"""
+    if isinstance(sort_value, datetime):
+        payload = {"t": sort_value.isoformat(), "k": tiebreak}
+    else:
+        payload = {"v": sort_value, "k": tiebreak}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Any, str]:
+    """Inverse of encode_cursor; rejects tampered or malformed tokens"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        sort_value = datetime.fromisoformat(payload["t"]) if "t" in payload else payload["v"]
+        return sort_value, str(payload["k"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_filter(field: str, cursor: str, tiebreak_field: str = "id", descending: bool = True) -> dict:
+    """Filter for rows strictly after cursor in (field, tiebreak_field) order"""
+    sort_value, tiebreak = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    # The plain range on field bounds the index scan; $or breaks ties on tiebreak_field
+    return {field: {op + "e": sort_value}, "$or": [
+        {field: {op: sort_value}},
+        {field: sort_value, tiebreak_field: {op: tiebreak}}
+    ]}
+
+
+def next_page(docs: List[dict], limit: int, field: str, tiebreak_field: str = "id") -> Tuple[List[dict], Optional[str]]:
+    """Trim a limit + 1 fetch to one page and build the cursor for the next"""
+    if len(docs) <= limit:
+        return docs, None
+    page = docs[:limit]
+    last = page[-1]
+    return page, encode_cursor(last[field], last[tiebreak_field])
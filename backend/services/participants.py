@@ -0,0 +1,259 @@
+from typing import Dict, Optional, Set
+from pymongo import UpdateOne
+from database.connection import get_database
+from services.damage_aggregator import damage_aggregator
+import asyncio
+import hashlib
+import math
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARTICIPANTS_EXACT_LIMIT = int(os.environ.get("PARTICIPANTS_EXACT_LIMIT", "1000"))
+PARTICIPANTS_HLL_PRECISION = int(os.environ.get("PARTICIPANTS_HLL_PRECISION", "14"))
+PARTICIPANTS_PERSIST_INTERVAL = float(os.environ.get("PARTICIPANTS_PERSIST_INTERVAL", "10"))
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class DistinctCounter:
+    """Distinct user count: an exact set, then HyperLogLog past exact_limit.
+
+    The HyperLogLog keeps 2**precision one-byte registers (16 KB and about
+    0.8% standard error at the default precision 14). The estimate's
+    inputs are maintained on every register change, so count() is O(1).
+    Counters merge losslessly, which makes persisting them idempotent.
+    """
+
+    def __init__(self, exact_limit: int = PARTICIPANTS_EXACT_LIMIT, precision: int = PARTICIPANTS_HLL_PRECISION):
+        self.exact_limit = exact_limit
+        self.precision = precision
+        self.exact: Optional[Set[str]] = set()
+        self.registers: Optional[bytearray] = None
+        self._inverse_sum = 0.0
+        self._zeros = 0
+
+    def add(self, user_id: str) -> bool:
+        """Count user_id; returns whether the counter changed"""
+        if self.exact is not None:
+            if user_id in self.exact:
+                return False
+            self.exact.add(user_id)
+            if len(self.exact) > self.exact_limit:
+                self._to_hll()
+            return True
+        return self._add_hash(_hash64(user_id))
+
+    def _to_hll(self) -> None:
+        size = 1 << self.precision
+        self.registers = bytearray(size)
+        self._inverse_sum = float(size)
+        self._zeros = size
+        exact, self.exact = self.exact, None
+        for user_id in exact:
+            self._add_hash(_hash64(user_id))
+
+    def _add_hash(self, value: int) -> bool:
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        current = self.registers[index]
+        if rank <= current:
+            return False
+        self.registers[index] = rank
+        self._inverse_sum += 2.0 ** -rank - 2.0 ** -current
+        if current == 0:
+            self._zeros -= 1
+        return True
+
+    def _recompute(self) -> None:
+        self._inverse_sum = sum(2.0 ** -register for register in self.registers)
+        self._zeros = self.registers.count(0)
+
+    def count(self) -> int:
+        if self.exact is not None:
+            return len(self.exact)
+        size = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / size) * size * size / self._inverse_sum
+        if estimate <= 2.5 * size and self._zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = size * math.log(size / self._zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "DistinctCounter") -> None:
+        """Fold other's participants into this counter"""
+        if other.exact is not None:
+            for user_id in other.exact:
+                self.add(user_id)
+            return
+        if self.exact is not None:
+            self._to_hll()
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(max(pair) for pair in zip(self.registers, other.registers))
+        self._recompute()
+
+    def to_doc(self) -> dict:
+        if self.exact is not None:
+            return {"exact": sorted(self.exact)}
+        return {"precision": self.precision, "registers": bytes(self.registers)}
+
+    @classmethod
+    def from_doc(cls, doc: Optional[dict]) -> "DistinctCounter":
+        counter = cls()
+        if not doc:
+            return counter
+        if "registers" in doc:
+            counter.precision = doc["precision"]
+            counter.exact = None
+            counter.registers = bytearray(doc["registers"])
+            counter._recompute()
+        else:
+            counter.exact = set(doc.get("exact", []))
+        return counter
+
+
+class ParticipantTracker:
+    """Distinct fighters per war, kept in memory and persisted with the war.
+
+    Recorded hits add their user to the war's counter. Every
+    PARTICIPANTS_PERSIST_INTERVAL seconds changed counters are merged
+    with the sketch stored on the war (another process may have added
+    fighters) and written back with participants_count, guarded by
+    participants_version so concurrent writers retry instead of
+    overwriting each other.
+    """
+
+    def __init__(self, persist_interval: float = PARTICIPANTS_PERSIST_INTERVAL):
+        self.persist_interval = persist_interval
+        self.counters: Dict[str, DistinctCounter] = {}
+        self._dirty: Set[str] = set()
+        self._finished: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.persists = 0
+        damage_aggregator.add_listener(self._on_hit)
+
+    def _on_hit(self, war_id: str, user_id: str, side: str, damage: int, hits: int) -> None:
+        if war_id in self._finished:
+            return
+        counter = self.counters.get(war_id)
+        if counter is None:
+            counter = self.counters[war_id] = DistinctCounter()
+        if counter.add(user_id):
+            self._dirty.add(war_id)
+
+    def count(self, war_id: str) -> Optional[int]:
+        """Distinct fighters in war_id, or None if the war isn't tracked here"""
+        counter = self.counters.get(war_id)
+        return None if counter is None else counter.count()
+
+    async def start(self) -> None:
+        await self.load()
+        self._task = asyncio.create_task(self._persist_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+    async def _persist_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+                await self._drop_finished()
+            except Exception as e:
+                logger.error(f"Error persisting war participants: {e}")
+
+    async def load(self) -> int:
+        """Load counters for active wars; wars without a sketch are rebuilt from battle_participation"""
+        db = await get_database()
+        counters: Dict[str, DistinctCounter] = {}
+        missing = []
+        async for war in db.wars.find({"status": "active"}, {"_id": 0, "id": 1, "participants_sketch": 1}):
+            counters[war["id"]] = DistinctCounter.from_doc(war.get("participants_sketch"))
+            if war.get("participants_sketch") is None:
+                missing.append(war["id"])
+
+        if missing:
+            pipeline = [
+                {"$match": {"war_id": {"$in": missing}}},
+                {"$group": {"_id": {"war_id": "$war_id", "user_id": "$user_id"}}}
+            ]
+            async for row in db.battle_participation.aggregate(pipeline, allowDiskUse=True):
+                counters[row["_id"]["war_id"]].add(row["_id"]["user_id"])
+
+        # Hits recorded while loading went into the old counters
+        for war_id, counter in self.counters.items():
+            counters.setdefault(war_id, DistinctCounter()).merge(counter)
+        self.counters = counters
+        self._dirty |= set(missing)
+        return len(counters)
+
+    async def persist(self) -> int:
+        """Merge changed counters with the stored sketches and write them back"""
+        dirty, self._dirty = self._dirty, set()
+        war_ids = [war_id for war_id in dirty if war_id in self.counters]
+        if not war_ids:
+            return 0
+
+        db = await get_database()
+        try:
+            ops = []
+            cursor = db.wars.find(
+                {"id": {"$in": war_ids}},
+                {"_id": 0, "id": 1, "participants_sketch": 1, "participants_version": 1}
+            )
+            async for war in cursor:
+                counter = self.counters[war["id"]]
+                counter.merge(DistinctCounter.from_doc(war.get("participants_sketch")))
+                version = war.get("participants_version", 0)
+                ops.append(UpdateOne(
+                    {"id": war["id"], "participants_version": war.get("participants_version")},
+                    {"$set": {
+                        "participants_sketch": counter.to_doc(),
+                        "participants_count": counter.count(),
+                        "participants_version": version + 1
+                    }}
+                ))
+            if not ops:
+                return 0
+            result = await db.wars.bulk_write(ops, ordered=False)
+        except Exception:
+            self._dirty |= dirty
+            raise
+
+        if result.modified_count < len(ops):
+            # Another process wrote first; merging again next time is harmless
+            self._dirty |= set(war_ids)
+        self.persists += 1
+        return result.modified_count
+
+    async def _drop_finished(self) -> None:
+        """Forget counters of finished wars; their persisted count is final"""
+        db = await get_database()
+        war_ids = [war_id for war_id in self.counters if war_id not in self._dirty]
+        if not war_ids:
+            return
+        async for war in db.wars.find({"id": {"$in": war_ids}, "status": "finished"}, {"_id": 0, "id": 1}):
+            self.counters.pop(war["id"], None)
+            self._finished.add(war["id"])
+
+    def stats(self) -> dict:
+        return {
+            "wars": len(self.counters),
+            "hll_wars": sum(counter.exact is None for counter in self.counters.values()),
+            "dirty_wars": len(self._dirty),
+            "persists": self.persists
+        }
+
+# Create global participant tracker instance
+participant_tracker = ParticipantTracker()
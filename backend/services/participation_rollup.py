@@ -0,0 +1,169 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+from pathlib import Path
+from pymongo import UpdateOne
+from models.military import BattleParticipationSummary
+from database.connection import get_database
+from services.damage_aggregator import damage_aggregator
+import asyncio
+import gzip
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARTICIPATION_ROLLUP_INTERVAL = float(os.environ.get("PARTICIPATION_ROLLUP_INTERVAL", "300"))
+PARTICIPATION_ROLLUP_GRACE = float(os.environ.get("PARTICIPATION_ROLLUP_GRACE_SECONDS", "120"))
+PARTICIPATION_ARCHIVE = os.environ.get("PARTICIPATION_ARCHIVE", "true").lower() == "true"
+PARTICIPATION_ARCHIVE_CHUNK = 10000
+PARTICIPATION_ARCHIVE_DIR = os.environ.get(
+    "PARTICIPATION_ARCHIVE_DIR", str(Path(__file__).parent.parent / "data" / "participation_archive")
+)
+
+
+class ParticipationRollup:
+    """Compacts battle_participation of finished wars.
+
+    Once a war has been finished for PARTICIPATION_ROLLUP_GRACE_SECONDS
+    (so late hits have landed), its raw rows are summed per (user, side)
+    into `battle_participation_summary`, written to a gzipped NDJSON file
+    under PARTICIPATION_ARCHIVE_DIR and deleted. Every step is safe to
+    repeat, and the war is only marked rolled up after the delete, so an
+    interrupted war is simply picked up again on the next pass. Raw rows
+    of wars that are never rolled up expire through the created_at TTL
+    index.
+    """
+
+    def __init__(self, interval: float = PARTICIPATION_ROLLUP_INTERVAL, grace: float = PARTICIPATION_ROLLUP_GRACE,
+                 archive_dir: Optional[str] = PARTICIPATION_ARCHIVE_DIR if PARTICIPATION_ARCHIVE else None):
+        self.interval = interval
+        self.grace = timedelta(seconds=grace)
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.wars_rolled_up = 0
+        self.rows_compacted = 0
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error rolling up battle participation: {e}")
+
+    async def run_once(self, now: Optional[datetime] = None) -> dict:
+        """Roll up every finished war past the grace period"""
+        async with self._lock:
+            db = await get_database()
+            now = now or datetime.utcnow()
+            await damage_aggregator.flush()
+
+            wars = await db.wars.find(
+                {"status": "finished", "participation_rolled_up_at": None, "finished_at": {"$lte": now - self.grace}},
+                {"_id": 0, "id": 1, "winner": 1, "finished_at": 1}
+            ).to_list(None)
+
+            rows = 0
+            for war in wars:
+                rows += await self._roll_up(db, war, now)
+            self.wars_rolled_up += len(wars)
+            self.rows_compacted += rows
+            return {"wars": len(wars), "rows": rows}
+
+    async def _roll_up(self, db, war: dict, now: datetime) -> int:
+        pipeline = [
+            {"$match": {"war_id": war["id"]}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "side": "$side"},
+                "damage": {"$sum": "$damage_dealt"},
+                "hits": {"$sum": "$rounds_participated"},
+                "rows": {"$sum": 1}
+            }}
+        ]
+        ops: List[UpdateOne] = []
+        rows = 0
+        async for group in db.battle_participation.aggregate(pipeline, allowDiskUse=True):
+            rows += group["rows"]
+            summary = BattleParticipationSummary(
+                war_id=war["id"],
+                user_id=group["_id"]["user_id"],
+                side=group["_id"]["side"],
+                damage_dealt=group["damage"],
+                hits=group["hits"],
+                won=group["_id"]["side"] == war.get("winner"),
+                finished_at=war["finished_at"]
+            )
+            # Totals are recomputed from raw rows, so replaying a half-finished rollup is idempotent
+            ops.append(UpdateOne(
+                {"war_id": summary.war_id, "user_id": summary.user_id, "side": summary.side},
+                {"$set": summary.model_dump()},
+                upsert=True
+            ))
+        if ops:
+            await db.battle_participation_summary.bulk_write(ops, ordered=False)
+
+        if rows:
+            if self.archive_dir is not None:
+                await self._archive(db, war["id"])
+            await db.battle_participation.delete_many({"war_id": war["id"]})
+
+        await db.wars.update_one({"id": war["id"]}, {"$set": {"participation_rolled_up_at": now}})
+        logger.info(f"Rolled up {rows} participation rows of war {war['id']} into {len(ops)} summaries")
+        return rows
+
+    async def _archive(self, db, war_id: str) -> None:
+        """Stream a war's raw rows into <archive_dir>/<war_id>.ndjson.gz"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        path = self.archive_dir / f"{war_id}.ndjson.gz"
+        partial = path.with_suffix(".partial")
+        archive = gzip.open(partial, "wt", encoding="utf-8")
+        try:
+            cursor = db.battle_participation.find({"war_id": war_id}, {"_id": 0})
+            while True:
+                rows = await cursor.to_list(PARTICIPATION_ARCHIVE_CHUNK)
+                if not rows:
+                    break
+                lines = "".join(json.dumps(row, default=str, separators=(",", ":")) + "\n" for row in rows)
+                # gzip compression is CPU-bound, keep it off the event loop
+                await asyncio.to_thread(archive.write, lines)
+        finally:
+            archive.close()
+        partial.replace(path)
+
+    async def user_war_record(self, user_id: str) -> dict:
+        """Wars fought, won and lost by a user, from rolled-up wars"""
+        db = await get_database()
+        pipeline = [
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": "$war_id", "won": {"$max": "$won"}}},
+            {"$group": {"_id": None, "wars": {"$sum": 1}, "won": {"$sum": {"$cond": ["$won", 1, 0]}}}}
+        ]
+        record = await db.battle_participation_summary.aggregate(pipeline).to_list(1)
+        wars = record[0]["wars"] if record else 0
+        won = record[0]["won"] if record else 0
+        return {"wars": wars, "won": won, "lost": wars - won}
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "archive": self.archive_dir is not None,
+            "wars_rolled_up": self.wars_rolled_up,
+            "rows_compacted": self.rows_compacted
+        }
+
+# Create global participation rollup instance
+participation_rollup = ParticipationRollup()
@@ -0,0 +1,238 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from models.politics import PartyMember, PoliticalParty, PoliticalPartyCreate
+from models.user import UserResponse
+from database.connection import get_database
+import numpy as np
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARTY_RECOMPUTE_INTERVAL = float(os.environ.get("PARTY_RECOMPUTE_INTERVAL", "300"))
+PARTY_POPULARITY_WINDOW_DAYS = float(os.environ.get("PARTY_POPULARITY_WINDOW_DAYS", "30"))
+
+# Popularity = 100 * weighted sum of member share, vote share and proposal approval
+MEMBER_WEIGHT = 0.4
+VOTE_WEIGHT = 0.4
+APPROVAL_WEIGHT = 0.2
+
+PARTY_FIELDS = {"_id": 0, "id": 1, "name": 1, "leader_id": 1, "ideology": 1, "founded_at": 1}
+
+
+def score_popularity(members: np.ndarray, votes: np.ndarray, passed: np.ndarray, rejected: np.ndarray) -> np.ndarray:
+    """Popularity per party from its members, election votes and proposal outcomes"""
+    member_share = members / max(members.sum(), 1)
+    vote_share = votes / max(votes.sum(), 1)
+    # Laplace smoothed, so a party without settled proposals sits at 0.5
+    approval = (passed + 1) / (passed + rejected + 2)
+    return np.round(100 * (MEMBER_WEIGHT * member_share + VOTE_WEIGHT * vote_share + APPROVAL_WEIGHT * approval), 2)
+
+
+class PartyService:
+    """Political parties, with popularity and members_count kept by a batch job.
+
+    Every PARTY_RECOMPUTE_INTERVAL seconds one aggregation over
+    `political_parties` counts each party's members, the votes its
+    candidates received and its passed and rejected proposals within the
+    last PARTY_POPULARITY_WINDOW_DAYS. Popularity is scored in one numpy
+    pass, written back with a single bulk_write and published as a ranked
+    list, so party pages only ever read stored values.
+    """
+
+    def __init__(self, interval: float = PARTY_RECOMPUTE_INTERVAL, window_days: float = PARTY_POPULARITY_WINDOW_DAYS):
+        self.interval = interval
+        self.window = timedelta(days=window_days)
+        self.ranked: List[dict] = []
+        self._by_id: Dict[str, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.recomputes = 0
+        self.last_recompute: Optional[datetime] = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._recompute_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _recompute_loop(self) -> None:
+        while True:
+            try:
+                await self.recompute()
+            except Exception as e:
+                logger.error(f"Error recomputing party popularity: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def recompute(self, now: Optional[datetime] = None) -> int:
+        """Recompute popularity and members_count of every party; returns parties updated"""
+        db = await get_database()
+        now = now or datetime.utcnow()
+        since = now - self.window
+
+        pipeline = [
+            {"$project": PARTY_FIELDS},
+            {"$lookup": {
+                "from": "party_members", "localField": "id", "foreignField": "party_id", "as": "members",
+                "pipeline": [{"$count": "n"}]
+            }},
+            {"$lookup": {
+                "from": "elections", "localField": "id", "foreignField": "party_id", "as": "votes",
+                "pipeline": [
+                    {"$match": {"started_at": {"$gte": since}}},
+                    {"$group": {"_id": None, "n": {"$sum": "$votes"}}}
+                ]
+            }},
+            {"$lookup": {
+                "from": "proposals", "localField": "id", "foreignField": "party_id", "as": "proposals",
+                "pipeline": [
+                    {"$match": {"created_at": {"$gte": since}, "status": {"$in": ["passed", "rejected"]}}},
+                    {"$group": {"_id": "$status", "n": {"$sum": 1}}}
+                ]
+            }},
+        ]
+        parties = await db.political_parties.aggregate(pipeline, allowDiskUse=True).to_list(None)
+        if not parties:
+            self._publish([])
+            return 0
+
+        def total(rows: List[dict], key: Optional[str] = None) -> int:
+            return sum(row["n"] for row in rows if key is None or row["_id"] == key)
+
+        members = np.array([total(party.pop("members")) for party in parties])
+        votes = np.array([total(party.pop("votes")) for party in parties])
+        outcomes = [party.pop("proposals") for party in parties]
+        passed = np.array([total(rows, "passed") for rows in outcomes])
+        rejected = np.array([total(rows, "rejected") for rows in outcomes])
+        popularity = score_popularity(members, votes, passed, rejected)
+
+        for party, count, score in zip(parties, members.tolist(), popularity.tolist()):
+            party["members_count"] = count
+            party["popularity"] = score
+        await db.political_parties.bulk_write([
+            UpdateOne({"id": party["id"]}, {"$set": {
+                "members_count": party["members_count"],
+                "popularity": party["popularity"]
+            }})
+            for party in parties
+        ], ordered=False)
+
+        self._publish(parties)
+        self.recomputes += 1
+        self.last_recompute = now
+        return len(parties)
+
+    def _publish(self, parties: List[dict]) -> None:
+        ranked = sorted(parties, key=lambda party: (-party["popularity"], party["name"]))
+        for rank, party in enumerate(ranked, start=1):
+            party["rank"] = rank
+        # Swapped in whole, so readers never see a half-ranked list
+        self.ranked, self._by_id = ranked, {party["id"]: party for party in ranked}
+
+    # Reads
+
+    def list_parties(self, offset: int = 0, limit: int = 50) -> List[dict]:
+        """Parties by popularity, as of the last recompute"""
+        return self.ranked[offset:offset + limit]
+
+    async def get_party(self, party_id: str) -> dict:
+        party = self._by_id.get(party_id)
+        if party is not None:
+            return party
+
+        # Founded since the last recompute; serve its stored values unranked
+        db = await get_database()
+        party = await db.political_parties.find_one({"id": party_id}, {"_id": 0})
+        if not party:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Party not found"
+            )
+        party["rank"] = None
+        return party
+
+    async def party_of(self, user_ids: List[str]) -> Dict[str, str]:
+        """Party id per user, for users that are in a party"""
+        db = await get_database()
+        return {
+            member["user_id"]: member["party_id"]
+            async for member in db.party_members.find(
+                {"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "party_id": 1}
+            )
+        }
+
+    # Membership
+
+    async def create_party(self, party_data: PoliticalPartyCreate, user: UserResponse) -> dict:
+        """Found a party led by the user"""
+        db = await get_database()
+        party = PoliticalParty(name=party_data.name, ideology=party_data.ideology, leader_id=user.id)
+        member = PartyMember(user_id=user.id, username=user.username, party_id=party.id, role="Leader")
+
+        async def write(session):
+            await db.political_parties.insert_one(party.model_dump(), session=session)
+            await db.party_members.insert_one(member.model_dump(), session=session)
+
+        try:
+            async with await db.client.start_session() as session:
+                await session.with_transaction(write)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="You are already in a party"
+            )
+        return await self.get_party(party.id)
+
+    async def join_party(self, party_id: str, user: UserResponse) -> dict:
+        db = await get_database()
+        if not await db.political_parties.find_one({"id": party_id}, {"_id": 1}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Party not found"
+            )
+        try:
+            await db.party_members.insert_one(
+                PartyMember(user_id=user.id, username=user.username, party_id=party_id).model_dump()
+            )
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="You are already in a party"
+            )
+        return {"message": "Joined party", "party_id": party_id}
+
+    async def leave_party(self, user: UserResponse) -> dict:
+        db = await get_database()
+        member = await db.party_members.find_one({"user_id": user.id}, {"_id": 0, "party_id": 1, "role": 1})
+        if not member:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="You are not in a party"
+            )
+        if member["role"] == "Leader":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The party leader cannot leave the party"
+            )
+        await db.party_members.delete_one({"user_id": user.id})
+        return {"message": "Left party", "party_id": member["party_id"]}
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "parties": len(self.ranked),
+            "recomputes": self.recomputes,
+            "last_recompute": self.last_recompute
+        }
+
+# Create global party service instance
+party_service = PartyService()
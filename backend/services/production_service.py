@@ -0,0 +1,172 @@
+from typing import Dict, List, Optional
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from database.connection import get_database
+from services.auth_service import auth_service
+from services.economy_simulator import production_earnings
+import numpy as np
+import asyncio
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+PRODUCTION_TICK_ENABLED = os.environ.get("PRODUCTION_TICK_ENABLED", "true").lower() == "true"
+PRODUCTION_TICK_INTERVAL = float(os.environ.get("PRODUCTION_TICK_INTERVAL", "3600"))
+PRODUCTION_CHUNK_SIZE = int(os.environ.get("PRODUCTION_CHUNK_SIZE", "5000"))
+
+COMPANY_PROJECTION = {
+    "_id": 0, "id": 1, "owner_id": 1, "daily_revenue": 1, "productivity": 1,
+    "last_production": 1, "created_at": 1
+}
+
+
+class ProductionService:
+    """Scheduled batch production over all companies.
+
+    Each tick walks companies in id order, pays whole coins for the time
+    elapsed since last_production and advances last_production by exactly
+    the time paid for, so fractional output carries over to the next tick.
+    Each chunk is re-read, produced and paid inside one transaction, so a
+    crash pays nothing for the chunk and an overlapping tick (another
+    process or `manage.py production-tick`) hits a write conflict and
+    retries against the advanced last_production instead of paying the
+    same interval twice.
+    """
+
+    def __init__(self, interval: float = PRODUCTION_TICK_INTERVAL, chunk_size: int = PRODUCTION_CHUNK_SIZE):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.last_tick: Optional[dict] = None
+
+    async def start(self) -> None:
+        if PRODUCTION_TICK_ENABLED:
+            self._task = asyncio.create_task(self._tick_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _tick_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_tick()
+            except Exception as e:
+                logger.error(f"Error running production tick: {e}")
+
+    def _produce(self, companies: List[dict], now: datetime) -> tuple:
+        """Company updates and per-owner coin totals for one chunk"""
+        since = [company.get("last_production") or company["created_at"] for company in companies]
+        elapsed_days = (np.datetime64(now, "us") - np.array(since, dtype="datetime64[us]")) / np.timedelta64(1, "D")
+        revenue = np.fromiter((company["daily_revenue"] for company in companies), dtype=np.int64, count=len(companies))
+        productivity = np.fromiter((company["productivity"] for company in companies), dtype=np.float64, count=len(companies))
+        earnings, paid_days = production_earnings(revenue, productivity, elapsed_days)
+
+        company_ops = []
+        credits: Dict[str, int] = defaultdict(int)
+        for i in np.flatnonzero(earnings > 0):
+            company = companies[i]
+            paid_until = since[i] + timedelta(days=float(paid_days[i]))
+            # Guard on the value we read so an overlapping tick can't apply the same interval twice
+            company_ops.append(UpdateOne(
+                {"id": company["id"], "last_production": company.get("last_production")},
+                {"$set": {"last_production": paid_until}}
+            ))
+            credits[company["owner_id"]] += int(earnings[i])
+
+        return company_ops, credits
+
+    async def _apply(self, db, company_ids: List[str], now: datetime) -> tuple:
+        """Produce and pay one chunk in a transaction; returns (companies produced, coins credited)"""
+
+        async def produce(session):
+            companies = await db.companies.find(
+                {"id": {"$in": company_ids}}, COMPANY_PROJECTION, session=session
+            ).to_list(None)
+            company_ops, credits = self._produce(companies, now)
+            if company_ops:
+                result = await db.companies.bulk_write(company_ops, ordered=False, session=session)
+                if result.matched_count != len(company_ops):
+                    # Only possible if the snapshot guarantee is broken; never pay for unmatched companies
+                    raise RuntimeError("Production guard missed companies; aborting chunk")
+            if credits:
+                await db.users.bulk_write([
+                    UpdateOne({"id": owner_id}, {"$inc": {"coins": coins}})
+                    for owner_id, coins in credits.items()
+                ], ordered=False, session=session)
+            return len(company_ops), credits
+
+        async with await db.client.start_session() as session:
+            produced, credits = await session.with_transaction(produce)
+        if credits:
+            auth_service.invalidate_user(*credits.keys())
+        return produced, sum(credits.values())
+
+    async def run_tick(self, now: Optional[datetime] = None) -> dict:
+        """Produce for every company and report throughput"""
+        async with self._lock:
+            db = await get_database()
+            now = now or datetime.utcnow()
+            started = time.perf_counter()
+            scanned = produced = coins = 0
+            last_id = None
+            pending_write: Optional[asyncio.Task] = None
+
+            while True:
+                query = {"id": {"$gt": last_id}} if last_id else {}
+                company_ids = [
+                    company["id"] for company in
+                    await db.companies.find(query, {"_id": 0, "id": 1}).sort("id", 1).to_list(self.chunk_size)
+                ]
+                if not company_ids:
+                    break
+                last_id = company_ids[-1]
+                scanned += len(company_ids)
+
+                # Overlap this chunk's transaction with reading the next chunk's ids
+                if pending_write:
+                    chunk_produced, chunk_coins = await pending_write
+                    produced += chunk_produced
+                    coins += chunk_coins
+                pending_write = asyncio.create_task(self._apply(db, company_ids, now))
+
+            if pending_write:
+                chunk_produced, chunk_coins = await pending_write
+                produced += chunk_produced
+                coins += chunk_coins
+
+            elapsed = time.perf_counter() - started
+            self.last_tick = {
+                "at": now,
+                "companies_scanned": scanned,
+                "companies_produced": produced,
+                "coins_credited": coins,
+                "seconds": elapsed,
+                "companies_per_second": scanned / elapsed if elapsed > 0 else 0.0
+            }
+            logger.info(
+                f"Production tick: {scanned} companies scanned, {produced} produced, "
+                f"{coins} coins in {elapsed:.2f}s ({self.last_tick['companies_per_second']:.0f}/s)"
+            )
+            return self.last_tick
+
+    def stats(self) -> dict:
+        return {
+            "enabled": PRODUCTION_TICK_ENABLED,
+            "interval": self.interval,
+            "chunk_size": self.chunk_size,
+            "last_tick": self.last_tick
+        }
+
+# Create global production service instance
+production_service = ProductionService()
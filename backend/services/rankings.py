@@ -0,0 +1,233 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fastapi import HTTPException, status
+from sortedcontainers import SortedList
+from database.connection import get_database
+from services.auth_service import auth_service
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+RANKINGS_REFRESH_INTERVAL = float(os.environ.get("RANKINGS_REFRESH_INTERVAL", "1"))
+RANKINGS_REBUILD_INTERVAL = float(os.environ.get("RANKINGS_REBUILD_INTERVAL", "600"))
+RANKINGS_REFRESH_BATCH = 5000
+
+# Ranking name -> users field it orders by
+METRICS = {"level": "level", "damage": "stats.total_damage", "wealth": "gold"}
+
+USER_PROJECTION = {"_id": 0, "id": 1, "username": 1, **{field: 1 for field in METRICS.values()}}
+
+
+def _field(doc: dict, path: str) -> int:
+    for key in path.split("."):
+        doc = doc.get(key) or {}
+    return doc or 0
+
+
+class RankingIndex:
+    """Users ordered by one metric, highest first.
+
+    Entries are (-value, user_id) in a SortedList, so updating a user,
+    finding their rank and slicing around them are all O(log n). A rank
+    is one plus the number of users with a strictly higher value, so
+    tied users share it.
+    """
+
+    def __init__(self, values: Optional[Dict[str, int]] = None):
+        self.values: Dict[str, int] = dict(values or {})
+        self._order = SortedList((-value, user_id) for user_id, value in self.values.items())
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def update(self, user_id: str, value: int) -> None:
+        previous = self.values.get(user_id)
+        if previous == value:
+            return
+        if previous is not None:
+            self._order.remove((-previous, user_id))
+        self.values[user_id] = value
+        self._order.add((-value, user_id))
+
+    def rank(self, user_id: str) -> Optional[int]:
+        value = self.values.get(user_id)
+        if value is None:
+            return None
+        return self._order.bisect_left((-value, "")) + 1
+
+    def _entries(self, start: int, stop: int) -> List[Tuple[int, str, int]]:
+        """(rank, user_id, value) for positions start..stop"""
+        entries = []
+        for negative, user_id in self._order.islice(start, stop):
+            entries.append((self._order.bisect_left((negative, "")) + 1, user_id, -negative))
+        return entries
+
+    def top(self, offset: int, limit: int) -> List[Tuple[int, str, int]]:
+        return self._entries(offset, offset + limit)
+
+    def around(self, user_id: str, radius: int) -> List[Tuple[int, str, int]]:
+        """The user and up to radius users on either side"""
+        value = self.values.get(user_id)
+        if value is None:
+            return []
+        position = self._order.index((-value, user_id))
+        return self._entries(max(position - radius, 0), position + radius + 1)
+
+
+class RankingsService:
+    """Global player rankings by level, total damage and gold.
+
+    Every write path that changes these fields already calls
+    auth_service.invalidate_user, so an invalidation hook marks those
+    users dirty and every RANKINGS_REFRESH_INTERVAL seconds their current
+    values are read back with one $in query and moved in each index. A
+    full rebuild every RANKINGS_REBUILD_INTERVAL seconds picks up writes
+    made by other processes.
+    """
+
+    def __init__(self, refresh_interval: float = RANKINGS_REFRESH_INTERVAL,
+                 rebuild_interval: float = RANKINGS_REBUILD_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.indexes: Dict[str, RankingIndex] = {metric: RankingIndex() for metric in METRICS}
+        self.usernames: Dict[str, str] = {}
+        self._dirty: Set[str] = set()
+        # Users refreshed while a rebuild scans, whose new values the scan may have missed
+        self._refreshed_during_rebuild: Optional[Set[str]] = None
+        self._tasks: List[asyncio.Task] = []
+        self.refreshes = 0
+        self.rebuilds = 0
+        auth_service.add_invalidate_hook(self._mark_dirty)
+
+    def _mark_dirty(self, user_ids: Iterable[str]) -> None:
+        self._dirty.update(user_ids)
+
+    async def start(self) -> None:
+        await self.rebuild()
+        self._tasks = [
+            asyncio.create_task(self._loop(self.refresh, self.refresh_interval, "refreshing rankings")),
+            asyncio.create_task(self._loop(self.rebuild, self.rebuild_interval, "rebuilding rankings"))
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _loop(self, func, interval: float, action: str) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+            except Exception as e:
+                logger.error(f"Error {action}: {e}")
+
+    async def rebuild(self) -> int:
+        """Rebuild every index from the users collection"""
+        db = await get_database()
+        values: Dict[str, Dict[str, int]] = {metric: {} for metric in METRICS}
+        usernames: Dict[str, str] = {}
+        self._refreshed_during_rebuild = set()
+        try:
+            async for user in db.users.find({}, USER_PROJECTION):
+                usernames[user["id"]] = user["username"]
+                for metric, field in METRICS.items():
+                    values[metric][user["id"]] = _field(user, field)
+        finally:
+            refreshed, self._refreshed_during_rebuild = self._refreshed_during_rebuild, None
+
+        # Users written during the scan are refreshed again on the next pass
+        self._dirty |= refreshed
+        self.indexes = {metric: RankingIndex(values[metric]) for metric in METRICS}
+        self.usernames = usernames
+        self.rebuilds += 1
+        logger.info(f"Rebuilt rankings for {len(usernames)} users")
+        return len(usernames)
+
+    async def refresh(self, user_ids: Optional[Iterable[str]] = None) -> int:
+        """Re-read dirty users (or user_ids) and move them in every index"""
+        if user_ids is None:
+            user_ids, self._dirty = self._dirty, set()
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        if self._refreshed_during_rebuild is not None:
+            self._refreshed_during_rebuild.update(user_ids)
+
+        db = await get_database()
+        refreshed = 0
+        try:
+            for start in range(0, len(user_ids), RANKINGS_REFRESH_BATCH):
+                batch = user_ids[start:start + RANKINGS_REFRESH_BATCH]
+                async for user in db.users.find({"id": {"$in": batch}}, USER_PROJECTION):
+                    self.usernames[user["id"]] = user["username"]
+                    for metric, field in METRICS.items():
+                        self.indexes[metric].update(user["id"], _field(user, field))
+                    refreshed += 1
+        except Exception:
+            self._dirty.update(user_ids)
+            raise
+        self.refreshes += 1
+        return refreshed
+
+    def _index(self, metric: str) -> RankingIndex:
+        index = self.indexes.get(metric)
+        if index is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Ranking must be one of: {', '.join(METRICS)}"
+            )
+        return index
+
+    async def _ensure_ranked(self, user_id: str) -> None:
+        if user_id not in self.usernames or user_id in self._dirty:
+            self._dirty.discard(user_id)
+            await self.refresh([user_id])
+        if user_id not in self.usernames:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+    def _rows(self, entries: List[Tuple[int, str, int]]) -> List[dict]:
+        return [
+            {"rank": rank, "user_id": user_id, "username": self.usernames.get(user_id), "value": value}
+            for rank, user_id, value in entries
+        ]
+
+    async def get_user_ranks(self, user_id: str) -> dict:
+        """A user's rank and value in every ranking"""
+        await self._ensure_ranked(user_id)
+        return {
+            metric: {
+                "rank": index.rank(user_id),
+                "value": index.values[user_id],
+                "total": len(index)
+            }
+            for metric, index in self.indexes.items()
+        }
+
+    async def get_neighbours(self, metric: str, user_id: str, radius: int = 5) -> List[dict]:
+        """The user and the players ranked just above and below them"""
+        self._index(metric)
+        await self._ensure_ranked(user_id)
+        return self._rows(self.indexes[metric].around(user_id, radius))
+
+    def get_top(self, metric: str, offset: int = 0, limit: int = 50) -> List[dict]:
+        return self._rows(self._index(metric).top(offset, limit))
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self.usernames),
+            "dirty_users": len(self._dirty),
+            "refreshes": self.refreshes,
+            "rebuilds": self.rebuilds
+        }
+
+# Create global rankings service instance
+rankings_service = RankingsService()
@@ -0,0 +1,248 @@
+from typing import Dict, List, Optional, Tuple
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from models.training import TrainingJob
+from models.user import UserResponse
+from database.connection import get_database
+from services.auth_service import auth_service
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRAINING_SWEEP_INTERVAL = float(os.environ.get("TRAINING_SWEEP_INTERVAL", "60"))
+TRAINING_SWEEP_BATCH = int(os.environ.get("TRAINING_SWEEP_BATCH", "1000"))
+
+TRAINING_TYPES = {
+    "basic": {"name": "Basic Training", "cost": 10, "gain": 5, "xp": 100, "hours": 1},
+    "advanced": {"name": "Advanced Training", "cost": 25, "gain": 12, "xp": 250, "hours": 2},
+    "elite": {"name": "Elite Training", "cost": 50, "gain": 25, "xp": 500, "hours": 4},
+}
+
+# Share of a training's strength gain that each skill adds to stats.strength
+SKILL_STRENGTH_DIVISORS = {"strength": 1, "leadership": 2, "charisma": 3}
+
+MAX_LEVEL = 200
+
+# LEVEL_XP[i] is the total XP needed to reach level i + 1, computed once at import
+LEVEL_XP: List[int] = [0] + list(accumulate(round(100 * level ** 1.5) for level in range(1, MAX_LEVEL)))
+
+
+def level_progress(xp: int) -> Tuple[int, int, int]:
+    """(level, XP into that level, XP the level spans) for a total XP"""
+    level = bisect_right(LEVEL_XP, xp)
+    if level >= MAX_LEVEL:
+        return MAX_LEVEL, xp - LEVEL_XP[-1], 0
+    return level, xp - LEVEL_XP[level - 1], LEVEL_XP[level] - LEVEL_XP[level - 1]
+
+
+class TrainingService:
+    """Timed training jobs, completed lazily or by a batch sweep.
+
+    Starting a job debits its cost and stamps training_completes_at on the
+    user. No timer is kept per job: a job is completed the next time its
+    user is loaded after completes_at, or by the sweep that walks the
+    {status, completes_at} index every TRAINING_SWEEP_INTERVAL seconds.
+    Both paths share one transaction that flips the job to completed
+    before crediting the user, so a job is never applied twice.
+    """
+
+    def __init__(self, interval: float = TRAINING_SWEEP_INTERVAL, batch_size: int = TRAINING_SWEEP_BATCH):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self.jobs_started = 0
+        self.jobs_completed = 0
+        auth_service.add_load_hook(self._complete_on_load)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Error sweeping training jobs: {e}")
+
+    def get_options(self) -> List[dict]:
+        return [
+            {
+                "name": training["name"],
+                "cost": training["cost"],
+                "strengthGain": training["gain"],
+                "xp": training["xp"],
+                "time": f"{training['hours']} hour{'s' if training['hours'] != 1 else ''}"
+            }
+            for training in TRAINING_TYPES.values()
+        ]
+
+    async def start_training(self, skill: str, training_type: str, user: UserResponse) -> dict:
+        """Debit the cost and queue a training job for the user"""
+        training = TRAINING_TYPES.get(training_type)
+        if training is None:
+            raise HTTPException(status_code=400, detail="Invalid training type")
+        if skill not in SKILL_STRENGTH_DIVISORS:
+            raise HTTPException(status_code=400, detail="Invalid skill")
+
+        db = await get_database()
+        await self._complete_if_due(user)
+
+        now = datetime.utcnow()
+        job = TrainingJob(
+            user_id=user.id,
+            skill=skill,
+            training_type=training_type,
+            cost=training["cost"],
+            strength_gain=training["gain"] // SKILL_STRENGTH_DIVISORS[skill],
+            xp=training["xp"],
+            started_at=now,
+            completes_at=now + timedelta(hours=training["hours"])
+        )
+
+        async def enqueue(session):
+            debit = await db.users.update_one(
+                {"id": user.id, "gold": {"$gte": job.cost}},
+                {"$inc": {"gold": -job.cost}, "$set": {"training_completes_at": job.completes_at}},
+                session=session
+            )
+            if debit.modified_count == 0:
+                raise HTTPException(status_code=400, detail="Insufficient gold")
+            # The partial unique index on active jobs allows one per user
+            await db.training_jobs.insert_one(job.model_dump(), session=session)
+
+        try:
+            async with await db.client.start_session() as session:
+                await session.with_transaction(enqueue)
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail="Training already in progress")
+
+        auth_service.invalidate_user(user.id)
+        self.jobs_started += 1
+        return {
+            "message": f"Started {training['name'].lower()} for {skill}",
+            "skill": skill,
+            "gain": job.strength_gain,
+            "xp": job.xp,
+            "cost": job.cost,
+            "training_type": training_type,
+            "completes_at": job.completes_at
+        }
+
+    async def complete_due(self, query: Optional[dict] = None, now: Optional[datetime] = None) -> List[dict]:
+        """Complete one batch of due jobs matching query; returns the jobs completed"""
+        db = await get_database()
+        now = now or datetime.utcnow()
+        due = {**(query or {}), "status": "active", "completes_at": {"$lte": now}}
+
+        async def complete(session):
+            jobs = await db.training_jobs.find(due, {"_id": 0}, session=session).limit(self.batch_size).to_list(self.batch_size)
+            if not jobs:
+                return []
+            await db.training_jobs.update_many(
+                {"id": {"$in": [job["id"] for job in jobs]}, "status": "active"},
+                {"$set": {"status": "completed", "completed_at": now}},
+                session=session
+            )
+
+            experience: Dict[str, int] = {
+                user["id"]: user.get("stats", {}).get("experience", 0)
+                async for user in db.users.find(
+                    {"id": {"$in": [job["user_id"] for job in jobs]}},
+                    {"_id": 0, "id": 1, "stats.experience": 1},
+                    session=session
+                )
+            }
+            ops = []
+            for job in jobs:
+                level, _, _ = level_progress(experience.get(job["user_id"], 0) + job["xp"])
+                ops.append(UpdateOne(
+                    {"id": job["user_id"]},
+                    {
+                        "$inc": {
+                            "stats.strength": job["strength_gain"],
+                            "stats.experience": job["xp"],
+                            f"skills.{job['skill']}": job["xp"]
+                        },
+                        "$set": {"training_completes_at": None},
+                        "$max": {"level": level}
+                    }
+                ))
+            await db.users.bulk_write(ops, ordered=False, session=session)
+            return jobs
+
+        # A concurrent completer touching the same job conflicts, and the retry finds it completed
+        async with await db.client.start_session() as session:
+            jobs = await session.with_transaction(complete)
+
+        if jobs:
+            auth_service.invalidate_user(*(job["user_id"] for job in jobs))
+            self.jobs_completed += len(jobs)
+        return jobs
+
+    async def sweep(self, now: Optional[datetime] = None) -> int:
+        """Complete every due job in batches"""
+        completed = 0
+        while True:
+            jobs = await self.complete_due(now=now)
+            completed += len(jobs)
+            if len(jobs) < self.batch_size:
+                return completed
+
+    async def _complete_if_due(self, user: UserResponse) -> bool:
+        if user.training_completes_at is None or user.training_completes_at > datetime.utcnow():
+            return False
+        return bool(await self.complete_due({"user_id": user.id}))
+
+    async def _complete_on_load(self, user: UserResponse) -> UserResponse:
+        if not await self._complete_if_due(user):
+            return user
+        return await auth_service.get_user_by_id(user.id) or user
+
+    async def get_stats(self, user: UserResponse) -> dict:
+        """XP and level per skill, plus the job in progress"""
+        db = await get_database()
+        await self._complete_if_due(user)
+        user_doc = await db.users.find_one({"id": user.id}, {"_id": 0, "skills": 1}) or {}
+        skills = user_doc.get("skills", {})
+
+        stats = {}
+        for skill in SKILL_STRENGTH_DIVISORS:
+            level, xp, span = level_progress(skills.get(skill, 0))
+            stats[skill] = {"level": level, "xp": xp, "maxXp": span}
+
+        job = await db.training_jobs.find_one(
+            {"user_id": user.id, "status": "active"},
+            {"_id": 0, "skill": 1, "training_type": 1, "completes_at": 1}
+        )
+        stats["inProgress"] = None if job is None else {
+            "skill": job["skill"],
+            "trainingType": job["training_type"],
+            "completesAt": job["completes_at"]
+        }
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "jobs_started": self.jobs_started,
+            "jobs_completed": self.jobs_completed
+        }
+
+# Create global training service instance
+training_service = TrainingService()
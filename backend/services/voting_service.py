@@ -0,0 +1,394 @@
+from typing import Dict, List, Optional
+from collections import defaultdict
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from models.politics import Election, ElectionCreate, Proposal, ProposalCreate, Vote
+from models.user import UserResponse
+from database.connection import get_database
+from services.cache import LRUCache
+from services.party_service import party_service
+import asyncio
+import os
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+VOTE_FLUSH_INTERVAL = float(os.environ.get("VOTE_FLUSH_INTERVAL_MS", "500")) / 1000
+VOTE_TALLY_TTL = float(os.environ.get("VOTE_TALLY_TTL", "5"))
+VOTE_CLOSE_INTERVAL = float(os.environ.get("VOTE_CLOSE_INTERVAL", "30"))
+VOTE_CLOSE_BATCH = 1000
+
+PROPOSAL_FIELDS = {"for": "votes_for", "against": "votes_against"}
+
+
+class VotingService:
+    """Election and proposal votes, built for election-day bursts.
+
+    A vote is one insert into `votes`, where unique (race_id, voter_id) and
+    (proposal_id, voter_id) indexes enforce one vote per voter. Tallies are
+    not written per vote: increments are buffered and flushed as one
+    bulk_write of $inc every VOTE_FLUSH_INTERVAL_MS, and live standings
+    come from in-memory tallies reloaded every VOTE_TALLY_TTL seconds.
+    Stored counts are therefore live figures only: races and proposals
+    past their deadline are settled in batches every VOTE_CLOSE_INTERVAL
+    seconds with counts recounted from `votes`, and buffered increments
+    only apply to documents that are still active.
+    """
+
+    def __init__(self, flush_interval: float = VOTE_FLUSH_INTERVAL, close_interval: float = VOTE_CLOSE_INTERVAL,
+                 tally_ttl: float = VOTE_TALLY_TTL):
+        self.flush_interval = flush_interval
+        self.close_interval = close_interval
+        # race id -> {"race": ..., "candidates": {entry id: entry}}, stored counts plus pending increments
+        self.race_tallies = LRUCache(maxsize=10000, ttl=tally_ttl)
+        # proposal id -> proposal document with pending increments applied
+        self.proposal_tallies = LRUCache(maxsize=10000, ttl=tally_ttl)
+        self._pending_elections: Dict[str, int] = defaultdict(int)
+        self._pending_proposals: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # Increments taken by a flush that hasn't finished writing them
+        self._flushing_elections: Dict[str, int] = {}
+        self._flushing_proposals: Dict[str, Dict[str, int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+        self.votes_cast = 0
+        self.duplicate_votes = 0
+        self.flushes = 0
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._loop(self.flush, self.flush_interval, "flushing vote tallies")),
+            asyncio.create_task(self._loop(self.close_due, self.close_interval, "closing votes"))
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        await self.flush()
+
+    async def _loop(self, func, interval: float, action: str) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await func()
+            except Exception as e:
+                logger.error(f"Error {action}: {e}")
+
+    # Creation
+
+    async def create_election(self, election_data: ElectionCreate) -> dict:
+        """Open a race with one entry per candidate"""
+        db = await get_database()
+        candidate_ids = list(dict.fromkeys(election_data.candidate_ids))
+        candidates = {
+            user["id"]: user["username"]
+            async for user in db.users.find({"id": {"$in": candidate_ids}}, {"_id": 0, "id": 1, "username": 1})
+        }
+        missing = [candidate_id for candidate_id in candidate_ids if candidate_id not in candidates]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown candidates: {', '.join(missing)}"
+            )
+
+        parties = await party_service.party_of(candidate_ids)
+        race_id = str(uuid.uuid4())
+        ends_at = datetime.utcnow() + timedelta(hours=election_data.duration_hours)
+        entries = [
+            Election(
+                race_id=race_id,
+                election_type=election_data.election_type,
+                country=election_data.country,
+                candidate_id=candidate_id,
+                candidate_name=candidates[candidate_id],
+                party_id=parties.get(candidate_id),
+                position=position,
+                ends_at=ends_at
+            )
+            for position, candidate_id in enumerate(candidate_ids, start=1)
+        ]
+        await db.elections.insert_many([entry.model_dump() for entry in entries])
+        return await self.get_standings(race_id)
+
+    async def create_proposal(self, proposal_data: ProposalCreate, author: UserResponse) -> dict:
+        db = await get_database()
+        parties = await party_service.party_of([author.id])
+        proposal = Proposal(
+            title=proposal_data.title,
+            description=proposal_data.description,
+            author_id=author.id,
+            author_name=author.username,
+            party_id=parties.get(author.id),
+            voting_ends_at=datetime.utcnow() + timedelta(hours=proposal_data.duration_hours)
+        )
+        await db.proposals.insert_one(proposal.model_dump())
+        return await self.get_proposal(proposal.id)
+
+    # Tallies
+
+    async def _race_tally(self, race_id: str) -> dict:
+        tally = self.race_tallies.get(race_id)
+        if tally is not None:
+            return tally
+
+        db = await get_database()
+        entries = await db.elections.find({"race_id": race_id}, {"_id": 0}).to_list(None)
+        if not entries:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Election not found"
+            )
+        for entry in entries:
+            entry["votes"] += self._pending_elections.get(entry["id"], 0) + self._flushing_elections.get(entry["id"], 0)
+        tally = {"race": entries[0], "candidates": {entry["id"]: entry for entry in entries}}
+        self.race_tallies.set(race_id, tally)
+        return tally
+
+    async def _proposal_tally(self, proposal_id: str) -> dict:
+        proposal = self.proposal_tallies.get(proposal_id)
+        if proposal is not None:
+            return proposal
+
+        db = await get_database()
+        proposal = await db.proposals.find_one({"id": proposal_id}, {"_id": 0})
+        if not proposal:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Proposal not found"
+            )
+        for pending in (self._pending_proposals, self._flushing_proposals):
+            for field, value in pending.get(proposal_id, {}).items():
+                proposal[field] += value
+        self.proposal_tallies.set(proposal_id, proposal)
+        return proposal
+
+    async def get_standings(self, race_id: str) -> dict:
+        """Live standings of a race, most votes first"""
+        tally = await self._race_tally(race_id)
+        race = tally["race"]
+        candidates = sorted(tally["candidates"].values(), key=lambda entry: (-entry["votes"], entry["position"]))
+        return {
+            "race_id": race_id,
+            "election_type": race["election_type"],
+            "country": race["country"],
+            "status": race["status"],
+            "ends_at": race["ends_at"],
+            "total_votes": sum(entry["votes"] for entry in candidates),
+            "candidates": [
+                {
+                    "id": entry["id"],
+                    "candidate_id": entry["candidate_id"],
+                    "candidate_name": entry["candidate_name"],
+                    "party_id": entry.get("party_id"),
+                    "votes": entry["votes"],
+                    "position": entry["position"]
+                }
+                for entry in candidates
+            ]
+        }
+
+    async def get_proposal(self, proposal_id: str) -> dict:
+        """Proposal with live vote counts"""
+        return dict(await self._proposal_tally(proposal_id))
+
+    # Votes
+
+    async def _insert_vote(self, vote: Vote) -> None:
+        db = await get_database()
+        try:
+            await db.votes.insert_one(vote.model_dump())
+        except DuplicateKeyError:
+            self.duplicate_votes += 1
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="You have already voted"
+            )
+        self.votes_cast += 1
+
+    async def vote_in_election(self, race_id: str, entry_id: str, voter: UserResponse) -> dict:
+        tally = await self._race_tally(race_id)
+        race = tally["race"]
+        if race["status"] != "active" or race["ends_at"] <= datetime.utcnow():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Election is closed"
+            )
+        entry = tally["candidates"].get(entry_id)
+        if entry is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Candidate is not running in this election"
+            )
+
+        await self._insert_vote(Vote(election_id=entry_id, race_id=race_id, voter_id=voter.id, vote_type=entry_id))
+        entry["votes"] += 1
+        self._pending_elections[entry_id] += 1
+        return {"message": f"Vote cast for {entry['candidate_name']}", "race_id": race_id, "election_id": entry_id}
+
+    async def vote_on_proposal(self, proposal_id: str, vote_type: str, voter: UserResponse) -> dict:
+        field = PROPOSAL_FIELDS.get(vote_type)
+        if field is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Vote must be for or against"
+            )
+        proposal = await self._proposal_tally(proposal_id)
+        if proposal["status"] != "active" or proposal["voting_ends_at"] <= datetime.utcnow():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Voting on this proposal is closed"
+            )
+
+        await self._insert_vote(Vote(proposal_id=proposal_id, voter_id=voter.id, vote_type=vote_type))
+        proposal[field] += 1
+        self._pending_proposals[proposal_id][field] += 1
+        return {"message": f"Voted {vote_type} {proposal['title']}", "proposal_id": proposal_id}
+
+    # Batch writes
+
+    async def _write_increments(self, collection, increments: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+        """$inc each active document; returns the increments that were not applied.
+
+        The write is unordered, so on BulkWriteError every operation other
+        than those listed in writeErrors has already landed.
+        """
+        if not increments:
+            return {}
+        doc_ids = list(increments)
+        try:
+            # Settled documents were recounted from votes, so late increments must not land on them
+            await collection.bulk_write([
+                UpdateOne({"id": doc_id, "status": "active"}, {"$inc": dict(increments[doc_id])})
+                for doc_id in doc_ids
+            ], ordered=False)
+        except BulkWriteError as e:
+            failed = [doc_ids[error["index"]] for error in e.details.get("writeErrors", [])]
+            return {doc_id: increments[doc_id] for doc_id in failed}
+        return {}
+
+    async def flush(self) -> int:
+        """Write buffered tally increments; returns documents updated"""
+        async with self._flush_lock:
+            elections, self._pending_elections = self._pending_elections, defaultdict(int)
+            proposals, self._pending_proposals = self._pending_proposals, defaultdict(lambda: defaultdict(int))
+            if not elections and not proposals:
+                return 0
+
+            db = await get_database()
+            self._flushing_elections, self._flushing_proposals = elections, proposals
+            unwritten_elections = {entry_id: {"votes": votes} for entry_id, votes in elections.items()}
+            unwritten_proposals = proposals
+            try:
+                unwritten_elections = await self._write_increments(db.elections, unwritten_elections)
+                unwritten_proposals = await self._write_increments(db.proposals, unwritten_proposals)
+            finally:
+                self._flushing_elections, self._flushing_proposals = {}, {}
+                # Hand unwritten increments back for the next flush
+                for entry_id, fields in unwritten_elections.items():
+                    self._pending_elections[entry_id] += fields["votes"]
+                for proposal_id, fields in unwritten_proposals.items():
+                    for field, value in fields.items():
+                        self._pending_proposals[proposal_id][field] += value
+
+            failed = len(unwritten_elections) + len(unwritten_proposals)
+            if failed:
+                raise RuntimeError(f"{failed} tally increments were not applied and will be retried")
+            self.flushes += 1
+            return len(elections) + len(proposals)
+
+    async def close_due(self, now: Optional[datetime] = None) -> dict:
+        """Settle every race and proposal past its deadline, recounting from votes"""
+        db = await get_database()
+        now = now or datetime.utcnow()
+        await self.flush()
+
+        races = 0
+        while True:
+            due = await db.elections.find(
+                {"status": "active", "ends_at": {"$lte": now}},
+                {"_id": 0, "race_id": 1}
+            ).limit(VOTE_CLOSE_BATCH).to_list(VOTE_CLOSE_BATCH)
+            if not due:
+                break
+            race_ids = list({entry["race_id"] for entry in due})
+
+            counts: Dict[str, int] = defaultdict(int)
+            pipeline = [
+                {"$match": {"race_id": {"$in": race_ids}}},
+                {"$group": {"_id": "$election_id", "votes": {"$sum": 1}}}
+            ]
+            async for row in db.votes.aggregate(pipeline):
+                counts[row["_id"]] = row["votes"]
+
+            # Rank whole races, even ones only partly in this batch
+            entries = await db.elections.find(
+                {"race_id": {"$in": race_ids}},
+                {"_id": 0, "id": 1, "race_id": 1, "position": 1}
+            ).to_list(None)
+            entries.sort(key=lambda entry: (entry["race_id"], -counts[entry["id"]], entry["position"]))
+
+            ops = []
+            position = 0
+            previous_race = None
+            for entry in entries:
+                position = position + 1 if entry["race_id"] == previous_race else 1
+                previous_race = entry["race_id"]
+                ops.append(UpdateOne(
+                    {"id": entry["id"]},
+                    {"$set": {"status": "completed", "votes": counts[entry["id"]], "position": position}}
+                ))
+            await db.elections.bulk_write(ops, ordered=False)
+            for race_id in race_ids:
+                self.race_tallies.invalidate(race_id)
+            races += len(race_ids)
+
+        proposals = 0
+        while True:
+            proposal_ids = [
+                proposal["id"] for proposal in await db.proposals.find(
+                    {"status": "active", "voting_ends_at": {"$lte": now}}, {"_id": 0, "id": 1}
+                ).limit(VOTE_CLOSE_BATCH).to_list(VOTE_CLOSE_BATCH)
+            ]
+            if not proposal_ids:
+                break
+
+            counts = {proposal_id: {"votes_for": 0, "votes_against": 0} for proposal_id in proposal_ids}
+            pipeline = [
+                {"$match": {"proposal_id": {"$in": proposal_ids}}},
+                {"$group": {"_id": {"proposal_id": "$proposal_id", "vote_type": "$vote_type"}, "votes": {"$sum": 1}}}
+            ]
+            async for row in db.votes.aggregate(pipeline):
+                counts[row["_id"]["proposal_id"]][PROPOSAL_FIELDS[row["_id"]["vote_type"]]] = row["votes"]
+
+            await db.proposals.bulk_write([
+                UpdateOne({"id": proposal_id}, {"$set": {
+                    **fields,
+                    "status": "passed" if fields["votes_for"] > fields["votes_against"] else "rejected"
+                }})
+                for proposal_id, fields in counts.items()
+            ], ordered=False)
+            for proposal_id in proposal_ids:
+                self.proposal_tallies.invalidate(proposal_id)
+            proposals += len(proposal_ids)
+
+        return {"races": races, "proposals": proposals}
+
+    def stats(self) -> dict:
+        return {
+            "votes_cast": self.votes_cast,
+            "duplicate_votes": self.duplicate_votes,
+            "pending_increments": len(self._pending_elections) + len(self._pending_proposals),
+            "flushes": self.flushes,
+            "races_cached": len(self.race_tallies),
+            "proposals_cached": len(self.proposal_tallies)
+        }
+
+# Create global voting service instance
+voting_service = VotingService()
@@ -0,0 +1,158 @@
+from typing import Dict, Iterable, List, Tuple
+from collections import defaultdict
+from pymongo import UpdateOne
+from database.connection import get_database
+from services.cache import LRUCache
+import random
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+WAR_COUNTER_SHARDS = int(os.environ.get("WAR_COUNTER_SHARDS", "16"))
+WAR_COUNTER_CACHE_TTL = float(os.environ.get("WAR_COUNTER_CACHE_TTL", "1"))
+
+COUNTER_FIELDS = ("attacker_damage", "defender_damage")
+
+
+class WarCounters:
+    """Optional sharded damage counters for hot wars.
+
+    A war with `counter_shards` > 0 takes its damage increments in
+    `war_counter_shards` documents, one picked at random per write, so
+    concurrent flushes from several processes don't conflict on the war
+    document. The war's real totals are its own fields plus the sum of
+    its shards; readers always add the shard sums, so switching a war in
+    or out of sharded mode never loses increments. Turning sharding off
+    folds the shards back into the war document.
+    """
+
+    def __init__(self, cache_ttl: float = WAR_COUNTER_CACHE_TTL):
+        # war id -> configured shard count, 0 when not sharded
+        self.shard_counts = LRUCache(maxsize=10000, ttl=30)
+        # war id -> summed shard increments
+        self.totals_cache = LRUCache(maxsize=10000, ttl=cache_ttl)
+        self.shard_writes = 0
+        self.folds = 0
+
+    async def get_shard_counts(self, war_ids: Iterable[str]) -> Dict[str, int]:
+        """Configured shard count per war, 0 for unsharded wars"""
+        counts: Dict[str, int] = {}
+        missing = []
+        for war_id in war_ids:
+            count = self.shard_counts.get(war_id)
+            if count is None:
+                missing.append(war_id)
+            else:
+                counts[war_id] = count
+        if missing:
+            db = await get_database()
+            found = {
+                war["id"]: war.get("counter_shards", 0)
+                async for war in db.wars.find({"id": {"$in": missing}}, {"_id": 0, "id": 1, "counter_shards": 1})
+            }
+            for war_id in missing:
+                counts[war_id] = found.get(war_id, 0)
+                self.shard_counts.set(war_id, counts[war_id])
+        return counts
+
+    async def increment_ops(self, increments: Dict[str, Dict[str, int]]) -> Tuple[List[UpdateOne], List[UpdateOne]]:
+        """Split per-war increments into war document and shard document updates"""
+        shard_counts = await self.get_shard_counts(increments.keys())
+        war_ops, shard_ops = [], []
+        for war_id, fields in increments.items():
+            shards = shard_counts[war_id]
+            if shards:
+                shard_ops.append(UpdateOne(
+                    {"war_id": war_id, "shard": random.randrange(shards)},
+                    {"$inc": dict(fields)},
+                    upsert=True
+                ))
+            else:
+                war_ops.append(UpdateOne({"id": war_id}, {"$inc": dict(fields)}))
+        self.shard_writes += len(shard_ops)
+        return war_ops, shard_ops
+
+    def invalidate(self, *war_ids: str) -> None:
+        for war_id in war_ids:
+            self.totals_cache.invalidate(war_id)
+
+    async def totals(self, war_ids: List[str], fresh: bool = False) -> Dict[str, Dict[str, int]]:
+        """Summed shard increments per war; add these to the war document's fields"""
+        result: Dict[str, Dict[str, int]] = {}
+        missing = []
+        for war_id in war_ids:
+            cached = None if fresh else self.totals_cache.get(war_id)
+            if cached is None:
+                missing.append(war_id)
+            else:
+                result[war_id] = cached
+        if missing:
+            db = await get_database()
+            summed = {war_id: dict.fromkeys(COUNTER_FIELDS, 0) for war_id in missing}
+            pipeline = [
+                {"$match": {"war_id": {"$in": missing}}},
+                {"$group": {"_id": "$war_id", **{field: {"$sum": f"${field}"} for field in COUNTER_FIELDS}}}
+            ]
+            async for row in db.war_counter_shards.aggregate(pipeline):
+                summed[row["_id"]] = {field: row[field] for field in COUNTER_FIELDS}
+            for war_id, fields in summed.items():
+                self.totals_cache.set(war_id, fields)
+            result.update(summed)
+        return result
+
+    async def apply_totals(self, wars: List[dict], fresh: bool = False) -> List[dict]:
+        """Add shard sums to the counter fields of war documents, in place"""
+        if wars:
+            totals = await self.totals([war["id"] for war in wars], fresh=fresh)
+            for war in wars:
+                for field, value in totals[war["id"]].items():
+                    if field in war:
+                        war[field] += value
+        return wars
+
+    async def fold(self, war_ids: List[str]) -> int:
+        """Move shard sums into the war documents and delete the shards"""
+        db = await get_database()
+
+        async def write(session):
+            shards = await db.war_counter_shards.find({"war_id": {"$in": war_ids}}, session=session).to_list(None)
+            if not shards:
+                return 0
+            increments: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+            for shard in shards:
+                for field in COUNTER_FIELDS:
+                    increments[shard["war_id"]][field] += shard.get(field, 0)
+            await db.wars.bulk_write([
+                UpdateOne({"id": war_id}, {"$inc": dict(fields)})
+                for war_id, fields in increments.items()
+            ], ordered=False, session=session)
+            # A concurrent $inc on any of these shards conflicts and the transaction retries
+            await db.war_counter_shards.delete_many({"_id": {"$in": [shard["_id"] for shard in shards]}}, session=session)
+            return len(shards)
+
+        async with await db.client.start_session() as session:
+            folded = await session.with_transaction(write)
+        self.invalidate(*war_ids)
+        self.folds += 1
+        return folded
+
+    async def set_shards(self, war_id: str, shards: int) -> dict:
+        """Switch a war to `shards` counter shards, or back to its own document with 0"""
+        db = await get_database()
+        result = await db.wars.update_one({"id": war_id}, {"$set": {"counter_shards": shards}})
+        if result.matched_count == 0:
+            return {"war_id": war_id, "found": False}
+        self.shard_counts.set(war_id, shards)
+        folded = 0 if shards else await self.fold([war_id])
+        return {"war_id": war_id, "found": True, "shards": shards, "folded": folded}
+
+    def stats(self) -> dict:
+        return {
+            "shard_writes": self.shard_writes,
+            "folds": self.folds,
+            "totals_cache": self.totals_cache.stats()
+        }
+
+# Create global war counters instance
+war_counters = WarCounters()
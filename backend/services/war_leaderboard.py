@@ -0,0 +1,239 @@
+from typing import Dict, List, Optional, Set, Tuple
+from bisect import bisect_left, insort
+from datetime import datetime
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from models.military import LeaderboardEntry, WarLeaderboard
+from database.connection import get_database
+from services.damage_aggregator import damage_aggregator
+from services.war_service import SIDES
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+WAR_LEADERBOARD_SIZE = int(os.environ.get("WAR_LEADERBOARD_SIZE", "100"))
+WAR_LEADERBOARD_PERSIST_INTERVAL = float(os.environ.get("WAR_LEADERBOARD_PERSIST_INTERVAL", "30"))
+
+BOARD_SIDES = SIDES + ("all",)
+
+
+class TopK:
+    """Top k users by damage, for totals that only ever grow.
+
+    Every user's running total is kept, but only the top k are held in
+    sorted order. Because totals never decrease, a user outside the top k
+    can only enter it, so evicted users never need to be found again.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.totals: Dict[str, List[int]] = {}
+        self._top: List[Tuple[int, str]] = []
+        self._members: Set[str] = set()
+
+    def add(self, user_id: str, damage: int, hits: int) -> None:
+        totals = self.totals.setdefault(user_id, [0, 0])
+        previous = totals[0]
+        totals[0] += damage
+        totals[1] += hits
+
+        if user_id in self._members:
+            del self._top[bisect_left(self._top, (previous, user_id))]
+            insort(self._top, (totals[0], user_id))
+        elif len(self._top) < self.k or (totals[0], user_id) > self._top[0]:
+            insort(self._top, (totals[0], user_id))
+            self._members.add(user_id)
+            if len(self._top) > self.k:
+                _, evicted = self._top.pop(0)
+                self._members.discard(evicted)
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """(user_id, damage, hits) for the leaders, highest damage first"""
+        leaders = self._top[-limit:] if limit else self._top
+        return [(user_id, damage, self.totals[user_id][1]) for damage, user_id in reversed(leaders)]
+
+
+class WarLeaderboards:
+    """Incremental per-war, per-side damage leaderboards.
+
+    Boards for active wars are rebuilt from battle_participation on startup
+    and then fed by the damage aggregator listener. Changed boards are
+    written to `war_leaderboards` every WAR_LEADERBOARD_PERSIST_INTERVAL
+    seconds; boards of finished wars are dropped from memory after their
+    final write and served from that collection.
+    """
+
+    def __init__(self, k: int = WAR_LEADERBOARD_SIZE, persist_interval: float = WAR_LEADERBOARD_PERSIST_INTERVAL):
+        self.k = k
+        self.persist_interval = persist_interval
+        self.boards: Dict[str, Dict[str, TopK]] = {}
+        self._dirty: Set[str] = set()
+        self._finished: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.persists = 0
+        damage_aggregator.add_listener(self._on_hit)
+
+    def _new_boards(self) -> Dict[str, TopK]:
+        return {side: TopK(self.k) for side in BOARD_SIDES}
+
+    def _on_hit(self, war_id: str, user_id: str, side: str, damage: int, hits: int) -> None:
+        if war_id in self._finished:
+            return
+        boards = self.boards.get(war_id)
+        if boards is None:
+            boards = self.boards[war_id] = self._new_boards()
+        boards[side].add(user_id, damage, hits)
+        boards["all"].add(user_id, damage, hits)
+        self._dirty.add(war_id)
+
+    async def start(self) -> None:
+        await self.rebuild()
+        self._task = asyncio.create_task(self._persist_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.persist()
+
+    async def _persist_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+                await self._drop_finished()
+            except Exception as e:
+                logger.error(f"Error persisting war leaderboards: {e}")
+
+    async def rebuild(self) -> int:
+        """Recompute boards for every active war from battle_participation"""
+        db = await get_database()
+        war_ids = [war["id"] async for war in db.wars.find({"status": "active"}, {"_id": 0, "id": 1})]
+        boards = {war_id: self._new_boards() for war_id in war_ids}
+
+        pipeline = [
+            {"$match": {"war_id": {"$in": war_ids}}},
+            {"$group": {
+                "_id": {"war_id": "$war_id", "user_id": "$user_id", "side": "$side"},
+                "damage": {"$sum": "$damage_dealt"},
+                "hits": {"$sum": "$rounds_participated"}
+            }}
+        ]
+        rows = 0
+        async for row in db.battle_participation.aggregate(pipeline, allowDiskUse=True):
+            key = row["_id"]
+            war_boards = boards[key["war_id"]]
+            war_boards[key["side"]].add(key["user_id"], row["damage"], row["hits"])
+            war_boards["all"].add(key["user_id"], row["damage"], row["hits"])
+            rows += 1
+
+        self.boards = boards
+        self._dirty = set(war_ids)
+        logger.info(f"Rebuilt leaderboards for {len(war_ids)} active wars from {rows} participation totals")
+        return len(war_ids)
+
+    async def persist(self) -> int:
+        """Write every board changed since the last persist"""
+        dirty, self._dirty = self._dirty, set()
+        ops = []
+        now = datetime.utcnow()
+        for war_id in dirty:
+            boards = self.boards.get(war_id)
+            if boards is None:
+                continue
+            for side, board in boards.items():
+                leaderboard = WarLeaderboard(
+                    war_id=war_id,
+                    side=side,
+                    entries=[
+                        LeaderboardEntry(user_id=user_id, damage_dealt=damage, hits=hits)
+                        for user_id, damage, hits in board.top()
+                    ],
+                    updated_at=now
+                )
+                ops.append(UpdateOne(
+                    {"war_id": war_id, "side": side},
+                    {"$set": leaderboard.model_dump()},
+                    upsert=True
+                ))
+        if not ops:
+            return 0
+
+        db = await get_database()
+        try:
+            await db.war_leaderboards.bulk_write(ops, ordered=False)
+        except Exception:
+            self._dirty |= dirty
+            raise
+        self.persists += 1
+        return len(ops)
+
+    async def _drop_finished(self) -> None:
+        """Forget boards of wars that have finished; their last persist is final"""
+        db = await get_database()
+        war_ids = [war_id for war_id in self.boards if war_id not in self._dirty]
+        if not war_ids:
+            return
+        cursor = db.wars.find({"id": {"$in": war_ids}, "status": "finished"}, {"_id": 0, "id": 1})
+        async for war in cursor:
+            self.boards.pop(war["id"], None)
+            self._finished.add(war["id"])
+
+    async def get_leaderboard(self, war_id: str, side: str = "all", limit: int = WAR_LEADERBOARD_SIZE) -> List[dict]:
+        """Top fighters of a war, for one side or both"""
+        if side not in BOARD_SIDES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Side must be attacker, defender or all"
+            )
+
+        db = await get_database()
+        boards = self.boards.get(war_id)
+        if boards is not None:
+            leaders = boards[side].top(limit)
+        else:
+            stored = await db.war_leaderboards.find_one({"war_id": war_id, "side": side}, {"_id": 0, "entries": 1})
+            if stored is None:
+                if not await db.wars.find_one({"id": war_id}, {"_id": 1}):
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="War not found"
+                    )
+                return []
+            leaders = [(entry["user_id"], entry["damage_dealt"], entry["hits"]) for entry in stored["entries"][:limit]]
+
+        usernames = {
+            user["id"]: user["username"]
+            async for user in db.users.find(
+                {"id": {"$in": [user_id for user_id, _, _ in leaders]}},
+                {"_id": 0, "id": 1, "username": 1}
+            )
+        }
+        return [
+            {
+                "rank": rank,
+                "user_id": user_id,
+                "username": usernames.get(user_id),
+                "damage_dealt": damage,
+                "hits": hits
+            }
+            for rank, (user_id, damage, hits) in enumerate(leaders, start=1)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "wars": len(self.boards),
+            "k": self.k,
+            "fighters": sum(len(boards["all"].totals) for boards in self.boards.values()),
+            "dirty_wars": len(self._dirty),
+            "persists": self.persists
+        }
+
+# Create global war leaderboards instance
+war_leaderboards = WarLeaderboards()
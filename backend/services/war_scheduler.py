@@ -0,0 +1,188 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from models.military import BattleRound
+from database.connection import get_database
+from services.damage_aggregator import damage_aggregator
+from services.war_service import war_service
+from services.active_wars import active_wars_view
+from services.war_counters import war_counters
+import asyncio
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+WAR_SCHEDULER_INTERVAL = float(os.environ.get("WAR_SCHEDULER_INTERVAL", "10"))
+BATTLE_ROUND_MINUTES = float(os.environ.get("BATTLE_ROUND_MINUTES", "30"))
+WAR_SCHEDULER_BATCH = 500
+
+DUPLICATE_KEY = 11000
+
+ROUND_PROJECTION = {
+    "_id": 0, "id": 1, "attacker_damage": 1, "defender_damage": 1, "ends_at": 1, "round_number": 1,
+    "round_attacker_damage_start": 1, "round_defender_damage_start": 1, "attacker_rounds": 1, "defender_rounds": 1
+}
+
+
+def decide(attacker: int, defender: int) -> str:
+    """Winning side for a round or a war; the defender holds on a tie"""
+    return "attacker" if attacker > defender else "defender"
+
+
+class WarScheduler:
+    """Closes battle rounds and finishes wars on a timer, in batches.
+
+    Each pass flushes buffered damage, then picks due wars through the
+    {status, next_round_at} and {status, ends_at} indexes. A round's winner
+    is the side that dealt more damage since the round started, and a
+    round nobody fought in is a draw. A war's winner is the side with more
+    rounds, with total damage as the tie-break. Ties go to the defender in
+    both. Round documents are inserted before the guarded war update and are unique
+    per (war_id, round_number), so a pass that dies halfway can be rerun.
+    """
+
+    def __init__(self, interval: float = WAR_SCHEDULER_INTERVAL, round_minutes: float = BATTLE_ROUND_MINUTES):
+        self.interval = interval
+        self.round_length = timedelta(minutes=round_minutes)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.rounds_closed = 0
+        self.wars_finished = 0
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error running war scheduler: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, now: Optional[datetime] = None) -> dict:
+        """One scheduling pass over every due war"""
+        async with self._lock:
+            db = await get_database()
+            now = now or datetime.utcnow()
+            # Round winners are decided from stored damage, so land buffered hits first
+            await damage_aggregator.flush()
+
+            initialized = await self._initialize_rounds(db, now)
+            finished = await self._process(db, {"status": "active", "ends_at": {"$lte": now}}, now, finish=True)
+            closed = await self._process(db, {"status": "active", "next_round_at": {"$lte": now}}, now, finish=False)
+            return {"initialized": initialized, "rounds_closed": closed + finished, "wars_finished": finished}
+
+    async def _initialize_rounds(self, db, now: datetime) -> int:
+        """Start round 1 for wars the scheduler hasn't seen, from their current damage"""
+        ops = []
+        wars = await db.wars.find({"status": "active", "next_round_at": None}, ROUND_PROJECTION).to_list(None)
+        await war_counters.apply_totals(wars, fresh=True)
+        for war in wars:
+            ops.append(UpdateOne(
+                {"id": war["id"], "next_round_at": None},
+                {"$set": {
+                    "round_number": war.get("round_number", 1),
+                    "next_round_at": min(now + self.round_length, war["ends_at"]),
+                    "round_attacker_damage_start": war["attacker_damage"],
+                    "round_defender_damage_start": war["defender_damage"]
+                }}
+            ))
+        if ops:
+            await db.wars.bulk_write(ops, ordered=False)
+        return len(ops)
+
+    def _close_round(self, war: dict) -> tuple:
+        attacker = war["attacker_damage"] - war.get("round_attacker_damage_start", 0)
+        defender = war["defender_damage"] - war.get("round_defender_damage_start", 0)
+        winner_side = decide(attacker, defender) if attacker or defender else "draw"
+        round_doc = BattleRound(
+            war_id=war["id"],
+            round_number=war.get("round_number", 1),
+            winner_side=winner_side,
+            damage_dealt=attacker + defender
+        )
+        return round_doc, winner_side
+
+    async def _process(self, db, query: dict, now: datetime, finish: bool) -> int:
+        processed = 0
+        while True:
+            wars = await db.wars.find(query, ROUND_PROJECTION).limit(WAR_SCHEDULER_BATCH).to_list(WAR_SCHEDULER_BATCH)
+            if not wars:
+                return processed
+            await war_counters.apply_totals(wars, fresh=True)
+
+            rounds: List[dict] = []
+            ops = []
+            for war in wars:
+                round_doc, winner_side = self._close_round(war)
+                rounds.append(round_doc.model_dump())
+                attacker_rounds = war.get("attacker_rounds", 0) + (winner_side == "attacker")
+                defender_rounds = war.get("defender_rounds", 0) + (winner_side == "defender")
+
+                update = {
+                    "round_number": round_doc.round_number + 1,
+                    "round_attacker_damage_start": war["attacker_damage"],
+                    "round_defender_damage_start": war["defender_damage"],
+                    "attacker_rounds": attacker_rounds,
+                    "defender_rounds": defender_rounds
+                }
+                if finish:
+                    if attacker_rounds != defender_rounds:
+                        winner = decide(attacker_rounds, defender_rounds)
+                    else:
+                        winner = decide(war["attacker_damage"], war["defender_damage"])
+                    update.update({"status": "finished", "winner": winner, "next_round_at": None, "finished_at": now})
+                else:
+                    update["next_round_at"] = min(now + self.round_length, war["ends_at"])
+
+                # Guard on the round we closed so a concurrent pass can't close it twice
+                ops.append(UpdateOne(
+                    {"id": war["id"], "status": "active", "round_number": round_doc.round_number},
+                    {"$set": update}
+                ))
+
+            try:
+                await db.battle_rounds.insert_many(rounds, ordered=False)
+            except BulkWriteError as e:
+                if any(error["code"] != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                    raise
+            result = await db.wars.bulk_write(ops, ordered=False)
+            processed += result.modified_count
+            # New battle rounds and finished wars change every page they appear on
+            if result.modified_count:
+                active_wars_view.invalidate()
+
+            if finish:
+                for war in wars:
+                    war_service.war_cache.invalidate(war["id"])
+                # Finished wars stop taking hits, so settle their shards into the war document
+                await war_counters.fold([war["id"] for war in wars])
+                self.wars_finished += result.modified_count
+            else:
+                self.rounds_closed += result.modified_count
+
+            if len(wars) < WAR_SCHEDULER_BATCH:
+                return processed
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "round_minutes": self.round_length.total_seconds() / 60,
+            "rounds_closed": self.rounds_closed,
+            "wars_finished": self.wars_finished
+        }
+
+# Create global war scheduler instance
+war_scheduler = WarScheduler()
@@ -0,0 +1,163 @@
+from typing import Optional
+from fastapi import HTTPException, status
+from models.user import UserResponse
+from models.military import War
+from database.connection import get_database
+from services.cache import LRUCache
+from services.damage_aggregator import damage_aggregator, GOLD_PER_HIT
+from datetime import datetime, timedelta
+import numpy as np
+import random
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+WAR_CACHE_TTL = float(os.environ.get("WAR_CACHE_TTL", "5"))
+SEED_DEMO_WARS = os.environ.get("SEED_DEMO_WARS", "true").lower() == "true"
+FIGHT_BATCH_MAX_HITS = int(os.environ.get("FIGHT_BATCH_MAX_HITS", "100"))
+
+SIDES = ("attacker", "defender")
+
+def war_balance(attacker_damage: int, defender_damage: int) -> dict:
+    """Damage split and the front-line status label shown for a war"""
+    total_damage = attacker_damage + defender_damage
+    attacker_percentage = 0 if total_damage == 0 else (attacker_damage / total_damage) * 100
+
+    if attacker_percentage > 70:
+        status = "overwhelming"
+    elif attacker_percentage > 55:
+        status = "advantage"
+    elif attacker_percentage > 45:
+        status = "balanced"
+    else:
+        status = "defensive"
+
+    return {
+        "totalDamage": total_damage,
+        "attackerPercentage": attacker_percentage,
+        "defenderPercentage": 0 if total_damage == 0 else 100 - attacker_percentage,
+        "status": status
+    }
+
+class WarService:
+    def __init__(self):
+        # Active war documents, so a burst of hits doesn't re-read the same war
+        self.war_cache = LRUCache(maxsize=1000, ttl=WAR_CACHE_TTL)
+        self._rng = np.random.default_rng()
+
+    async def get_active_war(self, war_id: str) -> Optional[dict]:
+        """Active war by id, from the short-TTL war cache"""
+        war = self.war_cache.get(war_id)
+        if war is not None:
+            return war
+
+        db = await get_database()
+        war = await db.wars.find_one(
+            {"id": war_id, "status": "active"},
+            {"_id": 0, "id": 1, "attacker_country": 1, "defender_country": 1, "ends_at": 1}
+        )
+        if war:
+            self.war_cache.set(war_id, war)
+        return war
+
+    async def seed_demo_wars(self) -> int:
+        """Insert the demo wars if there are no active wars; returns wars inserted"""
+        db = await get_database()
+        if await db.wars.find_one({"status": "active"}, {"_id": 1}):
+            return 0
+
+        now = datetime.utcnow()
+        demo_wars = [
+            War(
+                attacker_country="Germany",
+                defender_country="France",
+                region="Alsace-Lorraine",
+                attacker_flag="🇩🇪",
+                defender_flag="🇫🇷",
+                attacker_damage=2450000,
+                defender_damage=1890000,
+                ends_at=now + timedelta(hours=4, minutes=23)
+            ),
+            War(
+                attacker_country="Italy",
+                defender_country="Switzerland",
+                region="Ticino",
+                attacker_flag="🇮🇹",
+                defender_flag="🇨🇭",
+                attacker_damage=1230000,
+                defender_damage=1890000,
+                ends_at=now + timedelta(hours=2, minutes=15)
+            ),
+            War(
+                attacker_country="Spain",
+                defender_country="Portugal",
+                region="Porto",
+                attacker_flag="🇪🇸",
+                defender_flag="🇵🇹",
+                attacker_damage=3450000,
+                defender_damage=1120000,
+                ends_at=now + timedelta(hours=6, minutes=45)
+            )
+        ]
+
+        await db.wars.insert_many([war.model_dump() for war in demo_wars])
+        logger.info(f"Seeded {len(demo_wars)} demo wars")
+        return len(demo_wars)
+
+    def roll_damage(self, strength: int) -> int:
+        """Damage for one hit: uniform within ±20% of strength * 10"""
+        base_damage = strength * 10
+        return random.randint(int(base_damage * 0.8), int(base_damage * 1.2))
+
+    def roll_damages(self, strength: int, hits: int) -> np.ndarray:
+        """Damage for `hits` hits at once, same distribution as roll_damage"""
+        base_damage = strength * 10
+        return self._rng.integers(int(base_damage * 0.8), int(base_damage * 1.2), size=hits, endpoint=True)
+
+    async def _war_for_side(self, war_id: str, side: str) -> dict:
+        if side not in SIDES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Side must be attacker or defender"
+            )
+
+        war = await self.get_active_war(war_id)
+        if not war:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="War not found or not active"
+            )
+        return war
+
+    async def fight(self, war_id: str, side: str, user: UserResponse) -> dict:
+        """Deal one hit in a war"""
+        war = await self._war_for_side(war_id, side)
+        damage = self.roll_damage(user.stats.strength)
+        await damage_aggregator.record_hit(war_id, user.id, side, damage)
+
+        return {
+            "message": f"You fought for {war[f'{side}_country']} and dealt {damage} damage!",
+            "damage_dealt": damage,
+            "gold_earned": GOLD_PER_HIT,
+            "side": side
+        }
+
+    async def fight_batch(self, war_id: str, side: str, hits: int, user: UserResponse) -> dict:
+        """Deal several hits in a war as one aggregated record"""
+        war = await self._war_for_side(war_id, side)
+        damages = self.roll_damages(user.stats.strength, hits)
+        total_damage = int(damages.sum())
+        await damage_aggregator.record_hit(war_id, user.id, side, total_damage, hits=hits)
+
+        return {
+            "message": f"You fought {hits} times for {war[f'{side}_country']} and dealt {total_damage} damage!",
+            "hits": hits,
+            "damage_dealt": total_damage,
+            "damage_rolls": damages.tolist(),
+            "gold_earned": GOLD_PER_HIT * hits,
+            "side": side
+        }
+
+# Create global war service instance
+war_service = WarService()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend is run from its own directory, so its packages import top-level
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
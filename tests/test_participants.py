@@ -0,0 +1,86 @@
+from services.participants import DistinctCounter
+
+# 1.04 / sqrt(2**14) is about 0.8%; allow 2.5 standard errors
+HLL_ERROR_BOUND = 0.02
+
+
+def _counter(ids, exact_limit=1000, precision=14) -> DistinctCounter:
+    counter = DistinctCounter(exact_limit=exact_limit, precision=precision)
+    for user_id in ids:
+        counter.add(user_id)
+    return counter
+
+
+def test_exact_below_limit():
+    counter = _counter(f"user-{i}" for i in range(1000))
+    assert counter.exact is not None
+    assert counter.count() == 1000
+    assert not counter.add("user-0")
+    assert counter.count() == 1000
+
+
+def test_switches_to_hyperloglog_past_limit():
+    counter = _counter(f"user-{i}" for i in range(1001))
+    assert counter.exact is None
+    assert len(counter.registers) == 1 << 14
+    assert abs(counter.count() - 1001) / 1001 < HLL_ERROR_BOUND
+
+
+def test_hyperloglog_error_bound():
+    for n in (20_000, 300_000):
+        counter = _counter(f"user-{i}" for i in range(n))
+        assert abs(counter.count() - n) / n < HLL_ERROR_BOUND
+
+
+def test_repeat_adds_do_not_change_the_sketch():
+    counter = _counter(f"user-{i}" for i in range(5000))
+    registers = bytes(counter.registers)
+    assert not any([counter.add(f"user-{i}") for i in range(5000)])
+    assert bytes(counter.registers) == registers
+
+
+def test_merge_is_idempotent():
+    a = _counter(f"user-{i}" for i in range(0, 60_000))
+    b = _counter(f"user-{i}" for i in range(40_000, 100_000))
+    a.merge(b)
+    merged = (bytes(a.registers), a.count())
+    a.merge(b)
+    a.merge(a)
+    assert (bytes(a.registers), a.count()) == merged
+    assert abs(a.count() - 100_000) / 100_000 < HLL_ERROR_BOUND
+
+
+def test_merge_matches_counting_the_union():
+    a = _counter(f"user-{i}" for i in range(0, 3000))
+    b = _counter(f"user-{i}" for i in range(2000, 5000))
+    a.merge(b)
+    assert bytes(a.registers) == bytes(_counter(f"user-{i}" for i in range(5000)).registers)
+
+
+def test_merge_exact_counters():
+    a = _counter(["a", "b"])
+    a.merge(_counter(["b", "c"]))
+    a.merge(_counter(["b", "c"]))
+    assert a.exact == {"a", "b", "c"}
+    assert a.count() == 3
+
+
+def test_merge_exact_into_hyperloglog_and_back():
+    sketch = _counter(f"user-{i}" for i in range(5000))
+    small = _counter(["user-1", "user-2"])
+    small.merge(sketch)
+    assert small.exact is None
+    assert bytes(small.registers) == bytes(sketch.registers)
+
+    before = bytes(sketch.registers)
+    sketch.merge(_counter(["user-1", "user-2"]))
+    assert bytes(sketch.registers) == before
+
+
+def test_doc_round_trip():
+    for ids in (["a", "b"], [f"user-{i}" for i in range(5000)]):
+        counter = _counter(ids)
+        restored = DistinctCounter.from_doc(counter.to_doc())
+        assert restored.count() == counter.count()
+        restored.merge(counter)
+        assert restored.count() == counter.count()
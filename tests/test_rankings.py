@@ -0,0 +1,104 @@
+import asyncio
+import types
+import services.rankings as rankings
+from services.rankings import RankingIndex, RankingsService
+
+
+def _index() -> RankingIndex:
+    # b and c tie, as do d and e
+    return RankingIndex({"a": 50, "b": 40, "c": 40, "d": 10, "e": 10, "f": 0})
+
+
+def test_rank_shares_ties():
+    index = _index()
+    assert [index.rank(user_id) for user_id in "abcdef"] == [1, 2, 2, 4, 4, 6]
+    assert index.rank("missing") is None
+    assert len(index) == 6
+
+
+def test_top():
+    index = _index()
+    assert index.top(0, 3) == [(1, "a", 50), (2, "b", 40), (2, "c", 40)]
+    assert index.top(3, 10) == [(4, "d", 10), (4, "e", 10), (6, "f", 0)]
+    assert index.top(6, 5) == []
+
+
+def test_around():
+    index = _index()
+    assert index.around("c", 1) == [(2, "b", 40), (2, "c", 40), (4, "d", 10)]
+    assert index.around("a", 2) == [(1, "a", 50), (2, "b", 40), (2, "c", 40)]
+    assert index.around("f", 1) == [(4, "e", 10), (6, "f", 0)]
+    assert index.around("missing", 1) == []
+
+
+def test_update_moves_user_and_ties():
+    index = _index()
+    index.update("f", 40)
+    assert [index.rank(user_id) for user_id in "abcf"] == [1, 2, 2, 2]
+    assert index.rank("d") == 5
+
+    index.update("a", 40)
+    assert [index.rank(user_id) for user_id in "abcf"] == [1, 1, 1, 1]
+    assert index.top(0, 1) == [(1, "a", 40)]
+
+    index.update("g", 100)
+    assert index.rank("g") == 1
+    assert index.rank("a") == 2
+    assert len(index) == 7
+
+
+def test_update_to_same_value_is_a_no_op():
+    index = _index()
+    index.update("b", 40)
+    assert index.top(0, 6) == _index().top(0, 6)
+
+
+class _Users:
+    """users collection whose full scan runs during_scan before it ends"""
+
+    def __init__(self, docs, during_scan=None):
+        self.docs = docs
+        self.during_scan = during_scan
+
+    def find(self, query, projection):
+        return self._iter(query.get("id", {}).get("$in"))
+
+    async def _iter(self, ids):
+        for doc in list(self.docs.values()):
+            if ids is None or doc["id"] in ids:
+                yield dict(doc, stats=dict(doc["stats"]))
+        if ids is None and self.during_scan:
+            await self.during_scan()
+
+
+def _user(user_id: str, level: int) -> dict:
+    return {"id": user_id, "username": user_id, "level": level, "stats": {"total_damage": 0}, "gold": 0}
+
+
+def test_refresh_during_rebuild_marks_user_dirty(monkeypatch):
+    service = RankingsService()
+    users = _Users({"u1": _user("u1", 1), "u2": _user("u2", 2)})
+    database = types.SimpleNamespace(users=users)
+
+    async def get_database():
+        return database
+
+    async def level_up():
+        # u1 levels up after the scan read it, and is refreshed mid-scan
+        users.docs["u1"]["level"] = 5
+        await service.refresh(["u1"])
+
+    async def run():
+        monkeypatch.setattr(rankings, "get_database", get_database)
+        await service.rebuild()
+        users.during_scan = level_up
+        await service.rebuild()
+        assert service.indexes["level"].values["u1"] == 1
+        assert "u1" in service._dirty
+
+        await service.refresh()
+        assert service.indexes["level"].values["u1"] == 5
+        assert service.indexes["level"].rank("u1") == 1
+        assert not service._dirty
+
+    asyncio.run(run())